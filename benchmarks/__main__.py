@@ -0,0 +1,69 @@
+"""
+Run the model-free benchmark suite.
+
+    python -m benchmarks                                   # everything, results in benchmarks/results/
+    python -m benchmarks --quick -k camouflage             # 480p only, cases matching "camouflage"
+    python -m benchmarks --compare benchmarks/results/baseline.json
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import click
+import cv2
+
+from benchmarks.cases import all_cases
+from benchmarks.fakes import IMAGE_SIZES
+from benchmarks.harness import compare, measure, save_report
+
+
+@click.command()
+@click.option("-k", "keyword", multiple=True, help="Only run cases whose id contains this text (repeatable).")
+@click.option("--quick", is_flag=True, help="480p images and fewer repeats, for a fast sanity check.")
+@click.option("--sizes", multiple=True, type=click.Choice(list(IMAGE_SIZES)), help="Image sizes  [default: all]")
+@click.option("--counts", default="1,10,50", show_default=True, help="Comma-separated detection counts.")
+@click.option("--min-time", default=0.5, type=float, show_default=True, help="Seconds spent timing each case.")
+@click.option("--threads", default=1, type=int, show_default=True, help="OpenCV threads (1 = stable numbers).")
+@click.option(
+    "--output", type=click.Path(), default=None, help="Result JSON  [default: benchmarks/results/<time>.json]"
+)
+@click.option("--compare", "baseline", type=click.Path(exists=True), default=None, help="Previous result JSON.")
+@click.option("--threshold", default=1.2, type=float, show_default=True, help="Slowdown ratio reported as regression.")
+def main(keyword, quick, sizes, counts, min_time, threads, output, baseline, threshold):
+    """Measure throughput and peak memory of the CPU-side hot paths, without weights or network."""
+    cv2.setNumThreads(threads)
+
+    sizes = sizes or (("480p",) if quick else tuple(IMAGE_SIZES))
+    min_time = min(min_time, 0.1) if quick else min_time
+    cases = all_cases(sizes, [int(c) for c in counts.split(",") if c.strip()])
+    if keyword:
+        cases = [c for c in cases if any(k in c.id for k in keyword)]
+
+    results = []
+    for i, case in enumerate(cases, 1):
+        result = measure(case, min_time=min_time)
+        results.append(result)
+        click.echo(
+            f"[{i:>3}/{len(cases)}] {case.id:<70} {result['median_ms']:>10.3f} ms"
+            f" {result['items_per_sec']:>12.1f} /s {result['peak_mem_mb']:>9.2f} MB"
+        )
+
+    output = Path(output or Path(__file__).parent / "results" / f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    save_report(results, output)
+    click.echo(f"Results saved to: {output}")
+
+    if baseline:
+        rows = compare(results, baseline, threshold=threshold)
+        regressions = [r for r in rows if r["regression"]]
+        for r in rows:
+            flag = "REGRESSION" if r["regression"] else ""
+            click.echo(
+                f"{r['id']:<70} {r['baseline_ms']:>10.3f} -> {r['median_ms']:>10.3f} ms  x{r['ratio']:<6} {flag}"
+            )
+        click.echo(f"{len(regressions)} regression(s) out of {len(rows)} compared case(s)")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Benchmark cases for the CPU-side hot paths, parametrised by image size and detection count."""
+
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from benchmarks.fakes import IMAGE_SIZES, make_boxes, make_detections, make_image, make_masks, register_fakes
+from benchmarks.harness import Case
+from sceneflow.core.camouflage import AVAILABLE_CAMOUFLAGE_METHODS, Camouflage, combine_masks
+from sceneflow.utils.draw import blend_detections, generate_static_scene_mask
+from sceneflow.utils.io import load_image, save_image
+from sceneflow.utils.masks import CroppedMasks
+
+# Scratch folder for the I/O cases, removed at exit
+_TMP = tempfile.TemporaryDirectory(prefix="sceneflow-bench-")
+
+
+def _mask_generator():
+    from sceneflow.core.mask_generator import MaskGenerator
+
+    register_fakes()
+    return MaskGenerator.from_pretrained(["fake_detector"], ["fake_ovd"], "fake_segmentor")
+
+
+def camouflage_cases(sizes: Dict[str, Tuple[int, int]], counts: Sequence[int]) -> List[Case]:
+    cases = []
+    for method in sorted(AVAILABLE_CAMOUFLAGE_METHODS):
+        for size_name, size in sizes.items():
+            for n in counts:
+
+                def setup(method=method, size=size, n=n):
+                    image = make_image(size)
+                    masks = CroppedMasks.from_dense(make_masks(size, make_boxes(size, n)))
+                    camouflage = Camouflage(method=method)
+                    return lambda: camouflage.hide(image, masks)
+
+                cases.append(Case("camouflage.hide", setup, {"method": method, "size": size_name, "n": n}))
+    return cases
+
+
+def draw_cases(sizes: Dict[str, Tuple[int, int]], counts: Sequence[int]) -> List[Case]:
+    cases = []
+    for size_name, size in sizes.items():
+        for n in counts:
+            params = {"size": size_name, "n": n}
+
+            def setup_combine(size=size, n=n):
+                masks = list(make_masks(size, make_boxes(size, n)))
+                return lambda: combine_masks(masks)
+
+            def setup_union(size=size, n=n):
+                masks = CroppedMasks.from_dense(make_masks(size, make_boxes(size, n)))
+                # A fresh instance per call, the union is cached
+                return lambda: CroppedMasks(masks.crops, masks.boxes, masks.size).union()
+
+            def setup_blend(size=size, n=n):
+                image, detections = make_image(size), make_detections(size, n)
+                return lambda: blend_detections(image, detections)
+
+            def setup_static(size=size, n=n):
+                # Masks without RLEs, the way MaskGenerator hands them over
+                image, detections = make_image(size), make_detections(size, n, with_rle=False)
+                detections.masks = CroppedMasks.from_dense(make_masks(size, detections.boxes))
+                return lambda: generate_static_scene_mask(image, detections.select(slice(None)))
+
+            cases += [
+                Case("combine_masks", setup_combine, params, items=n),
+                Case("CroppedMasks.union", setup_union, params, items=n),
+                Case("blend_detections", setup_blend, params),
+                Case("generate_static_scene_mask", setup_static, params),
+            ]
+    return cases
+
+
+def mask_generator_cases(sizes: Dict[str, Tuple[int, int]], counts: Sequence[int]) -> List[Case]:
+    cases = []
+    for n in sorted({*counts, 200}):
+
+        def setup_nms(n=n):
+            mask_gen = _mask_generator()
+            detections = make_detections((1080, 1920), n, with_rle=False)
+            return lambda: mask_gen._nms(detections, nms_iou=0.5)
+
+        cases.append(Case("MaskGenerator._nms", setup_nms, {"n": n}, items=n))
+
+    for size_name, size in sizes.items():
+        for n in counts:
+            params = {"size": size_name, "n": n}
+
+            def setup_scale(size=size, n=n):
+                # Masks predicted at half resolution, scaled back to the original size
+                mask_gen = _mask_generator()
+                half = (size[0] // 2, size[1] // 2)
+                detections = make_detections(half, n, with_rle=False)
+                masks = CroppedMasks.from_dense(make_masks(half, detections.boxes))
+                # _scale rescales the boxes in place
+                return lambda: mask_gen._scale(detections.select(slice(None)), masks, (2.0, 2.0), size)
+
+            def setup_rle(size=size, n=n):
+                masks = CroppedMasks.from_dense(make_masks(size, make_boxes(size, n)))
+                return lambda: masks.to_rles()
+
+            cases += [
+                Case("MaskGenerator._scale", setup_scale, params, items=n),
+                Case("CroppedMasks.to_rles", setup_rle, params, items=n),
+            ]
+    return cases
+
+
+def runner_cases(sizes: Dict[str, Tuple[int, int]]) -> List[Case]:
+    """End-to-end core classes on the fake runners: everything but the model itself."""
+    cases = []
+    for size_name, size in sizes.items():
+        params = {"size": size_name, "runners": "fake"}
+
+        def setup_generate(size=size):
+            mask_gen = _mask_generator()
+            image = make_image(size)
+            return lambda: mask_gen.generate(image, conf=0.25, prompt=["person"])
+
+        def setup_fused(size=size):
+            from sceneflow.core.mask_generator import MaskGenerator
+
+            register_fakes()
+            mask_gen = MaskGenerator.from_pretrained(["fake_seg_detector"], [], None)
+            image = make_image(size)
+            return lambda: mask_gen.generate(image, conf=0.25)
+
+        def setup_tiled(size=size):
+            from sceneflow.core.mask_generator import MaskGenerator
+
+            # Fused fake masks: the fakes give 10 boxes per tile, which a dense fake segmentor would dominate
+            register_fakes()
+            mask_gen = MaskGenerator.from_pretrained(["fake_seg_detector"], [], None, tile_size=640, tile_overlap=0.2)
+            image = make_image(size)
+            return lambda: mask_gen.generate(image, conf=0.25)
+
+        def setup_remove(size=size):
+            from sceneflow.core.remover import Remover
+
+            register_fakes()
+            remover = Remover(inpainter="fake_inpainter")
+            image = make_image(size)
+            masks = CroppedMasks.from_dense(make_masks(size, make_boxes(size, 10)))
+            return lambda: remover.remove(image.copy(), masks)
+
+        def setup_ocr(size=size):
+            from sceneflow.core.ocr_processor import OCRProcessor
+
+            register_fakes()
+            processor = OCRProcessor.from_pretrained(["fake_text"])
+            image = make_image(size)
+            return lambda: processor.process_batch([image], scales=[(2.0, 2.0)])
+
+        cases += [
+            Case("MaskGenerator.generate", setup_generate, params),
+            Case("MaskGenerator.generate", setup_fused, {"size": size_name, "runners": "fake-fused"}),
+            Case("MaskGenerator.generate", setup_tiled, {"size": size_name, "runners": "fake-tiled"}),
+            Case("Remover.remove", setup_remove, params),
+            Case("OCRProcessor.process_batch", setup_ocr, params),
+        ]
+
+        for max_batch_size in (1, 8):
+
+            def setup_batched(size=size, max_batch_size=max_batch_size):
+                from sceneflow.pipelines._batcher import MicroBatcher
+
+                # 8 concurrent `sceneflow serve` requests, answered by one worker in batches
+                mask_gen = _mask_generator()
+                batcher = MicroBatcher(
+                    lambda key, images: mask_gen.generate_batch(images, conf=0.25, prompt=["person"]),
+                    max_batch_size=max_batch_size,
+                    max_wait_ms=5.0,
+                )
+                images = [make_image(size) for _ in range(8)]
+                return lambda: [future.result() for future in [batcher.submit(image) for image in images]]
+
+            cases.append(Case("MicroBatcher.submit", setup_batched, {**params, "batch": max_batch_size}, items=8))
+    return cases
+
+
+def io_cases(sizes: Dict[str, Tuple[int, int]]) -> List[Case]:
+    cases = []
+    for size_name, size in sizes.items():
+        for ext in (".jpg", ".png"):
+
+            def setup_load(size=size, ext=ext, size_name=size_name):
+                path = Path(_TMP.name) / f"load_{size_name}{ext}"
+                save_image(make_image(size), path)
+                return lambda: load_image(path)
+
+            def setup_save(size=size, ext=ext, size_name=size_name):
+                image = make_image(size)
+                path = Path(_TMP.name) / f"save_{size_name}{ext}"
+                return lambda: save_image(image, path)
+
+            cases += [
+                Case("load_image", setup_load, {"size": size_name, "format": ext[1:]}),
+                Case("save_image", setup_save, {"size": size_name, "format": ext[1:]}),
+            ]
+    return cases
+
+
+# Cold-start budget: `sceneflow [<command>] --help` must not import any of these
+CLI_FORBIDDEN_IMPORTS = (
+    "torch",
+    "ultralytics",
+    "transformers",
+    "mmocr",
+    "mmengine",
+    "segment_anything",
+    "saicinpainting",
+)
+_CLI_HELP = f"""
+import sys
+import tempfile
+from sceneflow.cli import cli
+try:
+    cli(sys.argv[1:])
+except SystemExit:
+    pass
+sys.exit(" ".join(m for m in {CLI_FORBIDDEN_IMPORTS!r} if m in sys.modules) or None)
+"""
+
+
+def cli_cases() -> List[Case]:
+    cases = []
+    for command in ["", "redact", "masks", "render", "remove", "ocr-detect", "serve"]:
+
+        def setup(command=command):
+            argv = [*command.split(), "--help"]
+
+            def run():
+                # A fresh interpreter per call: nothing is imported yet
+                proc = subprocess.run([sys.executable, "-c", _CLI_HELP, *argv], capture_output=True, text=True)
+                if proc.returncode != 0:
+                    raise RuntimeError(f"'sceneflow {' '.join(argv)}' imported {proc.stderr.strip()}")
+
+            return run
+
+        cases.append(Case("cli.cold_start", setup, {"command": command or "-"}))
+    return cases
+
+
+def all_cases(sizes: Sequence[str] = tuple(IMAGE_SIZES), counts: Sequence[int] = (1, 10, 50)) -> List[Case]:
+    sizes = {name: IMAGE_SIZES[name] for name in sizes}
+    return (
+        camouflage_cases(sizes, counts)
+        + draw_cases(sizes, counts)
+        + mask_generator_cases(sizes, counts)
+        + runner_cases(sizes)
+        + io_cases(sizes)
+        + cli_cases()
+    )
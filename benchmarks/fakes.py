@@ -0,0 +1,135 @@
+"""Synthetic images and deterministic fake runners, so benchmarks need no weights or network."""
+
+import zlib
+from typing import Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from sceneflow.runners._factory import DETECTORS, INPAINTERS, OVD_DETECTORS, SEGMENTORS, TEXT_DETECTORS
+from sceneflow.runners._helpers import DetectionBatch, ModelRunner
+from sceneflow.utils.masks import CroppedMasks
+
+IMAGE_SIZES = {
+    "480p": (480, 640),
+    "1080p": (1080, 1920),
+    "4k": (2160, 3840),
+}
+
+
+def make_image(size: Tuple[int, int], seed: int = 0) -> np.ndarray:
+    """Smooth gradients plus noise: compresses like a photo, unlike pure noise or a flat image."""
+    h, w = size
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    base = np.stack([xx / w, yy / h, (xx + yy) / (w + h)], axis=-1) * 200
+    noise = rng.normal(0, 12, (h, w, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def make_boxes(size: Tuple[int, int], n: int, seed: int = 0) -> np.ndarray:
+    """*n* boxes covering 2-25% of the image side each, as an ``(n, 4)`` float32 xyxy array."""
+    h, w = size
+    rng = np.random.default_rng(seed)
+    bw = rng.uniform(0.02, 0.25, n) * w
+    bh = rng.uniform(0.02, 0.25, n) * h
+    x0 = rng.uniform(0, w - bw)
+    y0 = rng.uniform(0, h - bh)
+    return np.stack([x0, y0, x0 + bw, y0 + bh], axis=1).astype(np.float32)
+
+
+def make_masks(size: Tuple[int, int], boxes: np.ndarray) -> np.ndarray:
+    """One filled ellipse per box, as an ``(N, H, W)`` uint8 array of 0/1."""
+    masks = np.zeros((len(boxes), *size), dtype=np.uint8)
+    for mask, (x0, y0, x1, y1) in zip(masks, boxes):
+        center = (int((x0 + x1) / 2), int((y0 + y1) / 2))
+        axes = (max(1, int((x1 - x0) / 2)), max(1, int((y1 - y0) / 2)))
+        cv2.ellipse(mask, center, axes, 0, 0, 360, 1, thickness=-1)
+    return masks
+
+
+def make_detections(size: Tuple[int, int], n: int, seed: int = 0, with_rle: bool = True) -> DetectionBatch:
+    """*n* person detections, with RLE segmentations like the ones `MaskGenerator` returns."""
+    boxes = make_boxes(size, n, seed)
+    return DetectionBatch(
+        boxes=boxes,
+        scores=np.random.default_rng(seed).uniform(0.3, 1.0, n),
+        class_ids=np.zeros(n),
+        class_names=["person"] * n,
+        segmentations=CroppedMasks.from_dense(make_masks(size, boxes)).to_rles() if with_rle else None,
+    )
+
+
+class FakeDetector(ModelRunner):
+    """Returns the same boxes for the same image size, seeded by the runner name."""
+
+    def __init__(self, model_name: str, device: str = "cpu", num_detections: int = 10):
+        self.num_detections = num_detections
+        super().__init__(model_name, device=device)
+
+    def _load_model(self):
+        self._model = zlib.crc32(self.model_name.encode())
+
+    def run(self, image: np.ndarray, conf: float = 0.25, texts: Sequence[str] = None, **kwargs) -> DetectionBatch:
+        detections = make_detections(image.shape[:2], self.num_detections, seed=self.model, with_rle=False)
+        if texts:
+            detections.class_names = [texts[i % len(texts)] for i in range(len(detections))]
+        return detections.select(detections.scores >= conf)
+
+
+class FakeSegDetector(FakeDetector):
+    """Single-pass detector that also returns the masks, like the ultralytics ``-seg`` models."""
+
+    def run(self, image: np.ndarray, conf: float = 0.25, **kwargs) -> DetectionBatch:
+        detections = super().run(image, conf=conf)
+        detections.masks = CroppedMasks.from_dense(make_masks(image.shape[:2], detections.boxes))
+        return detections
+
+
+class FakeSegmentor(ModelRunner):
+    """Segments every box as the ellipse inscribed in it."""
+
+    def _load_model(self):
+        self._model = True
+
+    def run(self, image: np.ndarray, detections: DetectionBatch, **kwargs) -> np.ndarray:
+        return make_masks(image.shape[:2], detections.boxes)
+
+
+class FakeInpainter(ModelRunner):
+    """Fills the masked pixels with the mean colour of the image."""
+
+    def _load_model(self):
+        self._model = True
+
+    def run(self, image: np.ndarray, mask: np.ndarray, **kwargs) -> np.ndarray:
+        out = image.copy()
+        out[mask > 0] = image.reshape(-1, image.shape[-1]).mean(axis=0).astype(image.dtype)
+        return out
+
+
+class FakeTextDetector(FakeDetector):
+    def run(self, image: np.ndarray, conf: float = 0.0, **kwargs) -> DetectionBatch:
+        detections = super().run(image, conf=conf)
+        detections.class_names = ["text"] * len(detections)
+        detections.texts = ["lorem ipsum"] * len(detections)
+        return detections
+
+
+def register_fakes():
+    """
+    Register ``fake_detector``, ``fake_seg_detector``, ``fake_ovd``, ``fake_segmentor``,
+    ``fake_inpainter`` and ``fake_text``.
+    """
+    for registry, name, cls, meta in [
+        (DETECTORS, "fake_detector", FakeDetector, None),
+        (DETECTORS, "fake_seg_detector", FakeSegDetector, {"masks": True}),
+        (OVD_DETECTORS, "fake_ovd", FakeDetector, None),
+        (SEGMENTORS, "fake_segmentor", FakeSegmentor, None),
+        (INPAINTERS, "fake_inpainter", FakeInpainter, None),
+        (TEXT_DETECTORS, "fake_text", FakeTextDetector, None),
+    ]:
+        if not registry.has(name):
+            registry.register(name, meta=meta)(
+                lambda name=name, cls=cls, device="cpu", **kwargs: cls(name, device=device, **kwargs)
+            )
@@ -0,0 +1,135 @@
+"""Timing, peak-memory measurement and JSON reports for the benchmark cases."""
+
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class Case:
+    """
+    One benchmark: *setup* builds the inputs once and returns the callable to time.
+
+    *items* is the number of units (images, masks, boxes) one call processes, used for throughput.
+    """
+
+    name: str
+    setup: Callable[[], Callable[[], Any]]
+    params: Dict[str, Any] = field(default_factory=dict)
+    items: int = 1
+
+    @property
+    def id(self) -> str:
+        if not self.params:
+            return self.name
+        return self.name + "[" + ",".join(f"{k}={v}" for k, v in self.params.items()) + "]"
+
+
+def measure(case: Case, min_time: float = 0.5, min_repeats: int = 5, max_repeats: int = 10_000) -> Dict[str, Any]:
+    """
+    Time *case* for at least *min_repeats* calls and *min_time* seconds, then trace its peak memory.
+
+    Peak memory covers what tracemalloc sees (Python objects and numpy arrays, including the ones
+    OpenCV returns), not OpenCV's internal scratch buffers.
+    """
+    fn = case.setup()
+    fn()  # warm-up: lazy imports, caches, allocator
+
+    gc.collect()
+    gc.disable()
+    try:
+        times: List[float] = []
+        t_end = time.perf_counter() + min_time
+        while len(times) < min_repeats or (time.perf_counter() < t_end and len(times) < max_repeats):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    finally:
+        gc.enable()
+
+    # Separate run: tracing slows allocations down and must not skew the timings
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    t = np.array(times) * 1000
+    return {
+        "id": case.id,
+        "name": case.name,
+        "params": case.params,
+        "repeats": len(times),
+        "mean_ms": round(float(t.mean()), 4),
+        "median_ms": round(float(np.median(t)), 4),
+        "min_ms": round(float(t.min()), 4),
+        "p95_ms": round(float(np.percentile(t, 95)), 4),
+        "items_per_sec": round(case.items / (float(np.median(t)) / 1000), 2),
+        "peak_mem_mb": round(peak / 1024**2, 3),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit or None,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def save_report(results: List[Dict[str, Any]], path: Path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: Path, threshold: float = 1.2) -> List[Dict[str, Any]]:
+    """
+    Compare median times against a previous report.
+
+    Returns one row per case present in both, flagged ``regression`` when it got slower than
+    *threshold* times the baseline.
+    """
+    with open(baseline_path) as f:
+        baseline = {r["id"]: r for r in json.load(f)["results"]}
+
+    rows = []
+    for r in results:
+        base: Optional[Dict[str, Any]] = baseline.get(r["id"])
+        if base is None:
+            continue
+        ratio = r["median_ms"] / max(base["median_ms"], 1e-9)
+        rows.append(
+            {
+                "id": r["id"],
+                "baseline_ms": base["median_ms"],
+                "median_ms": r["median_ms"],
+                "ratio": round(ratio, 3),
+                "regression": ratio > threshold,
+            }
+        )
+    return rows
@@ -1,17 +1,49 @@
+import importlib
+
 import click
 
-from .ocr_cli import ocr_cli
-from .redact_cli import redact_cli
-from .remove_cli import remove_cli
+
+class LazyGroup(click.Group):
+    """Click group that imports a sub-command module only when that command is invoked."""
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, name):
+        if name in self.lazy_commands:
+            module_name, attr = self.lazy_commands[name].split(":")
+            return getattr(importlib.import_module(module_name), attr)
+        return super().get_command(ctx, name)
 
 
-@click.group(context_settings={"help_option_names": ["-h", "--help"]})
+def parse_stage_workers(ctx, param, value):
+    """Click callback turning repeated ``NAME=N`` values into a ``{stage: threads}`` dict."""
+    from sceneflow.pipelines._common import parse_stage_workers
+
+    try:
+        return parse_stage_workers(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+
+
+# Add sub-commands below as "module:command". Command modules import their pipeline inside the
+# command function, so that --help and option parsing do not pay for torch and the model backends
+@click.group(
+    cls=LazyGroup,
+    lazy_commands={
+        "redact": "sceneflow.cli.redact_cli:redact_cli",
+        "ocr-detect": "sceneflow.cli.ocr_cli:ocr_cli",
+        "remove": "sceneflow.cli.remove_cli:remove_cli",
+        "masks": "sceneflow.cli.masks_cli:masks_cli",
+        "render": "sceneflow.cli.render_cli:render_cli",
+        "serve": "sceneflow.cli.serve_cli:serve_cli",
+    },
+    context_settings={"help_option_names": ["-h", "--help"]},
+)
 def cli():
     """SceneFlow CLI."""
     pass
-
-
-# Add sub-commands below
-cli.add_command(redact_cli, name="redact")
-cli.add_command(ocr_cli, name="ocr-detect")
-cli.add_command(remove_cli, name="remove")
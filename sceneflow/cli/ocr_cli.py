@@ -2,7 +2,7 @@ from pathlib import Path
 
 import click
 
-from sceneflow.pipelines.ocr import detect_text_boxes
+from sceneflow.cli import parse_stage_workers
 from sceneflow.runners._factory import TEXT_DETECTORS
 
 
@@ -11,19 +11,99 @@ from sceneflow.runners._factory import TEXT_DETECTORS
 @click.option("--output-dir", required=True, type=click.Path(), help="Directory to save outputs")
 @click.option(
     "--text-detector",
+    multiple=True,
     type=click.Choice(TEXT_DETECTORS.list_models()),
-    default="mmocr_dbnet_abinet",
+    default=("mmocr_dbnet_abinet",),
     show_default=True,
-    help="Text detector to use for OCR",
+    help="Text detector(s) to use for OCR (repeatable, results are merged)",
 )
 @click.option("--det-thd", default=0.5, type=float, show_default=True, help="Detection confidence threshold")
 @click.option("--resize", type=(int, int), default=None, help="Resize images to (width, height)")
-def ocr_cli(input_dir, output_dir, text_detector, det_thd, resize):
+@click.option(
+    "--tile-size",
+    type=int,
+    default=None,
+    help="Detect on overlapping tiles of this many pixels, for very large images (off by default).",
+)
+@click.option(
+    "--tile-overlap", default=0.2, type=float, show_default=True, help="Overlap between tiles, as a fraction."
+)
+@click.option(
+    "--prefetch",
+    default=4,
+    type=int,
+    show_default=True,
+    help="Images decoded ahead in background threads (0 decodes them inline).",
+)
+@click.option(
+    "--writers",
+    default=2,
+    type=int,
+    show_default=True,
+    help="Threads saving the PNG/JSON outputs (0 saves them inline).",
+)
+@click.option(
+    "--workers", default=1, type=int, show_default=True, help="Worker processes, each loading its own models."
+)
+@click.option(
+    "--stage-workers",
+    multiple=True,
+    metavar="NAME=N",
+    callback=parse_stage_workers,
+    help="Threads of one pipeline stage in single-process runs, e.g. save=4 (repeatable).",
+)
+@click.option("--profile", is_flag=True, help="Write a Chrome trace and cProfile/torch profiles to OUTPUT_DIR/profile.")
+@click.option(
+    "--profile-window",
+    type=(int, int),
+    default=(2, 20),
+    show_default=True,
+    metavar="SKIP COUNT",
+    help="Images skipped for warm-up, then images profiled.",
+)
+@click.option(
+    "--concurrent-detectors",
+    is_flag=True,
+    help="Run the detectors of the ensemble side by side, splitting torch's threads between them.",
+)
+@click.option("--resume", is_flag=True, help="Skip images already completed with the same settings.")
+@click.option("--batch-size", default=1, type=int, show_default=True, help="Images per detector call.")
+def ocr_cli(
+    input_dir,
+    output_dir,
+    text_detector,
+    det_thd,
+    resize,
+    tile_size,
+    tile_overlap,
+    prefetch,
+    writers,
+    workers,
+    stage_workers,
+    profile,
+    profile_window,
+    batch_size,
+    resume,
+    concurrent_detectors,
+):
     """Run OCR-based text detection on a folder of images."""
+    from sceneflow.pipelines.ocr import detect_text_boxes
+
     detect_text_boxes(
         input_dir=Path(input_dir),
         output_dir=Path(output_dir),
         text_detector=text_detector,
         det_thd=det_thd,
         resize=resize,
+        tile_size=tile_size,
+        tile_overlap=tile_overlap,
+        prefetch=prefetch,
+        writers=writers,
+        workers=workers,
+        stage_workers=stage_workers,
+        profile=profile,
+        profile_window=profile_window,
+        batch_size=batch_size,
+        resume=resume,
+        concurrent_detectors=concurrent_detectors,
     )
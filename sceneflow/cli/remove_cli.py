@@ -2,7 +2,7 @@ from pathlib import Path
 
 import click
 
-from sceneflow.pipelines.remove import remove_objects_with_prompts
+from sceneflow.cli import parse_stage_workers
 from sceneflow.runners._factory import INPAINTERS, OVD_DETECTORS, SEGMENTORS
 
 
@@ -36,8 +36,90 @@ from sceneflow.runners._factory import INPAINTERS, OVD_DETECTORS, SEGMENTORS
 @click.option("--det-thd", default=0.25, type=float, show_default=True, help="Detection confidence threshold.")
 @click.option("--nms-iou", default=0.0, type=float, show_default=True, help="NMS IoU threshold.")
 @click.option("--resize", type=(int, int), default=None, help="Resize images to (width height).")
+@click.option(
+    "--tile-size",
+    type=int,
+    default=None,
+    help="Detect on overlapping tiles of this many pixels, for very large images (off by default).",
+)
+@click.option(
+    "--tile-overlap", default=0.2, type=float, show_default=True, help="Overlap between tiles, as a fraction."
+)
+@click.option(
+    "--detect-size",
+    type=int,
+    default=None,
+    help="Longest side, in pixels, of the image copy the detectors see (default: the loaded image).",
+)
+@click.option(
+    "--segment-size",
+    type=int,
+    default=None,
+    help="Longest side, in pixels, of the image copy SAM segments; boxes are mapped across.",
+)
+@click.option(
+    "--prefetch",
+    default=4,
+    type=int,
+    show_default=True,
+    help="Images decoded ahead in background threads (0 decodes them inline).",
+)
+@click.option(
+    "--writers",
+    default=2,
+    type=int,
+    show_default=True,
+    help="Threads saving the PNG/JSON outputs (0 saves them inline).",
+)
+@click.option(
+    "--workers", default=1, type=int, show_default=True, help="Worker processes, each loading its own models."
+)
+@click.option(
+    "--stage-workers",
+    multiple=True,
+    metavar="NAME=N",
+    callback=parse_stage_workers,
+    help="Threads of one pipeline stage in single-process runs, e.g. save=4 (repeatable).",
+)
+@click.option("--profile", is_flag=True, help="Write a Chrome trace and cProfile/torch profiles to OUTPUT_DIR/profile.")
+@click.option(
+    "--profile-window",
+    type=(int, int),
+    default=(2, 20),
+    show_default=True,
+    metavar="SKIP COUNT",
+    help="Images skipped for warm-up, then images profiled.",
+)
+@click.option("--resume", is_flag=True, help="Skip images already completed with the same settings.")
+@click.option("--batch-size", default=1, type=int, show_default=True, help="Images per detector call.")
+@click.option("--cache-dir", type=click.Path(), default=None, help="Reuse detections/masks cached in this folder.")
+@click.option("--cache-max-gb", default=10.0, type=float, show_default=True, help="Size limit of the mask cache.")
+@click.option(
+    "--embedding-cache-dir",
+    type=click.Path(),
+    default=None,
+    help="Keep SAM image embeddings in this folder, shared by later runs on the same images.",
+)
+@click.option(
+    "--embedding-cache-max-gb", default=20.0, type=float, show_default=True, help="Size limit of the embedding cache."
+)
+@click.option("--sam-max-boxes", type=int, default=None, help="Box prompts per SAM decoder call [default: 64].")
+@click.option(
+    "--sam-min-area",
+    type=float,
+    default=None,
+    help="Detections with a smaller box (in pixels) skip SAM and get --small-object-mask.",
+)
+@click.option(
+    "--small-object-mask",
+    type=click.Choice(["box", "ellipse"]),
+    default=None,
+    help="Mask given to detections under --sam-min-area [default: box].",
+)
 def remove_cli(**kwargs):
     """Run OVD detection + SAM seg + LaMa inpainting to remove objects from images using prompts."""
+    from sceneflow.pipelines.remove import remove_objects_with_prompts
+
     kwargs = {k: Path(v) if isinstance(v, click.Path) else v for k, v in kwargs.items()}
 
     remove_objects_with_prompts(**kwargs)
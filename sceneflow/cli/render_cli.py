@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import click
+
+from sceneflow.cli import parse_stage_workers
+from sceneflow.core.camouflage import AVAILABLE_CAMOUFLAGE_METHODS
+from sceneflow.pipelines.render import RENDER_OUTPUTS, render
+
+
+@click.command(name="render")
+@click.option("--store", required=True, type=click.Path(exists=True), help="Mask store folder or masks.sqlite file")
+@click.option("--output-dir", required=True, type=click.Path())
+@click.option("--input-dir", type=click.Path(exists=True), default=None, help="Override the image folder of the store")
+@click.option(
+    "--camouflage-method", type=click.Choice(AVAILABLE_CAMOUFLAGE_METHODS), default="solid", show_default=True
+)
+@click.option(
+    "--outputs",
+    multiple=True,
+    type=click.Choice(RENDER_OUTPUTS),
+    default=RENDER_OUTPUTS,
+    show_default=True,
+    help="Artefacts to render",
+)
+@click.option(
+    "--prefetch",
+    default=4,
+    type=int,
+    show_default=True,
+    help="Images decoded ahead in background threads (0 decodes them inline).",
+)
+@click.option(
+    "--writers",
+    default=2,
+    type=int,
+    show_default=True,
+    help="Threads saving the PNG/JSON outputs (0 saves them inline).",
+)
+@click.option("--workers", default=None, type=int, help="Worker processes  [default: all cores]")
+@click.option(
+    "--stage-workers",
+    multiple=True,
+    metavar="NAME=N",
+    callback=parse_stage_workers,
+    help="Threads of one pipeline stage in single-process runs, e.g. save=4 (repeatable).",
+)
+@click.option("--profile", is_flag=True, help="Write a Chrome trace and cProfile/torch profiles to OUTPUT_DIR/profile.")
+@click.option(
+    "--profile-window",
+    type=(int, int),
+    default=(2, 20),
+    show_default=True,
+    metavar="SKIP COUNT",
+    help="Images skipped for warm-up, then images profiled.",
+)
+@click.option("--resume", is_flag=True, help="Skip images already completed with the same settings.")
+def render_cli(**kwargs):
+    """Apply camouflage / overlays / static-scene masks from a mask store, without loading any model."""
+    kwargs = {k: Path(v) if isinstance(v, click.Path) else v for k, v in kwargs.items()}
+    render(**kwargs)
@@ -0,0 +1,135 @@
+import click
+
+from sceneflow.core.camouflage import AVAILABLE_CAMOUFLAGE_METHODS
+from sceneflow.runners._factory import INPAINTERS, OVD_DETECTORS, SEGMENTORS, TEXT_DETECTORS
+
+
+@click.command(name="serve")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to bind, loopback only by default.")
+@click.option("--port", default=8080, type=int, show_default=True, help="Port to listen on (0 picks a free one).")
+@click.option(
+    "--endpoints",
+    multiple=True,
+    type=click.Choice(["redact", "ocr", "remove"]),
+    default=("redact",),
+    show_default=True,
+    help="Endpoints to enable (repeatable); only their models are loaded.",
+)
+@click.option(
+    "--detectors",
+    multiple=True,
+    default=("rtdetr_l", "yolo11x"),
+    show_default=True,
+    help="Closed-vocabulary detector model names (redact)",
+)
+@click.option(
+    "--ovd-detectors",
+    multiple=True,
+    default=("owlvit_base",),
+    help="Open-vocabulary detector model names ('none' to disable) (redact)",
+)
+@click.option(
+    "--segmentor",
+    type=click.Choice(SEGMENTORS.list_models() + ["none"]),
+    default="sam_l",
+    show_default=True,
+    help="SAM for quality masks, or 'none' to keep the masks of -seg detectors (redact).",
+)
+@click.option("--nms-iou", default=0.7, type=float, show_default=True)
+@click.option("--det-thd", default=0.4, type=float, show_default=True, help="Default ?conf= of /redact")
+@click.option("--allowed-classes", default=None, help="Default ?classes= of /redact, comma-separated")
+@click.option(
+    "--camouflage-method",
+    type=click.Choice(AVAILABLE_CAMOUFLAGE_METHODS),
+    default="solid",
+    show_default=True,
+    help="Default ?method= of /redact",
+)
+@click.option(
+    "--text-detectors",
+    multiple=True,
+    type=click.Choice(TEXT_DETECTORS.list_models()),
+    default=("mmocr_dbnet_abinet",),
+    show_default=True,
+    help="Text detector(s) of /ocr (repeatable, results are merged)",
+)
+@click.option("--ocr-thd", default=0.5, type=float, show_default=True, help="Default ?conf= of /ocr")
+@click.option(
+    "--ovd-detector",
+    type=click.Choice(OVD_DETECTORS.list_models()),
+    default="owlvit_base",
+    show_default=True,
+    help="Open-vocabulary detector of /remove.",
+)
+@click.option(
+    "--remove-segmentor",
+    type=click.Choice(SEGMENTORS.list_models()),
+    default="sam_h",
+    show_default=True,
+    help="Segmentor of /remove.",
+)
+@click.option(
+    "--inpainter",
+    type=click.Choice(INPAINTERS.list_models()),
+    default="big_lama",
+    show_default=True,
+    help="Inpainter of /remove.",
+)
+@click.option("--prompt", default=None, help="Default ?prompt= of /remove, comma-separated class names")
+@click.option("--remove-thd", default=0.25, type=float, show_default=True, help="Default ?conf= of /remove")
+@click.option(
+    "--tile-size",
+    type=int,
+    default=None,
+    help="Detect on overlapping tiles of this many pixels, for very large images (off by default).",
+)
+@click.option(
+    "--detect-size",
+    type=int,
+    default=None,
+    help="Longest side, in pixels, of the image copy the detectors see (default: the posted image).",
+)
+@click.option(
+    "--segment-size",
+    type=int,
+    default=None,
+    help="Longest side, in pixels, of the image copy SAM segments; boxes are mapped across.",
+)
+@click.option("--sam-max-boxes", type=int, default=None, help="Box prompts per SAM decoder call [default: 64].")
+@click.option(
+    "--sam-min-area",
+    type=float,
+    default=None,
+    help="Detections with a smaller box (in pixels) skip SAM and get --small-object-mask.",
+)
+@click.option(
+    "--small-object-mask",
+    type=click.Choice(["box", "ellipse"]),
+    default=None,
+    help="Mask given to detections under --sam-min-area [default: box].",
+)
+@click.option("--max-batch-size", default=8, type=int, show_default=True, help="Requests per batched detector call.")
+@click.option(
+    "--max-wait-ms",
+    default=10.0,
+    type=float,
+    show_default=True,
+    help="Longest a request waits for others to share its batch.",
+)
+@click.option(
+    "--max-queue",
+    default=64,
+    type=int,
+    show_default=True,
+    help="Requests waiting per endpoint before new ones get 503 Retry-After.",
+)
+@click.option(
+    "--replicas", default=1, type=int, show_default=True, help="Copies of each model, i.e. batches run at once."
+)
+@click.option("--request-timeout", default=60.0, type=float, show_default=True, help="Seconds before a 504.")
+@click.option("--max-body-mb", default=50.0, type=float, show_default=True, help="Largest image accepted, in MB.")
+def serve_cli(**kwargs):
+    """Load the models once and serve redact/ocr/remove over HTTP, batching concurrent requests."""
+    from sceneflow.pipelines.serve import serve
+
+    serve(**kwargs)
@@ -1,7 +1,22 @@
-from .camouflage import Camouflage
-from .mask_generator import MaskGenerator
+import importlib
+
+# Resolved on first access so that model-free users (e.g. rendering) do not import torch
+_LAZY_IMPORTS = {
+    "MaskGenerator": ".mask_generator",
+    "Camouflage": ".camouflage",
+    "MaskCache": ".mask_cache",
+    "MaskStore": ".mask_store",
+}
 
 __all__ = [
     "MaskGenerator",
     "Camouflage",
+    "MaskCache",
+    "MaskStore",
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,69 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+from sceneflow.utils.timing import timed
+
+
+def _limit_threads(num_threads: int, default: int):
+    # With torch's default OpenMP backend the intra-op thread count is per calling thread, but the
+    # call also sets the count threads get on their first torch op: that default is put back from a
+    # throwaway thread, so SAM, the inpainter and the other stages keep theirs
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
+    # Initialise this thread's count first, torch would otherwise reset it from the default on first use
+    torch.get_num_threads()
+    torch.set_num_threads(num_threads)
+    restore = threading.Thread(target=torch.set_num_threads, args=(default,))
+    restore.start()
+    restore.join()
+
+
+class Ensemble:
+    """
+    Runs the members of a model ensemble on the same input, one after the other or side by side.
+
+    With *concurrent*, each runner gets its own thread (torch, ONNX and OpenCV release the GIL) and
+    the torch intra-op threads of the caller are split evenly between them, so an ensemble costs
+    about as much as its slowest member instead of the sum without oversubscribing the cores.
+    Results always come back in runner order.
+    """
+
+    def __init__(self, runners: Sequence[Any], concurrent: bool = False):
+        self.runners = list(runners)
+        self.concurrent = concurrent and len(self.runners) > 1
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            torch = sys.modules.get("torch")
+            total = torch.get_num_threads() if torch is not None else 1
+            self._pool = ThreadPoolExecutor(
+                max_workers=len(self.runners),
+                thread_name_prefix="sceneflow-ensemble",
+                initializer=_limit_threads,
+                initargs=(max(1, total // len(self.runners)), total),
+            )
+        return self._pool
+
+    def map(self, fn: Callable[[Any], Any], runners: Optional[Sequence[Any]] = None) -> List[Any]:
+        """Return ``[fn(runner) for runner in runners]``, timing each call under the runner's name."""
+        runners = self.runners if runners is None else list(runners)
+
+        def _call(runner):
+            with timed(runner.model_name, group="models"):
+                return fn(runner)
+
+        if not self.concurrent or len(runners) <= 1:
+            return [_call(runner) for runner in runners]
+        return list(self._get_pool().map(_call, runners))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __len__(self) -> int:
+        return len(self.runners)
@@ -0,0 +1,81 @@
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+from torchvision.ops import nms
+
+from sceneflow.runners._helpers import Detection, DetectionBatch
+
+# (image index, x0, y0) of each input given to the detectors
+TileOrigin = Tuple[int, int, int]
+
+
+def tile_starts(length: int, tile_size: int, overlap: float) -> List[int]:
+    """Start offsets of tiles covering *length* pixels, the last one flush with the end."""
+    if length <= tile_size:
+        return [0]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    starts = list(range(0, length - tile_size, stride))
+    return starts + [length - tile_size]
+
+
+def split_tiles(
+    images: Sequence[np.ndarray], tile_size: int, overlap: float = 0.2, full_frame: bool = True
+) -> Tuple[List[np.ndarray], List[TileOrigin]]:
+    """
+    Cut each image into overlapping *tile_size* squares.
+
+    With *full_frame* the whole image is kept as well, so objects larger than a tile are still
+    detected in one piece. Images that fit in one tile are passed through as they are.
+    """
+    inputs, origins = [], []
+    for i, image in enumerate(images):
+        height, width = image.shape[:2]
+        if height <= tile_size and width <= tile_size:
+            inputs.append(image)
+            origins.append((i, 0, 0))
+            continue
+
+        if full_frame:
+            inputs.append(image)
+            origins.append((i, 0, 0))
+        for y0 in tile_starts(height, tile_size, overlap):
+            for x0 in tile_starts(width, tile_size, overlap):
+                inputs.append(np.ascontiguousarray(image[y0 : y0 + tile_size, x0 : x0 + tile_size]))
+                origins.append((i, x0, y0))
+    return inputs, origins
+
+
+def merge_tiles(
+    batches: Sequence[Union[DetectionBatch, Sequence[Detection]]],
+    origins: Sequence[TileOrigin],
+    sizes: Sequence[Tuple[int, int]],
+    nms_iou: Optional[float] = None,
+) -> List[DetectionBatch]:
+    """
+    Shift the detections of each tile back to image coordinates and concatenate them per image.
+
+    With *nms_iou*, duplicates from overlapping tiles are suppressed per image.
+    """
+    per_image: List[List[DetectionBatch]] = [[] for _ in sizes]
+    for batch, (i, x0, y0) in zip(batches, origins):
+        if len(batch) > 0:
+            per_image[i].append(DetectionBatch.from_detections(batch).translate_((x0, y0), sizes[i]))
+
+    merged = [DetectionBatch.concat(parts) for parts in per_image]
+    if nms_iou is not None:
+        merged = [nms_detections(detections, nms_iou) for detections in merged]
+    return merged
+
+
+def nms_detections(detections: DetectionBatch, nms_iou: float = 0.5) -> DetectionBatch:
+    """Class-agnostic non-maximum suppression."""
+    if len(detections) == 0:
+        return detections
+
+    keep = nms(
+        torch.from_numpy(detections.boxes),
+        torch.from_numpy(detections.scores).float(),
+        iou_threshold=nms_iou,
+    )
+    return detections.select(keep.numpy())
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from functools import partial
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
 import cv2
 import numpy as np
 
+from sceneflow.utils.masks import CroppedMasks
+from sceneflow.utils.timing import timed
+
 AVAILABLE_CAMOUFLAGE_METHODS = {
     "telea",
     "ns",
@@ -106,6 +109,36 @@ class Camouflage:
 
         raise ValueError(f"Unknown method '{self.method}'. Allowed: {list(self._defaults)}")
 
+    def _margin(self) -> Optional[int]:
+        """
+        How far outside the masks a method reads pixels, so it can run on the masked region plus that
+        margin with the same result. ``None`` when it needs the whole frame (mosaic's block grid).
+        """
+        if self.method in ("telea", "ns"):
+            return self.cfg[self.method]["radius"] + 2
+        if self.method == "median":
+            return self.cfg["median"]["kernel"] // 2
+        if self.method == "blur":
+            return self.cfg["blur"]["ksize"] // 2
+        if self.method in ("solid", "noise"):
+            return 0
+        return None
+
+    def _hide_cropped(self, image: np.ndarray, masks: CroppedMasks) -> np.ndarray:
+        margin = self._margin()
+        if margin is None:
+            return self._runner(image, masks.union() * 255)
+
+        x0, y0, x1, y1 = masks.extent()
+        if x1 <= x0 or y1 <= y0:
+            return image.copy()
+
+        h, w = image.shape[:2]
+        x0, y0, x1, y1 = max(0, x0 - margin), max(0, y0 - margin), min(w, x1 + margin), min(h, y1 + margin)
+        out = image.copy()
+        out[y0:y1, x0:x1] = self._runner(image[y0:y1, x0:x1], masks.union((x0, y0, x1, y1)) * 255)
+        return out
+
     @staticmethod
     def _norm_mask(mask: np.ndarray) -> np.ndarray:
         """Normalise mask to 0-255 uint8."""
@@ -115,18 +148,24 @@ class Camouflage:
             mask = mask * 255
         return mask.astype(np.uint8)
 
+    @timed("camouflage")
     def hide(
         self,
         image: np.ndarray,
-        masks: Union[np.ndarray, List[np.ndarray]],
+        masks: Union[CroppedMasks, np.ndarray, List[np.ndarray]],
     ) -> np.ndarray:
         """
-        Hide pixels defined by *masks*.
+        Hide pixels defined by *masks* and return the result as a new image, *image* is left untouched.
 
         Args:
             image (np.ndarray): Input image.
-            masks (Union[np.ndarray, List[np.ndarray]]): masks to hide HxW or HxWxC or list of HxW.
+            masks (Union[CroppedMasks, np.ndarray, List[np.ndarray]]): masks to hide, as `CroppedMasks`
+                (only the region around them is processed), HxW, HxWxC or list of HxW.
         """
+        if isinstance(masks, CroppedMasks):
+            # An empty set has an empty extent: the image comes back unchanged
+            return self._hide_cropped(image, masks)
+
         # normalise to list
         if isinstance(masks, list):
             mask_list = masks
@@ -136,7 +175,7 @@ class Camouflage:
             mask_list = [masks]
 
         if len(mask_list) == 0:
-            raise ValueError("No masks provided. Returning original image.")
+            raise ValueError("No masks provided.")
 
         mask_list = [self._norm_mask(m) for m in mask_list]
 
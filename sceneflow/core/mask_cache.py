@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from sceneflow.runners._helpers import Detection, DetectionBatch
+from sceneflow.utils.logger import logger
+from sceneflow.utils.masks import CroppedMasks
+
+
+def cache_key(image_hash: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps({"image": image_hash, **params}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class MaskCache:
+    """
+    Content-addressed on-disk cache of `MaskGenerator` results.
+
+    Entries hold the detections with their COCO RLE masks as JSON, one file per key. The least
+    recently used entries are evicted once the directory grows beyond *max_bytes*. Writes are
+    atomic, so several worker processes can share one cache directory.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 10 * 1024**3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self.cache_dir.glob("*.json"))
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Tuple[DetectionBatch, CroppedMasks, List[str]]]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # Mark as recently used
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+        self.hits += 1
+        return self._decode(entry)
+
+    def put(self, key: str, detections: Union[DetectionBatch, Sequence[Detection]], image_size: Tuple[int, int]):
+        entry = {
+            "size": [int(image_size[0]), int(image_size[1])],
+            "detections": DetectionBatch.from_detections(detections).as_dicts(),
+        }
+        data = json.dumps(entry, default=float).encode("utf-8")
+
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            # Rewriting a key replaces its bytes instead of adding to them
+            try:
+                old_size = path.stat().st_size
+            except OSError:
+                old_size = 0
+            os.replace(tmp, path)
+            self._size += len(data) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for p in self.cache_dir.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        n_evicted = 0
+        for _, size, p in entries:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+                total -= size
+                n_evicted += 1
+            except OSError:
+                continue
+
+        self._size = total
+        logger.debug(f"Mask cache evicted {n_evicted} entries ({total / 1024**2:.1f} MB left)")
+
+    @staticmethod
+    def _decode(entry: Dict[str, Any]) -> Tuple[DetectionBatch, CroppedMasks, List[str]]:
+        detections = DetectionBatch.from_dicts(entry["detections"])
+        if len(detections) == 0:
+            return detections, CroppedMasks.empty(entry["size"]), []
+
+        prompts = sorted(set(detections.class_names))
+        return detections, detections.masks, prompts
@@ -1,20 +1,39 @@
 from __future__ import annotations
 
-from typing import Dict, List, Sequence, Tuple
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-import cv2
 import numpy as np
-import torch
 from loguru import logger
-from pycocotools import mask as mask_utils
-from torchvision.ops import nms
 
+from sceneflow.core._ensemble import Ensemble
+from sceneflow.core._tiling import merge_tiles, nms_detections, split_tiles
+from sceneflow.core.mask_cache import MaskCache, cache_key
 from sceneflow.runners._factory import (
+    DETECTORS,
     load_detector,
     load_ovd_detector,
     load_segmentor,
+    pool_model,
+    release_model,
 )
-from sceneflow.runners._helpers import Detection
+from sceneflow.runners._helpers import DetectionBatch
+from sceneflow.utils.embedding_cache import EmbeddingCache
+from sceneflow.utils.io import fit_long_side, image_digest
+from sceneflow.utils.masks import CroppedMasks
+from sceneflow.utils.timing import timed
+
+
+@dataclass
+class MaskJob:
+    """Per-image state between `MaskGenerator.detect_batch` and `MaskGenerator.segment`."""
+
+    image: np.ndarray
+    scale: Tuple[float, float] = (1.0, 1.0)
+    original_size: Optional[Tuple[int, int]] = None
+    key: Optional[str] = None
+    detections: Optional[DetectionBatch] = None
+    result: Optional[Tuple[DetectionBatch, CroppedMasks, List[str]]] = None
 
 
 class MaskGenerator:
@@ -25,77 +44,158 @@ class MaskGenerator:
         segmentor,
         *,
         device: str,
+        cache: Optional[MaskCache] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        concurrent: bool = False,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = 0.2,
+        tile_batch_size: int = 8,
+        detect_size: Optional[int] = None,
+        segment_size: Optional[int] = None,
     ) -> None:
         self.detectors = detectors
         self.ovd_detectors = ovd_detectors
         self.segmentor = segmentor
         self.device = device
+        self.cache = cache
+        # Handed to the segmentor on every call, the runner itself is shared through the model cache
+        self.embedding_cache = embedding_cache
+        # Sliced detection: overlapping tiles plus the full frame, merged by the ensemble NMS
+        self.tile_size = tile_size or None
+        self.tile_overlap = tile_overlap
+        self.tile_batch_size = max(1, tile_batch_size)
+        # Longest side of the copies detectors and segmentor work on, the input image when unset
+        self.detect_size = detect_size or None
+        self.segment_size = segment_size or None
+        # Closed-vocabulary and OVD detectors are independent until NMS
+        self.ensemble = Ensemble(list(detectors) + list(ovd_detectors), concurrent=concurrent)
 
     @classmethod
     def from_pretrained(
         cls,
         detectors: Sequence[str],
         ovd_detectors: Sequence[str],
-        segmentor: str,
+        segmentor: Optional[str],
         *,
         device: str = "cpu",
+        cache: Optional[MaskCache] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        segmentor_kwargs: Optional[Dict[str, Any]] = None,
+        concurrent: bool = False,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = 0.2,
+        detect_size: Optional[int] = None,
+        segment_size: Optional[int] = None,
+        replicas: int = 1,
     ) -> "MaskGenerator":
         """
         Instantiate a MaskGenerator with specific detector and segmentor names.
+        With *concurrent*, the detectors run side by side on each batch. *embedding_cache* replaces
+        the in-memory one of SAM for this generator only: it goes with every segmentor call, so
+        generators with different caches still share the weights loaded from *segmentor_kwargs*. With
+        *tile_size*, detectors see overlapping tiles of that many pixels (and the full frame)
+        instead of the whole image only, for very large inputs. *detect_size* and
+        *segment_size* cap the longest side of the images detectors and segmentor see, so that
+        cheap low-resolution detection can be paired with crisp high-resolution masks. Every
+        runner is wrapped in its shared `RunnerPool`, of at least *replicas* replicas, so that
+        several threads can use the generator at once.
+
+        With *segmentor* ``None`` (or ``"none"``) no segmentor is loaded and the masks come from the
+        detectors themselves, which must then all be registered with ``meta={"masks": True}``
+        (the ``-seg`` models).
         """
-        #
+        if segmentor in (None, "none"):
+            segmentor = None
+            unmasked = [name for name in detectors if not DETECTORS.meta(name).get("masks")] + list(ovd_detectors)
+            if unmasked:
+                raise ValueError(f"Detectors {unmasked} give no masks, they need a segmentor")
+
         detector_runners = [load_detector(name, device=device) for name in detectors]
         logger.info(f"Loaded detectors: {', '.join([repr(r) for r in detector_runners])}")
 
         ovd_runners = [load_ovd_detector(name, device=device) for name in ovd_detectors]
         logger.info(f"Loaded OVD detectors: {', '.join([repr(r) for r in ovd_runners])}")
 
-        segmentor_runner = load_segmentor(segmentor, device=device)
-        logger.info(f"Loaded segmentor: {repr(segmentor_runner)}")
+        segmentor_runner = None
+        if segmentor is not None:
+            segmentor_runner = load_segmentor(segmentor, device=device, kwargs=segmentor_kwargs or {})
+        logger.info(f"Loaded segmentor: {repr(segmentor_runner) if segmentor_runner else 'none (detector masks)'}")
+
+        # Pooled even without replicas: generators sharing a model lease it one thread at a time
+        detector_runners = [pool_model(r, replicas) for r in detector_runners]
+        ovd_runners = [pool_model(r, replicas) for r in ovd_runners]
+        if segmentor_runner is not None:
+            segmentor_runner = pool_model(segmentor_runner, replicas)
 
-        return cls(detector_runners, ovd_runners, segmentor_runner, device=device)
+        return cls(
+            detector_runners,
+            ovd_runners,
+            segmentor_runner,
+            device=device,
+            cache=cache,
+            embedding_cache=embedding_cache,
+            concurrent=concurrent,
+            tile_size=tile_size,
+            tile_overlap=tile_overlap,
+            detect_size=detect_size,
+            segment_size=segment_size,
+        )
 
+    @timed("scale")
     def _scale(
         self,
-        detections: List[Detection],
-        masks: np.ndarray,
+        detections: DetectionBatch,
+        masks: CroppedMasks,
         scale: Tuple[float, float],
         original_size: Tuple[int, int],
-    ) -> Tuple[List[Detection], np.ndarray]:
-        for det in detections:
-            det.bbox[0] *= scale[1]
-            det.bbox[1] *= scale[0]
-            det.bbox[2] *= scale[1]
-            det.bbox[3] *= scale[0]
-
-        #
-        H_tgt, W_tgt = original_size
-
-        resized_masks = np.array(
-            [
-                cv2.resize(
-                    mask,
-                    (W_tgt, H_tgt),
-                    interpolation=cv2.INTER_NEAREST,
-                )
-                for mask in masks
-            ]
-        )
-        return detections, resized_masks
+    ) -> Tuple[DetectionBatch, CroppedMasks]:
+        detections.scale_(scale)
+        # Nearest-neighbour resize of each crop, same pixels as resizing the full frames
+        return detections, masks.resize(original_size)
 
-    def _nms(self, detections: List[Detection], nms_iou: float = 0.5) -> List[Detection]:
-        if not detections:
-            return []
+    @timed("nms")
+    def _nms(self, detections: DetectionBatch, nms_iou: float = 0.5) -> DetectionBatch:
+        return nms_detections(detections, nms_iou)
+
+    def _detect_batch(
+        self,
+        images: Sequence[np.ndarray],
+        *,
+        allowed_classes: Sequence[str],
+        conf: float,
+        nms_iou: float = 0.5,
+    ) -> List[DetectionBatch]:
+        ovd_ids = {id(r) for r in self.ovd_detectors}
 
-        boxes = torch.stack([d.bbox_tensor for d in detections])
-        scores = torch.tensor([d.score for d in detections])
+        inputs, origins = images, None
+        if self.tile_size:
+            inputs, origins = split_tiles(images, self.tile_size, self.tile_overlap)
 
-        keep = nms(
-            boxes,
-            scores,
-            iou_threshold=nms_iou,
-        )
-        return [detections[i] for i in keep]
+        def _run(runner):
+            kwargs = {"texts": allowed_classes} if id(runner) in ovd_ids else {}
+            if origins is None:
+                return runner.run_batch(inputs, conf=conf, **kwargs)
+
+            batches = []
+            for start in range(0, len(inputs), self.tile_batch_size):
+                batches += runner.run_batch(inputs[start : start + self.tile_batch_size], conf=conf, **kwargs)
+            return merge_tiles(batches, origins, [image.shape[:2] for image in images])
+
+        outputs = self.ensemble.map(_run)
+        n_closed = len(self.detectors)
+
+        out = []
+        for i in range(len(images)):
+            closed = DetectionBatch.concat([batch[i] for batch in outputs[:n_closed]])
+
+            # Filter detections by allowed classes
+            if allowed_classes:
+                closed = closed.filter_classes(allowed_classes)
+
+            dets = DetectionBatch.concat([closed] + [batch[i] for batch in outputs[n_closed:]])
+            out.append(self._nms(dets, nms_iou=nms_iou))
+
+        return out
 
     def _detect(
         self,
@@ -104,37 +204,82 @@ class MaskGenerator:
         allowed_classes: Sequence[str],
         conf: float,
         nms_iou: float = 0.5,
-    ) -> List[Detection]:
-        out: List[Detection] = []
+    ) -> DetectionBatch:
+        return self._detect_batch([image], allowed_classes=allowed_classes, conf=conf, nms_iou=nms_iou)[0]
 
-        for det in self.detectors:
-            out.extend(det.run(image, conf=conf))
+    @timed("segment")
+    def _segment(self, image: np.ndarray, detections: DetectionBatch) -> CroppedMasks:
+        if len(detections) == 0:
+            return CroppedMasks.empty(image.shape[:2])
+        if self.segmentor is None:
+            raise ValueError("Detections without masks and no segmentor to compute them")
+        with timed(self.segmentor.model_name, group="models"):
+            masks = self.segmentor.run(image, detections=detections, embedding_cache=self.embedding_cache)
+        return masks if isinstance(masks, CroppedMasks) else CroppedMasks.from_dense(np.asarray(masks))
 
-        # Filter detections by allowed classes
-        if allowed_classes:
-            out = [d for d in out if d.class_name in allowed_classes]
+    def _finalize(
+        self,
+        image: np.ndarray,
+        detections: DetectionBatch,
+        scale: Tuple[float, float],
+        original_size: Tuple[int, int],
+    ) -> Tuple[DetectionBatch, CroppedMasks, List[str]]:
+        if len(detections) == 0:
+            size = original_size if original_size is not None else image.shape[:2]
+            return DetectionBatch(), CroppedMasks.empty(size), []
 
-        for ovd_det in self.ovd_detectors:
-            out.extend(ovd_det.run(image, texts=allowed_classes, conf=conf))
+        # Single-pass -seg detectors already gave every detection a mask
+        masks = detections.masks
+        if masks is None:
+            seg_image, (sy, sx) = fit_long_side(image, self.segment_size)
+            seg_detections = detections
+            if (sy, sx) != (1.0, 1.0):
+                seg_detections = detections.select(slice(None)).scale_((1 / sy, 1 / sx))
+            masks = self._segment(seg_image, seg_detections)
 
-        return self._nms(out, nms_iou=nms_iou)
+        # Masks may come at the detection or segmentation resolution, the output is at the original one
+        rescale = np.any(np.asarray(scale) != 1.0) and original_size is not None
+        size = tuple(original_size) if rescale else image.shape[:2]
+        if rescale or masks.size != size:
+            detections, masks = self._scale(detections, masks, scale if rescale else (1.0, 1.0), size)
 
-    def _segment(self, image: np.ndarray, detections: List[Detection]) -> np.ndarray:
-        if not detections:
-            return np.array([])
-        return self.segmentor.run(image, detections=detections)
+        # The COCO RLEs are only encoded if something asks for them (cache, mask store, JSON)
+        detections.masks = masks
 
-    def _to_rle(self, detections: List[Detection], masks: np.ndarray) -> Tuple[List[Detection], np.ndarray]:
-        if len(detections) == 0 or len(masks) == 0:
-            return detections, masks
+        prompts = sorted(set(detections.class_names))
 
-        for det, mask in zip(detections, masks):
-            det.mask = mask
-            rle = mask_utils.encode(np.asfortranarray(mask.astype(np.uint8)))
-            rle["counts"] = rle["counts"].decode("utf-8")
-            det.segmentation = rle
+        assert len(detections) == len(masks), "Number of detections and masks must match."
+        return detections, masks, prompts
 
-        return detections, masks
+    def _cache_key(
+        self,
+        image: np.ndarray,
+        *,
+        conf: float,
+        nms_iou: float,
+        prompt: Optional[Sequence[str]],
+        scale: Tuple[float, float],
+        original_size: Optional[Tuple[int, int]],
+    ) -> str:
+        params = {
+            "detectors": [r.model_name for r in self.detectors],
+            "ovd_detectors": [r.model_name for r in self.ovd_detectors],
+            "segmentor": self.segmentor.model_name if self.segmentor is not None else None,
+            "conf": conf,
+            "nms_iou": nms_iou,
+            "prompt": sorted(prompt) if prompt else None,
+            "scale": [float(s) for s in scale],
+            "original_size": list(original_size) if original_size is not None else None,
+        }
+        if self.tile_size:
+            params["tiles"] = [self.tile_size, self.tile_overlap]
+        if self.detect_size or self.segment_size:
+            params["sizes"] = [self.detect_size, self.segment_size]
+        # Masks of small objects depend on the segmentor settings, keys stay the same when unused
+        min_box_area = getattr(self.segmentor, "min_box_area", 0)
+        if min_box_area:
+            params["small_objects"] = [min_box_area, self.segmentor.small_object_mask]
+        return cache_key(image_digest(image), params)
 
     def generate(
         self,
@@ -145,23 +290,103 @@ class MaskGenerator:
         prompt: Sequence[str] = None,
         scale: Tuple[float, float] = (1.0, 1.0),
         original_size: Tuple[int, int] = None,
-    ) -> Tuple[List[Dict], np.ndarray, List[str]]:
+    ) -> Tuple[DetectionBatch, CroppedMasks, List[str]]:
+        return self.generate_batch(
+            [image],
+            conf=conf,
+            nms_iou=nms_iou,
+            prompt=prompt,
+            scales=[scale],
+            original_sizes=[original_size],
+        )[0]
+
+    def detect_batch(
+        self,
+        images: Sequence[np.ndarray],
+        *,
+        conf: float = 0.25,
+        nms_iou: float = 0.5,
+        prompt: Sequence[str] = None,
+        scales: Optional[Sequence[Tuple[float, float]]] = None,
+        original_sizes: Optional[Sequence[Tuple[int, int]]] = None,
+    ) -> List[MaskJob]:
+        """
+        First half of `generate_batch`: serve cached results and run the detectors on the rest.
+        Pass the returned jobs to `segment` to get the final results.
+        """
         # Allow classes
         prompt = list(set(prompt)) if prompt else None
+        scales = scales if scales is not None else [(1.0, 1.0)] * len(images)
+        original_sizes = original_sizes if original_sizes is not None else [None] * len(images)
 
-        # Detect objects
-        detections = self._detect(image, allowed_classes=prompt, conf=conf, nms_iou=nms_iou)
+        jobs = [
+            MaskJob(image, scale, original_size) for image, scale, original_size in zip(images, scales, original_sizes)
+        ]
 
-        if not detections:
-            return [], np.array([]), []
+        # Cached results
+        if self.cache is not None:
+            for job in jobs:
+                job.key = self._cache_key(
+                    job.image,
+                    conf=conf,
+                    nms_iou=nms_iou,
+                    prompt=prompt,
+                    scale=job.scale,
+                    original_size=job.original_size,
+                )
+                job.result = self.cache.get(job.key)
 
-        masks = self._segment(image, detections)
+        todo = [job for job in jobs if job.result is None]
+        if not todo:
+            return jobs
 
-        if scale != (1.0, 1.0) and original_size is not None:
-            detections, masks = self._scale(detections, masks, scale, original_size)
-        detections, masks = self._to_rle(detections, masks)
+        # Detect objects, on downscaled copies with a detect size
+        det_inputs = [fit_long_side(job.image, self.detect_size) for job in todo]
+        batch_detections = self._detect_batch(
+            [image for image, _ in det_inputs], allowed_classes=prompt, conf=conf, nms_iou=nms_iou
+        )
+        for job, detections, (_, det_scale) in zip(todo, batch_detections, det_inputs):
+            # Boxes in the coordinates of the job image, masks of -seg detectors stay as they are
+            job.detections = detections.scale_(det_scale) if det_scale != (1.0, 1.0) else detections
 
-        prompts = sorted({d.class_name for d in detections})
+        return jobs
 
-        assert len(detections) == len(masks), "Number of detections and masks must match."
-        return detections, masks, prompts
+    def segment(self, job: MaskJob) -> Tuple[DetectionBatch, CroppedMasks, List[str]]:
+        """Second half of `generate_batch`: segment, rescale and encode the detections of one job."""
+        if job.result is not None:
+            return job.result
+
+        job.result = self._finalize(job.image, job.detections, job.scale, job.original_size)
+
+        if self.cache is not None:
+            size = job.original_size if job.original_size is not None else job.image.shape[:2]
+            self.cache.put(job.key, job.result[0], size)
+
+        return job.result
+
+    def generate_batch(
+        self,
+        images: Sequence[np.ndarray],
+        *,
+        conf: float = 0.25,
+        nms_iou: float = 0.5,
+        prompt: Sequence[str] = None,
+        scales: Optional[Sequence[Tuple[float, float]]] = None,
+        original_sizes: Optional[Sequence[Tuple[int, int]]] = None,
+    ) -> List[Tuple[DetectionBatch, CroppedMasks, List[str]]]:
+        """Same as `generate` for several images; detectors see the whole batch in one call."""
+        if len(images) == 0:
+            return []
+
+        jobs = self.detect_batch(
+            images, conf=conf, nms_iou=nms_iou, prompt=prompt, scales=scales, original_sizes=original_sizes
+        )
+        return [self.segment(job) for job in jobs]
+
+    def close(self):
+        """Stop the ensemble threads and give the runners back to the shared model cache."""
+        self.ensemble.close()
+        for runner in [*self.detectors, *self.ovd_detectors, self.segmentor]:
+            if runner is not None:
+                release_model(runner)
+        self.detectors, self.ovd_detectors, self.segmentor = [], [], None
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sceneflow.utils.masks import CroppedMasks
+
+STORE_NAME = "masks.sqlite"
+
+
+def decode_masks(detections: Sequence[Dict[str, Any]], image_size: Tuple[int, int]) -> CroppedMasks:
+    """Decode the RLE masks of stored detections, cropped to their boxes."""
+    rles = [d["segmentation"] for d in detections if d.get("segmentation") is not None]
+    return CroppedMasks.from_rles(rles, image_size)
+
+
+class MaskStore:
+    """
+    Indexed SQLite store of per-image detections and RLE masks for a dataset.
+
+    Images are keyed by their path relative to the dataset root, which is kept in the store
+    metadata together with the parameters used to produce the masks. Only the standard library,
+    numpy and pycocotools are needed to read it, so rendering never imports a model backend.
+    A store can be shared by the threads of a pipeline.
+    """
+
+    def __init__(self, path: Path, readonly: bool = False):
+        path = Path(path)
+        self._lock = threading.Lock()
+        self.path = path / STORE_NAME if path.is_dir() or path.suffix != ".sqlite" else path
+        if readonly:
+            if not self.path.exists():
+                raise FileNotFoundError(f"Mask store not found: {self.path}")
+            self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=60, check_same_thread=False)
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                path TEXT PRIMARY KEY,
+                height INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                detections TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def set_meta(self, **items: Any):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v, default=str)) for k, v in items.items()],
+            )
+            self._conn.commit()
+
+    def meta(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def put(self, rel_path: str, image_size: Tuple[int, int], detections: Sequence[Dict[str, Any]]):
+        payload = json.dumps(list(detections), default=float)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images (path, height, width, detections) VALUES (?, ?, ?, ?)",
+                (str(rel_path), int(image_size[0]), int(image_size[1]), payload),
+            )
+            self._conn.commit()
+
+    def get(self, rel_path: str) -> Optional[Tuple[Tuple[int, int], List[Dict[str, Any]]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT height, width, detections FROM images WHERE path = ?", (str(rel_path),)
+            ).fetchone()
+        if row is None:
+            return None
+        height, width, detections = row
+        return (height, width), json.loads(detections)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM images ORDER BY path")]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "MaskStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,35 +1,69 @@
-from typing import List, Sequence, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 
-from sceneflow.runners._factory import load_text_detector
-from sceneflow.runners._helpers import Detection
+from sceneflow.core._ensemble import Ensemble
+from sceneflow.core._tiling import merge_tiles, split_tiles
+from sceneflow.runners._factory import load_text_detector, pool_model, release_model
+from sceneflow.runners._helpers import DetectionBatch
 from sceneflow.utils.logger import logger
 
 
 class OCRProcessor:
-    def __init__(self, detectors: List, *, device: str) -> None:
+    def __init__(
+        self,
+        detectors: List,
+        *,
+        device: str,
+        concurrent: bool = False,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = 0.2,
+        tile_nms_iou: float = 0.5,
+        tile_batch_size: int = 8,
+    ) -> None:
         self.detectors = detectors
         self.device = device
+        self.ensemble = Ensemble(detectors, concurrent=concurrent)
+        # Sliced detection: text is small, so tiles only; duplicates from the overlaps are suppressed
+        self.tile_size = tile_size or None
+        self.tile_overlap = tile_overlap
+        self.tile_nms_iou = tile_nms_iou
+        self.tile_batch_size = max(1, tile_batch_size)
 
     @classmethod
-    def from_pretrained(cls, detectors: Sequence[str], *, device: str = "cpu") -> "OCRProcessor":
-        """Instantiate an OCRRunner with a list of detector names."""
+    def from_pretrained(
+        cls,
+        detectors: Sequence[str],
+        *,
+        device: str = "cpu",
+        concurrent: bool = False,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = 0.2,
+        replicas: int = 1,
+    ) -> "OCRProcessor":
+        """
+        Instantiate an OCRRunner with a list of detector names, run side by side with *concurrent*.
+        With *tile_size*, detectors see overlapping tiles of that many pixels. Each detector is
+        its shared `RunnerPool`, of at least *replicas* replicas, usable from several threads at once.
+        """
         runners = [load_text_detector(name, device=device) for name in detectors]
         logger.info(f"Loaded OCR detectors: {', '.join([repr(r) for r in runners])}")
-        return cls(runners, device=device)
+        runners = [pool_model(r, replicas) for r in runners]
+        return cls(runners, device=device, concurrent=concurrent, tile_size=tile_size, tile_overlap=tile_overlap)
+
+    def _run_tiled(self, runner, images: Sequence[np.ndarray], conf: float) -> List[DetectionBatch]:
+        inputs, origins = split_tiles(images, self.tile_size, self.tile_overlap, full_frame=False)
+        batches = []
+        for start in range(0, len(inputs), self.tile_batch_size):
+            batches += runner.run_batch(inputs[start : start + self.tile_batch_size], conf=conf)
+        return merge_tiles(batches, origins, [image.shape[:2] for image in images], nms_iou=self.tile_nms_iou)
 
     def _scale_detections(
         self,
-        detections: List[Detection],
+        detections: DetectionBatch,
         scale: Tuple[float, float],
-    ) -> List[Detection]:
-        for det in detections:
-            det.bbox[0] *= scale[1]
-            det.bbox[1] *= scale[0]
-            det.bbox[2] *= scale[1]
-            det.bbox[3] *= scale[0]
-        return detections
+    ) -> DetectionBatch:
+        return detections.scale_(scale)
 
     def process(
         self,
@@ -37,14 +71,32 @@ class OCRProcessor:
         *,
         conf: float = 0.0,
         scale: Tuple[float, float] = (1.0, 1.0),
-    ) -> List[Detection]:
+    ) -> DetectionBatch:
         """Run OCR on an image and return scaled detections."""
-        all_detections: List[Detection] = []
+        return self.process_batch([image], conf=conf, scales=[scale])[0]
 
-        for det in self.detectors:
-            detections = det.run(image, conf=conf)
+    def process_batch(
+        self,
+        images: Sequence[np.ndarray],
+        *,
+        conf: float = 0.0,
+        scales: Optional[Sequence[Tuple[float, float]]] = None,
+    ) -> List[DetectionBatch]:
+        """Run OCR on several images at once, returns scaled detections per image."""
+        scales = scales if scales is not None else [(1.0, 1.0)] * len(images)
+        if self.tile_size:
+            outputs = self.ensemble.map(lambda det: self._run_tiled(det, images, conf))
+        else:
+            outputs = self.ensemble.map(lambda det: det.run_batch(images, conf=conf))
 
-            all_detections.extend(detections)
+        return [
+            self._scale_detections(DetectionBatch.concat([batch[i] for batch in outputs]), scale)
+            for i, scale in enumerate(scales)
+        ]
 
-        scaled_detections = self._scale_detections(all_detections, scale)
-        return scaled_detections
+    def close(self):
+        """Stop the ensemble threads and give the runners back to the shared model cache."""
+        self.ensemble.close()
+        for runner in self.detectors:
+            release_model(runner)
+        self.detectors = []
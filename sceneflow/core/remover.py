@@ -1,28 +1,47 @@
 from __future__ import annotations
 
+from typing import Union
+
 import numpy as np
 
-from sceneflow.runners._factory import load_inpainter
+from sceneflow.runners._factory import load_inpainter, pool_model, release_model
+from sceneflow.utils.masks import CroppedMasks
+from sceneflow.utils.timing import timed
 
 
 class Remover:
-    def __init__(self, inpainter: str = "big_lama", *, device: str = "cpu") -> None:
-        """Initialize the remover with a specific inpainting model."""
-        self.inpainter = load_inpainter(inpainter, device=device)
-
-    def remove(self, image: np.ndarray, masks: np.ndarray) -> np.ndarray:
-        """Remove objects from an image using the specified binary masks, each mask is applied sequentially."""
-
-        if masks.ndim == 2:
-            masks = [masks]
-        elif masks.ndim == 3:
-            masks = list(masks)
-        else:
-            raise ValueError(f"Expected masks of shape (H, W) or (N, H, W), got {masks.shape}")
+    def __init__(self, inpainter: str = "big_lama", *, device: str = "cpu", replicas: int = 1) -> None:
+        """
+        Initialize the remover with a specific inpainting model, as its shared `RunnerPool` of at
+        least *replicas* replicas, so that it can be used from several threads.
+        """
+        self.inpainter = pool_model(load_inpainter(inpainter, device=device), replicas)
+
+    @timed("inpaint")
+    def remove(self, image: np.ndarray, masks: Union[CroppedMasks, np.ndarray]) -> np.ndarray:
+        """
+        Remove objects from an image using the specified binary masks, each mask is applied sequentially.
+        `CroppedMasks` are expanded to a full frame one at a time, as the inpainter needs them.
+        """
+
+        if isinstance(masks, np.ndarray):
+            if masks.ndim == 2:
+                masks = [masks]
+            elif masks.ndim == 3:
+                masks = list(masks)
+            else:
+                raise ValueError(f"Expected masks of shape (H, W) or (N, H, W), got {masks.shape}")
 
         for mask in masks:
             assert mask.ndim == 2, f"Each mask must be a 2D array, got shape {mask.shape}"
-            image = self.inpainter.run(image, mask)
+            with timed(self.inpainter.model_name, group="models"):
+                image = self.inpainter.run(image, mask)
 
         # Convert BGR
         return image[..., ::-1]
+
+    def close(self):
+        """Give the inpainter back to the shared model cache."""
+        if self.inpainter is not None:
+            release_model(self.inpainter)
+            self.inpainter = None
@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Hashable, List, Sequence
+
+from sceneflow.utils.timing import TIMINGS
+
+# fn(key, items) -> one result per item, in order
+BatchFn = Callable[[Hashable, List[Any]], Sequence[Any]]
+
+
+class Overloaded(RuntimeError):
+    """Raised by `MicroBatcher.submit` when the queue is full; the caller should retry later."""
+
+
+@dataclass
+class _Request:
+    item: Any
+    future: Future = field(default_factory=Future)
+    t_submit: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """
+    Groups requests that arrive together into one batched call.
+
+    `submit` queues an item under a *key* and returns a `Future`. A worker thread takes the oldest
+    request, waits at most *max_wait_ms* for more with the same key (requests for different
+    thresholds or prompts cannot share a detector call), and calls ``fn(key, items)`` on up to
+    *max_batch_size* of them. A lone request therefore pays at most *max_wait_ms* of extra latency,
+    while concurrent ones share the cost of a detector call.
+
+    At most *max_queue* requests wait at any time: beyond that `submit` raises `Overloaded` instead
+    of letting latency grow without bound. An exception raised by *fn* is set on every future of
+    the batch. Time spent queued goes to `TIMINGS` under ``("queue", name)``.
+    """
+
+    def __init__(
+        self,
+        fn: BatchFn,
+        name: str = "batch",
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_queue: int = 64,
+        workers: int = 1,
+    ):
+        self.fn = fn
+        self.name = name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_queue = max(1, max_queue)
+
+        self._pending: Dict[Hashable, Deque[_Request]] = {}
+        self._depth = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.batch_sizes: Counter = Counter()
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"sceneflow-{name}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, item: Any, key: Hashable = None) -> Future:
+        request = _Request(item)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"MicroBatcher '{self.name}' is closed")
+            if self._depth >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"'{self.name}' queue is full ({self.max_queue} requests waiting)")
+            self._pending.setdefault(key, deque()).append(request)
+            self._depth += 1
+            self._cond.notify_all()
+        return request.future
+
+    def __call__(self, item: Any, key: Hashable = None, timeout: float = None) -> Any:
+        """Submit *item* and wait for its result."""
+        return self.submit(item, key).result(timeout)
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return None, []
+
+                # Oldest request first, then wait for more with its key until the deadline
+                key = min(self._pending, key=lambda k: self._pending[k][0].t_submit)
+                requests = self._pending[key]
+                deadline = requests[0].t_submit + self.max_wait
+                while len(requests) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                # Another worker may have taken them while this one was waiting
+                if self._pending.get(key) is not requests:
+                    continue
+
+                batch = [requests.popleft() for _ in range(min(len(requests), self.max_batch_size))]
+                if not requests:
+                    del self._pending[key]
+                self._depth -= len(batch)
+                return key, batch
+
+    def _worker(self):
+        while True:
+            key, batch = self._next_batch()
+            if not batch:
+                return
+
+            now = time.perf_counter()
+            for request in batch:
+                TIMINGS.record("queue", self.name, now - request.t_submit)
+            with self._cond:
+                self.batches += 1
+                self.items += len(batch)
+                self.batch_sizes[len(batch)] += 1
+
+            # Requests cancelled by their caller are dropped
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.fn(key, [request.item for request in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"'{self.name}' returned {len(results)} results for {len(batch)} items")
+            except BaseException as exc:
+                for request in batch:
+                    request.future.set_exception(exc)
+                continue
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+
+    @property
+    def depth(self) -> int:
+        """Requests waiting for a batch."""
+        return self._depth
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "batch_sizes": {str(size): n for size, n in sorted(self.batch_sizes.items())},
+                "queue_depth": self._depth,
+                "rejected": self.rejected,
+            }
+
+    def close(self):
+        """Finish the queued requests, then stop the workers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def __repr__(self) -> str:
+        return (
+            f"MicroBatcher(name={self.name!r}, max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait * 1000:g}, depth={self.depth}, batches={self.batches})"
+        )
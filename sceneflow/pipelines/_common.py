@@ -0,0 +1,464 @@
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+
+from sceneflow.pipelines._graph import Stage, StageGraph
+from sceneflow.pipelines._manifest import RunManifest, file_stamp, run_fingerprint
+from sceneflow.pipelines._profile import PipelineProfiler
+from sceneflow.utils.io import try_load_image
+from sceneflow.utils.logger import logger
+from sceneflow.utils.progress import get_progress
+from sceneflow.utils.timing import TIMINGS, Timings
+
+# setup(cfg) -> state, built once per process. Values of a dict state with a close() method (generators,
+# stores) are closed once a single-process run is over, which gives their models back to the model cache.
+# cfg["replicas"] is the number of threads that may call the models at once, see `PipelineStage.models`
+SetupFn = Callable[[Dict[str, Any]], Any]
+# stage(state, items) updates a batch of items in place. An item is a dict with the image "path", the
+# loaded "image" (img, img_bgr, original_size, scale) and the "record" to report; stages pass their
+# own results down under other keys. Setting record["status"] ends an item early.
+StageFn = Callable[[Any, List[Dict[str, Any]]], None]
+
+
+@dataclass
+class PipelineStage:
+    """
+    A named step of a pipeline and the number of threads it gets in single-process runs.
+
+    Stages calling the models set *models*: runners keep per-call state (SAM's current image), so
+    running such a stage on several threads needs as many replicas, which setup is asked for.
+    """
+
+    name: str
+    fn: StageFn
+    workers: int = 1
+    models: bool = False
+
+
+class PipelineStats:
+    """
+    Aggregated per-image records.
+
+    A record is a dict with an optional ``status`` (``"ok"``, ``"empty"`` or ``"skipped"``),
+    per-class ``counts`` and the ``time_sec`` spent processing the image. Latencies of stages,
+    operations and models are merged into `timings` and reported under ``latency``.
+    """
+
+    def __init__(self):
+        self.per_class = Counter()
+        self.n_processed = 0
+        self.n_empty = 0
+        self.n_skipped = 0
+        self.n_resumed = 0
+        self.busy_time = 0.0
+        self.wall_time = 0.0
+        self.timings = Timings()
+
+    def update(self, record: Dict[str, Any], resumed: bool = False):
+        """Add one record; *resumed* records come from a previous run and only count towards totals."""
+        status = record.get("status", "ok")
+        if resumed:
+            self.n_resumed += 1
+            self.per_class.update(record.get("counts", {}))
+            return
+
+        if status == "skipped":
+            self.n_skipped += 1
+        elif status == "empty":
+            self.n_empty += 1
+        else:
+            self.n_processed += 1
+
+        self.per_class.update(record.get("counts", {}))
+        self.busy_time += record.get("time_sec", 0.0)
+
+    @property
+    def total_objects(self) -> int:
+        return int(sum(self.per_class.values()))
+
+    def summary(self, total_images: int, workers: int = 1, total_key: str = "total_objects") -> Dict[str, Any]:
+        return {
+            "total_images": total_images,
+            "processed_images": self.n_processed + self.n_resumed,
+            "resumed_images": self.n_resumed,
+            "skipped_images": self.n_skipped,
+            total_key: self.total_objects,
+            "per_class_counts": dict(self.per_class),
+            "workers": workers,
+            "avg_time_per_image_sec": round(self.wall_time / max(1, self.n_processed), 3),
+            "avg_worker_time_per_image_sec": round(self.busy_time / max(1, self.n_processed + self.n_empty), 3),
+            "latency": self.timings.summary(),
+        }
+
+
+def output_path(img_path: Path, input_dir: Path, output_dir: Path) -> Path:
+    """Mirror *img_path* from *input_dir* into *output_dir*, creating parent folders."""
+    save_path = Path(output_dir) / Path(img_path).relative_to(input_dir)
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+    return save_path
+
+
+def largest_first(paths: Sequence[Path]) -> List[Path]:
+    """Sort paths by file size, largest first, so big images do not straggle at the end of a run."""
+
+    def _size(p: Path) -> int:
+        try:
+            return p.stat().st_size
+        except OSError:
+            return 0
+
+    return sorted(paths, key=_size, reverse=True)
+
+
+def configure_threads(num_threads: int):
+    """Cap torch and OpenCV intra-op threads so that worker processes do not oversubscribe cores."""
+    num_threads = max(1, num_threads)
+    cv2.setNumThreads(num_threads)
+
+    # Model-free pipelines never import torch, do not pull it in here
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(num_threads)
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, max(1, size)))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_stage_workers(specs: Iterable[str]) -> Dict[str, int]:
+    """Parse ``NAME=N`` thread-count overrides as given on the command line."""
+    overrides = {}
+    for spec in specs:
+        name, sep, value = spec.partition("=")
+        if not sep or not name.strip() or not value.strip().isdigit() or int(value) < 1:
+            raise ValueError(f"Invalid stage workers '{spec}', expected NAME=N with N >= 1")
+        overrides[name.strip()] = int(value)
+    return overrides
+
+
+def segmentor_kwargs(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """SAM options set on the command line, left out when unset so that other segmentors load too."""
+    options = {
+        "max_boxes_per_call": cfg.get("sam_max_boxes"),
+        "min_box_area": cfg.get("sam_min_area"),
+        "small_object_mask": cfg.get("small_object_mask"),
+    }
+    return {k: v for k, v in options.items() if v is not None}
+
+
+@TIMINGS.timed("load", group="stages")
+def _load_items(img_paths: List[Path], resize: Optional[Tuple[int, int]]) -> List[Dict[str, Any]]:
+    items = []
+    for img_path in img_paths:
+        # Hashed here, in the load threads, rather than when the manifest commits the record
+        stamp = file_stamp(img_path)
+        loaded = try_load_image(img_path, resize)
+        if loaded[0] is None:
+            logger.warning(f"Skipping invalid image: {img_path}")
+            items.append({"path": img_path, "image": None, "record": {"status": "skipped"}})
+        else:
+            items.append({"path": img_path, "image": loaded, "record": {}, "time_sec": 0.0, "stamp": stamp})
+    return items
+
+
+def _run_stage(stage: PipelineStage, state: Any, items: List[Dict[str, Any]]):
+    # Skipped images and images a previous stage finished early (e.g. nothing detected) drop out
+    active = [it for it in items if "status" not in it["record"]]
+    if not active:
+        return items
+
+    t0 = time.perf_counter()
+    with TIMINGS.timed(stage.name, group="stages"):
+        stage.fn(state, active)
+    time_per_image = (time.perf_counter() - t0) / len(active)
+
+    for it in active:
+        it["time_sec"] += time_per_image
+    return items
+
+
+def _run_batch(
+    stages: Sequence[PipelineStage],
+    state: Any,
+    img_paths: List[Path],
+    resize: Optional[Tuple[int, int]],
+) -> List[Dict[str, Any]]:
+    items = _load_items(img_paths, resize)
+    for stage in stages:
+        _run_stage(stage, state, items)
+    return items
+
+
+def _stage_graph(
+    stages: Sequence[PipelineStage],
+    state: Any,
+    resize: Optional[Tuple[int, int]],
+    load_workers: int,
+    stage_workers: Dict[str, int],
+) -> StageGraph:
+    """
+    *stages* as a `StageGraph` over batches of image paths, after a "load" stage of *load_workers*
+    threads that decodes the images ahead of the others.
+
+    A stage given 0 threads runs inline instead: the load stage in the threads of the first stage
+    (no prefetching), any other stage in those of the previous one (e.g. saves without writers).
+    """
+    graph: List[Stage] = []
+    head = None
+    for stage in [Stage("load", partial(_load_items, resize=resize), load_workers)] + [
+        Stage(s.name, partial(_run_stage, s, state), stage_workers.get(s.name, s.workers)) for s in stages
+    ]:
+        if stage.workers > 0:
+            graph.append(Stage(stage.name, _chain(head, stage.fn) if head else stage.fn, stage.workers))
+            head = None
+        elif graph:
+            graph[-1] = Stage(graph[-1].name, _chain(graph[-1].fn, stage.fn), graph[-1].workers)
+        else:
+            head = _chain(head, stage.fn) if head else stage.fn
+    return StageGraph(graph, ordered=False)
+
+
+def _chain(first: Callable[[Any], Any], then: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    return lambda x: then(first(x))
+
+
+def _to_records(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    records = []
+    for it in items:
+        record = {**it["record"], "path": str(it["path"])}
+        if it["image"] is not None:
+            record["time_sec"] = it["time_sec"]
+            record["_stamp"] = it["stamp"]
+        records.append(record)
+    return records
+
+
+# Per-process state of pool workers
+_WORKER: Dict[str, Any] = {}
+
+
+def _worker_init(
+    setup: SetupFn,
+    stages: Sequence[PipelineStage],
+    cfg: Dict[str, Any],
+    load_workers: int,
+    num_threads: int,
+):
+    configure_threads(num_threads)
+
+    # Model stages keep a single thread: workers load one replica of each model
+    _WORKER["graph"] = _stage_graph(stages, setup(cfg), cfg.get("resize"), load_workers, {})
+
+
+def _worker_run(batches: List[List[Path]]) -> List[Dict[str, Any]]:
+    # Saves are synchronous inside the save stage: the images are on disk once they leave the graph
+    items = [it for batch in _WORKER["graph"].run(batches) for it in batch]
+
+    # Ship this task's latencies to the parent with its first record
+    records = _to_records(items)
+    records[0]["_timings"] = TIMINGS.drain()
+    return records
+
+
+def _close_state(state: Any):
+    for value in state.values() if isinstance(state, dict) else []:
+        close = getattr(value, "close", None)
+        if callable(close):
+            close()
+
+
+def iter_records(
+    image_paths: Sequence[Path],
+    setup: SetupFn,
+    stages: Sequence[PipelineStage],
+    cfg: Dict[str, Any],
+    *,
+    workers: int = 1,
+    prefetch: int = 0,
+    batch_size: int = 1,
+    stage_workers: Optional[Dict[str, int]] = None,
+    profiler: Optional[PipelineProfiler] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run *stages* over every image, *batch_size* images at a time, and yield one record per
+    image once its artefacts are written.
+
+    In a single process the stages run concurrently as a `StageGraph`: a batch can be decoded
+    while the previous one is detected and the one before that is segmented or saved. Each stage
+    gets its own threads (*stage_workers* overrides them by name) and saves are synchronous
+    inside the stage, so a yielded record is on disk. Up to *prefetch* images are decoded ahead
+    by the "load" stage; with ``prefetch=0`` the first stage decodes them inline.
+
+    With ``workers > 1`` each worker process calls *setup* once and runs the same graph, with one
+    thread per model stage, over its tasks of a few batches, which are handed out dynamically
+    largest-first; records arrive in completion order.
+
+    With a *profiler*, batches go through the stages one at a time in the calling thread so that
+    the profile attributes every call to the stage that made it.
+    """
+    if profiler is not None:
+        state = setup(cfg)
+        n_seen = 0
+        try:
+            for img_paths in chunked(image_paths, batch_size):
+                profiler.before_batch(n_seen)
+                items = _run_batch(stages, state, img_paths, cfg.get("resize"))
+                profiler.after_batch(len(items))
+                n_seen += len(items)
+                yield from _to_records(items)
+        finally:
+            profiler.close()
+            _close_state(state)
+        return
+
+    if workers <= 1:
+        stage_workers = stage_workers or {}
+        unknown = set(stage_workers) - {"load"} - {s.name for s in stages}
+        if unknown:
+            raise ValueError(f"Unknown stage(s) {sorted(unknown)}, available: {['load'] + [s.name for s in stages]}")
+
+        # Model stages on several threads need one runner replica per thread
+        replicas = max([stage_workers.get(s.name, s.workers) for s in stages if s.models] or [1])
+        state = setup({**cfg, "replicas": replicas})
+
+        load_workers = stage_workers.get("load", -(-prefetch // max(1, batch_size)))
+        graph = _stage_graph(stages, state, cfg.get("resize"), load_workers, stage_workers)
+        results = graph.run(chunked(image_paths, batch_size))
+        try:
+            for items in results:
+                yield from _to_records(items)
+        finally:
+            # Stop the stage threads before their models go back to the cache, also on errors or
+            # when the caller stops early
+            results.close()
+            _close_state(state)
+        return
+
+    if not image_paths:
+        return
+
+    batches = list(chunked(largest_first(image_paths), batch_size))
+    workers = min(workers, len(batches))
+    # A few batches per task so that a worker decodes the next one while it computes, while leaving
+    # enough tasks for the largest-first hand-out to balance the workers
+    tasks = list(chunked(batches, min(8, max(1, len(batches) // (4 * workers)))))
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    logger.info(f"Starting {workers} worker processes with {num_threads} thread(s) each")
+
+    ctx = mp.get_context("spawn")
+    load_workers = -(-prefetch // max(1, batch_size))
+    pool = ctx.Pool(workers, initializer=_worker_init, initargs=(setup, stages, cfg, load_workers, num_threads))
+    try:
+        for records in pool.imap_unordered(_worker_run, tasks, chunksize=1):
+            yield from records
+        pool.close()
+        pool.join()
+    finally:
+        pool.terminate()
+
+
+def write_summary(summary: Dict[str, Any], output_dir: Path):
+    with open(Path(output_dir) / "summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+def run_pipeline(
+    image_paths: Sequence[Path],
+    setup: SetupFn,
+    stages: Sequence[PipelineStage],
+    cfg: Dict[str, Any],
+    *,
+    name: str,
+    workers: int = 1,
+    prefetch: int = 0,
+    batch_size: int = 1,
+    stage_workers: Optional[Dict[str, int]] = None,
+    resume: bool = False,
+    profile: Optional[Tuple[int, int]] = None,
+    total_key: str = "total_objects",
+    description: str = "Processing images",
+    flush_every_sec: float = 10.0,
+) -> PipelineStats:
+    """
+    Drive *stages* over *image_paths* with a progress bar and return merged stats.
+
+    Every record is committed to ``manifest.sqlite`` in the output directory and ``summary.json``
+    is refreshed every *flush_every_sec*, so an interrupted run loses nothing. With *resume*,
+    images whose manifest entry is up to date are not processed again.
+
+    *profile* is a ``(skip, count)`` window of images to profile into ``<output_dir>/profile``,
+    see `PipelineProfiler`. Profiled runs use a single process and thread.
+    """
+    output_dir = Path(cfg["output_dir"])
+
+    profiler = None
+    if profile is not None:
+        if workers > 1:
+            logger.warning("Profiling runs in a single process, ignoring workers")
+            workers = 1
+        profiler = PipelineProfiler(output_dir / "profile", skip=profile[0], count=profile[1])
+
+    stats = PipelineStats()
+    t_start = time.perf_counter()
+    # Drop latencies recorded before this run, e.g. while loading models
+    TIMINGS.drain()
+    t_flush = t_start
+
+    def _summary() -> Dict[str, Any]:
+        stats.timings.merge(TIMINGS.drain())
+        stats.wall_time = time.perf_counter() - t_start
+        return stats.summary(len(image_paths), workers=workers, total_key=total_key)
+
+    with RunManifest(output_dir / "manifest.sqlite", run_fingerprint(name, cfg)) as manifest:
+        todo = list(image_paths)
+        if resume:
+            todo = []
+            for img_path in image_paths:
+                record = manifest.lookup(img_path)
+                if record is None:
+                    todo.append(img_path)
+                else:
+                    stats.update(record, resumed=True)
+            logger.info(f"Resuming: {stats.n_resumed} image(s) up to date, {len(todo)} to process")
+
+        with get_progress() as progress:
+            task = progress.add_task(description, total=len(image_paths), completed=stats.n_resumed)
+
+            records = iter_records(
+                todo,
+                setup,
+                stages,
+                cfg,
+                workers=workers,
+                prefetch=prefetch,
+                batch_size=batch_size,
+                stage_workers=stage_workers,
+                profiler=profiler,
+            )
+            for record in records:
+                stats.timings.merge(record.pop("_timings", {}))
+                manifest.commit(record["path"], record, stamp=record.pop("_stamp", None))
+                stats.update(record)
+                progress.advance(task)
+
+                if time.perf_counter() - t_flush > flush_every_sec:
+                    write_summary(_summary(), output_dir)
+                    t_flush = time.perf_counter()
+
+    write_summary(_summary(), output_dir)
+    return stats
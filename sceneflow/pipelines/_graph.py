@@ -0,0 +1,132 @@
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+# End-of-stream marker passed between stages
+_STOP = object()
+
+
+@dataclass
+class Stage:
+    """A step of a `StageGraph`: *fn* is applied to every item by *workers* threads."""
+
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 2
+
+
+class StageGraph:
+    """
+    Linear dataflow executor.
+
+    Stages are connected by bounded queues, so a slow stage back-pressures the ones before it
+    instead of letting work pile up in memory. Each stage runs its own pool of threads (torch and
+    OpenCV release the GIL). Results are yielded in input order when *ordered*, otherwise as soon
+    as they are ready. The first exception raised by a stage stops the graph and is re-raised.
+    """
+
+    def __init__(self, stages: Sequence[Stage], ordered: bool = True, poll_sec: float = 0.1):
+        if not stages:
+            raise ValueError("StageGraph needs at least one stage")
+        self.stages = list(stages)
+        self.ordered = ordered
+        self.poll_sec = poll_sec
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        stages = self.stages
+        queues: List[queue.Queue] = [queue.Queue(maxsize=max(1, s.queue_size)) for s in stages]
+        queues.append(queue.Queue(maxsize=max(1, stages[-1].queue_size + stages[-1].workers)))
+
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        lock = threading.Lock()
+        remaining = [max(1, s.workers) for s in stages]
+
+        def _fail(exc: BaseException):
+            with lock:
+                errors.append(exc)
+            stop.set()
+
+        def _put(q: queue.Queue, obj: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(obj, timeout=self.poll_sec)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _get(q: queue.Queue) -> Any:
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=self.poll_sec)
+                except queue.Empty:
+                    continue
+            return _STOP
+
+        def _source():
+            try:
+                for seq, item in enumerate(items):
+                    if not _put(queues[0], (seq, item)):
+                        return
+            except BaseException as exc:
+                _fail(exc)
+            finally:
+                for _ in range(remaining[0]):
+                    _put(queues[0], _STOP)
+
+        def _worker(index: int):
+            stage = stages[index]
+            try:
+                while True:
+                    obj = _get(queues[index])
+                    if obj is _STOP:
+                        break
+                    seq, item = obj
+                    if not _put(queues[index + 1], (seq, stage.fn(item))):
+                        break
+            except BaseException as exc:
+                _fail(exc)
+            finally:
+                with lock:
+                    remaining[index] -= 1
+                    last = remaining[index] == 0
+                if last:
+                    n_next = remaining[index + 1] if index + 1 < len(stages) else 1
+                    for _ in range(n_next):
+                        _put(queues[index + 1], _STOP)
+
+        threads = [threading.Thread(target=_source, name="sceneflow-source", daemon=True)]
+        for i, stage in enumerate(stages):
+            for k in range(remaining[i]):
+                threads.append(
+                    threading.Thread(target=_worker, args=(i,), name=f"sceneflow-{stage.name}-{k}", daemon=True)
+                )
+        for t in threads:
+            t.start()
+
+        try:
+            reorder = {}
+            next_seq = 0
+            while True:
+                obj = _get(queues[-1])
+                if obj is _STOP:
+                    break
+                seq, result = obj
+                if not self.ordered:
+                    yield result
+                    continue
+
+                reorder[seq] = result
+                while next_seq in reorder:
+                    yield reorder.pop(next_seq)
+                    next_seq += 1
+
+            if errors:
+                raise errors[0]
+        finally:
+            stop.set()
+            for t in threads:
+                t.join()
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Statuses that do not need to be redone on resume
+DONE_STATUSES = ("ok", "empty")
+
+# (mtime, size, SHA-1) of an input file
+FileStamp = Tuple[float, int, str]
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_stamp(path: Path) -> Optional[FileStamp]:
+    """mtime, size and content hash of *path*, ``None`` if it cannot be read."""
+    try:
+        st = Path(path).stat()
+        return st.st_mtime, st.st_size, file_digest(path)
+    except OSError:
+        return None
+
+
+def run_fingerprint(
+    name: str,
+    cfg: Dict[str, Any],
+    ignore: Tuple[str, ...] = (
+        "input_dir",
+        "output_dir",
+        "device",
+        "cache_dir",
+        "cache_max_gb",
+        "concurrent_detectors",
+        "embedding_cache_dir",
+        "embedding_cache_max_gb",
+        "sam_max_boxes",
+    ),
+) -> str:
+    """Hash of the pipeline name and every model/parameter setting that affects its outputs."""
+    params = {k: v for k, v in cfg.items() if k not in ignore}
+    payload = json.dumps({"pipeline": name, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+    """
+    SQLite manifest of per-image results stored in the output directory.
+
+    Each row keeps the input's mtime, size and SHA-1, the run fingerprint, the status and the
+    per-image record, and is committed as soon as the image is done. An image is up to date when
+    its status is done, the fingerprint matches and the input is unchanged.
+    """
+
+    def __init__(self, db_path: Path, fingerprint: str):
+        self.db_path = Path(db_path)
+        self.fingerprint = fingerprint
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                path TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                mtime REAL,
+                size INTEGER,
+                sha1 TEXT,
+                fingerprint TEXT,
+                record TEXT,
+                updated REAL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _row(self, path: Path) -> Optional[Tuple]:
+        cur = self._conn.execute(
+            "SELECT status, mtime, size, sha1, fingerprint, record FROM images WHERE path = ?", (str(path),)
+        )
+        return cur.fetchone()
+
+    def lookup(self, path: Path) -> Optional[Dict[str, Any]]:
+        """Return the stored record if *path* is up to date, else ``None``."""
+        row = self._row(path)
+        if row is None:
+            return None
+
+        status, mtime, size, sha1, fingerprint, record = row
+        if status not in DONE_STATUSES or fingerprint != self.fingerprint:
+            return None
+
+        try:
+            st = Path(path).stat()
+        except OSError:
+            return None
+
+        if st.st_size != size:
+            return None
+
+        if st.st_mtime != mtime:
+            # Touched but possibly unchanged: fall back to the content hash
+            if file_digest(path) != sha1:
+                return None
+            self._conn.execute("UPDATE images SET mtime = ? WHERE path = ?", (st.st_mtime, str(path)))
+            self._conn.commit()
+
+        return json.loads(record) if record else {}
+
+    def commit(self, path: Path, record: Dict[str, Any], stamp: Optional[FileStamp] = None):
+        """
+        Store the result for *path* and commit immediately. *stamp* is the `file_stamp` taken when
+        the input was read, so that the caller does not hash it again; it is taken here otherwise.
+        """
+        path = Path(path)
+        if stamp is None:
+            stamp = file_stamp(path)
+        mtime, size, sha1 = stamp or (None, None, None)
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO images (path, status, mtime, size, sha1, fingerprint, record, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(path),
+                record.get("status", "ok"),
+                mtime,
+                size,
+                sha1,
+                self.fingerprint,
+                json.dumps(record, default=str),
+                time.time(),
+            ),
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self) -> "RunManifest":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,121 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from sceneflow.utils.logger import logger
+from sceneflow.utils.timing import TIMINGS
+
+TRACE_NAME = "trace.json"
+
+
+class PipelineProfiler:
+    """
+    Profile a window of a pipeline run: *count* images after skipping the first *skip* (warm-up).
+
+    Writes to *output_dir*:
+
+    - ``trace.json``: Chrome trace (chrome://tracing, Perfetto) with one span per stage, operation
+      and model call. When torch is in use, the trace is recorded by ``torch.profiler`` and also
+      holds the operators run inside the models.
+    - ``cprofile.pstats`` / ``cprofile.txt``: Python hot spots, sorted by cumulative time.
+    - ``torch_ops.txt``: operator table of ``torch.profiler``, when torch is in use.
+    """
+
+    def __init__(self, output_dir: Path, skip: int = 2, count: int = 20):
+        self.output_dir = Path(output_dir)
+        self.skip = max(0, skip)
+        self.count = max(1, count)
+        self.n_profiled = 0
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._torch_prof = None
+        self._events: List[Dict[str, Any]] = []
+        self._done = False
+
+    @property
+    def active(self) -> bool:
+        return self._cprofile is not None
+
+    def before_batch(self, n_seen: int):
+        """Start profiling once *n_seen* images went through the pipeline."""
+        if not self._done and not self.active and n_seen >= self.skip:
+            self._start()
+
+    def after_batch(self, n_batch: int):
+        if not self.active:
+            return
+        self.n_profiled += n_batch
+        if self.n_profiled >= self.count:
+            self._stop()
+
+    def close(self):
+        if self.active:
+            self._stop()
+
+    def _start(self):
+        logger.info(f"Profiling {self.count} image(s)")
+        torch = sys.modules.get("torch")
+
+        if torch is not None:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._torch_prof = torch.profiler.profile(activities=activities, record_shapes=True)
+            self._torch_prof.__enter__()
+            TIMINGS.span = lambda group, name: torch.profiler.record_function(f"{group}/{name}")
+        else:
+            TIMINGS.span = self._span
+
+        self._cprofile = cProfile.Profile()
+        self._cprofile.enable()
+
+    def _stop(self):
+        self._cprofile.disable()
+        TIMINGS.span = None
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        self._cprofile.dump_stats(str(self.output_dir / "cprofile.pstats"))
+        text = io.StringIO()
+        pstats.Stats(self._cprofile, stream=text).sort_stats("cumulative").print_stats(60)
+        (self.output_dir / "cprofile.txt").write_text(text.getvalue())
+
+        trace_path = self.output_dir / TRACE_NAME
+        if self._torch_prof is not None:
+            self._torch_prof.__exit__(None, None, None)
+            self._torch_prof.export_chrome_trace(str(trace_path))
+            table = self._torch_prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=50)
+            (self.output_dir / "torch_ops.txt").write_text(table)
+        else:
+            with open(trace_path, "w") as f:
+                json.dump({"traceEvents": self._events, "displayTimeUnit": "ms"}, f)
+
+        logger.info(f"Profile of {self.n_profiled} image(s) saved to: {self.output_dir}")
+        self._cprofile = None
+        self._torch_prof = None
+        self._events = []
+        self._done = True
+
+    @contextmanager
+    def _span(self, group: str, name: str) -> Iterator[None]:
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self._events.append(
+                {
+                    "name": name,
+                    "cat": group,
+                    "ph": "X",
+                    "ts": t0 / 1000,
+                    "dur": (time.perf_counter_ns() - t0) / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                }
+            )
@@ -0,0 +1,197 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+from sceneflow.core.mask_cache import MaskCache
+from sceneflow.core.mask_generator import MaskGenerator
+from sceneflow.core.mask_store import MaskStore
+from sceneflow.pipelines._common import PipelineStage, run_pipeline, segmentor_kwargs
+from sceneflow.utils.embedding_cache import EmbeddingCache
+from sceneflow.utils.io import get_all_images
+from sceneflow.utils.logger import logger
+
+
+def _setup(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    cache = None
+    if cfg["cache_dir"]:
+        cache = MaskCache(cfg["cache_dir"], max_bytes=int(cfg["cache_max_gb"] * 1024**3))
+
+    embedding_cache = None
+    if cfg["embedding_cache_dir"]:
+        embedding_cache = EmbeddingCache(
+            cfg["embedding_cache_dir"], max_bytes=int(cfg["embedding_cache_max_gb"] * 1024**3)
+        )
+
+    mask_gen = MaskGenerator.from_pretrained(
+        cfg["detectors"],
+        cfg["ovd_detectors"],
+        cfg["segmentor"],
+        device=cfg["device"],
+        cache=cache,
+        embedding_cache=embedding_cache,
+        segmentor_kwargs=segmentor_kwargs(cfg),
+        tile_size=cfg["tile_size"],
+        tile_overlap=cfg["tile_overlap"],
+        detect_size=cfg["detect_size"],
+        segment_size=cfg["segment_size"],
+        concurrent=cfg["concurrent_detectors"],
+        replicas=cfg.get("replicas", 1),
+    )
+    return {"cfg": cfg, "mask_gen": mask_gen, "store": MaskStore(cfg["output_dir"])}
+
+
+def _detect(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    cfg = state["cfg"]
+
+    jobs = state["mask_gen"].detect_batch(
+        [it["image"][0] for it in items],
+        conf=cfg["det_thd"],
+        prompt=cfg["allowed_classes"],
+        scales=[it["image"][3] for it in items],
+        original_sizes=[it["image"][2] for it in items],
+        nms_iou=cfg["nms_iou"],
+    )
+    for it, job in zip(items, jobs):
+        it["job"] = job
+
+
+def _segment(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    for it in items:
+        it["detections"], _, _ = state["mask_gen"].segment(it.pop("job"))
+
+
+def _store(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    cfg = state["cfg"]
+
+    for it in items:
+        detections = it["detections"]
+        rel_path = it["path"].relative_to(cfg["input_dir"]).as_posix()
+        state["store"].put(rel_path, it["image"][2], detections.as_dicts())
+        it["record"]["counts"] = detections.class_counts()
+
+
+def export_masks(
+    input_dir: str,
+    output_dir: str,
+    detectors: str,
+    ovd_detectors: str,
+    segmentor: str,
+    nms_iou: float,
+    det_thd: float,
+    allowed_classes: Optional[str],
+    resize: Optional[Tuple[int, int]] = None,
+    tile_size: Optional[int] = None,
+    tile_overlap: float = 0.2,
+    detect_size: Optional[int] = None,
+    segment_size: Optional[int] = None,
+    prefetch: int = 4,
+    workers: int = 1,
+    batch_size: int = 1,
+    stage_workers: Optional[Dict[str, int]] = None,
+    profile: bool = False,
+    profile_window: Tuple[int, int] = (2, 20),
+    resume: bool = False,
+    cache_dir: Optional[str] = None,
+    cache_max_gb: float = 10.0,
+    embedding_cache_dir: Optional[str] = None,
+    embedding_cache_max_gb: float = 20.0,
+    sam_max_boxes: Optional[int] = None,
+    sam_min_area: Optional[float] = None,
+    small_object_mask: Optional[str] = None,
+    concurrent_detectors: bool = False,
+):
+    """Run detection + segmentation once and store every detection and RLE mask in `masks.sqlite`."""
+    # Paths
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Device, chosen as in redact so that rendering a mask store gives what redact would
+    device = "cpu" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Running on device: {device}")
+
+    allow: List[str | int] | None = None
+    if allowed_classes:
+        allow = [c.strip() for c in allowed_classes.split(",") if c.strip()]
+
+    logger.info(f"Allowed classes: {allow}")
+    logger.info(f"Resize images to: {resize}")
+    if tile_size:
+        logger.info(f"Tiles: {tile_size}px, {tile_overlap:.0%} overlap")
+    if detect_size or segment_size:
+        logger.info(f"Detect size: {detect_size}, segment size: {segment_size}")
+    logger.info(f"NMS IoU threshold: {nms_iou}")
+    logger.info(f"Detection threshold: {det_thd}")
+
+    images_paths = get_all_images(input_dir)
+    if len(images_paths) == 0:
+        logger.warning("No images found.")
+        return
+
+    cfg = {
+        "input_dir": input_dir,
+        "output_dir": output_dir,
+        "detectors": list(detectors),
+        "ovd_detectors": [name for name in ovd_detectors if name != "none"],
+        "segmentor": segmentor,
+        "allowed_classes": allow,
+        "det_thd": det_thd,
+        "nms_iou": nms_iou,
+        "resize": resize,
+        "tile_size": tile_size,
+        "tile_overlap": tile_overlap,
+        "detect_size": detect_size,
+        "segment_size": segment_size,
+        "device": device,
+        "cache_dir": cache_dir,
+        "cache_max_gb": cache_max_gb,
+        "embedding_cache_dir": embedding_cache_dir,
+        "embedding_cache_max_gb": embedding_cache_max_gb,
+        "sam_max_boxes": sam_max_boxes,
+        "sam_min_area": sam_min_area,
+        "small_object_mask": small_object_mask,
+        "concurrent_detectors": concurrent_detectors,
+    }
+
+    with MaskStore(output_dir) as store:
+        store.set_meta(
+            input_dir=str(input_dir.resolve()),
+            params={
+                k: cfg[k]
+                for k in (
+                    "detectors",
+                    "ovd_detectors",
+                    "segmentor",
+                    "allowed_classes",
+                    "det_thd",
+                    "nms_iou",
+                    "resize",
+                    "tile_size",
+                    "tile_overlap",
+                    "detect_size",
+                    "segment_size",
+                )
+            },
+        )
+
+    run_pipeline(
+        images_paths,
+        _setup,
+        [
+            PipelineStage("detect", _detect, models=True),
+            PipelineStage("segment", _segment, models=True),
+            PipelineStage("store", _store),
+        ],
+        cfg,
+        name="masks",
+        workers=workers,
+        prefetch=prefetch,
+        batch_size=batch_size,
+        stage_workers=stage_workers,
+        profile=profile_window if profile else None,
+        resume=resume,
+        total_key="total_detections",
+    )
+
+    logger.info(f"✔ Finished. Masks saved to: {output_dir / 'masks.sqlite'}")
@@ -1,28 +1,86 @@
 import json
-import time
-from collections import Counter
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import torch
 
 from sceneflow.core.ocr_processor import OCRProcessor
+from sceneflow.pipelines._common import PipelineStage, output_path, run_pipeline
 from sceneflow.utils.draw import blend_detections
 from sceneflow.utils.io import (
     get_all_images,
-    load_image,
     save_image,
+    save_json,
 )
 from sceneflow.utils.logger import logger
-from sceneflow.utils.progress import get_progress
+
+
+def _setup(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    processor = OCRProcessor.from_pretrained(
+        cfg["text_detectors"],
+        device=cfg["device"],
+        concurrent=cfg["concurrent_detectors"],
+        tile_size=cfg["tile_size"],
+        tile_overlap=cfg["tile_overlap"],
+        replicas=cfg.get("replicas", 1),
+    )
+    return {"cfg": cfg, "processor": processor}
+
+
+def _detect(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    cfg = state["cfg"]
+
+    # Run OCR
+    batch_detections = state["processor"].process_batch(
+        [it["image"][0] for it in items],
+        conf=cfg["det_thd"],
+        scales=[it["image"][3] for it in items],
+    )
+    for it, detections in zip(items, batch_detections):
+        it["detections"] = detections
+
+
+def _render(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    for it in items:
+        # Visual overlay
+        if it["detections"]:
+            it["blended"] = blend_detections(it["image"][1], it["detections"])
+
+
+def _save(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    cfg = state["cfg"]
+
+    for it in items:
+        detections = it["detections"]
+        save_path = output_path(it["path"], cfg["input_dir"], cfg["output_dir"])
+
+        if "blended" in it:
+            save_image(it.pop("blended"), save_path.with_suffix(".detected.png"))
+
+        # Save detections as JSON
+        text_data = [json.dumps(d) for d in detections.as_dicts()]
+        save_json(text_data, save_path.with_suffix(".json"))
+
+        it["record"]["counts"] = detections.class_counts()
 
 
 def detect_text_boxes(
     input_dir: Path,
     output_dir: Path,
-    text_detector: str,
+    text_detector: Union[str, Sequence[str]],
     det_thd: float = 0.0,
     resize: Optional[Tuple[int, int]] = None,
+    tile_size: Optional[int] = None,
+    tile_overlap: float = 0.2,
+    prefetch: int = 4,
+    writers: int = 2,
+    workers: int = 1,
+    batch_size: int = 1,
+    stage_workers: Optional[Dict[str, int]] = None,
+    profile: bool = False,
+    profile_window: Tuple[int, int] = (2, 20),
+    resume: bool = False,
+    concurrent_detectors: bool = False,
 ):
     # Paths
     input_dir = Path(input_dir)
@@ -33,69 +91,47 @@ def detect_text_boxes(
     device = "cpu" if torch.cuda.is_available() else "cpu"
     logger.info(f"Running on device: {device}")
 
-    # Load OCRProcessor
-    processor = OCRProcessor.from_pretrained([text_detector], device=device)
-
-    logger.info(f"Using text detector: {text_detector}")
+    text_detectors = [text_detector] if isinstance(text_detector, str) else list(text_detector)
+    logger.info(f"Using text detector(s): {', '.join(text_detectors)}")
     logger.info(f"Detection threshold: {det_thd}")
     logger.info(f"Resize images to: {resize}")
-
-    # Stats
-    per_class = Counter()
-    n_processed = 0
-    t_start = time.perf_counter()
+    if tile_size:
+        logger.info(f"Tiles: {tile_size}px, {tile_overlap:.0%} overlap")
 
     images_paths = get_all_images(input_dir)
     if len(images_paths) == 0:
         logger.warning("No images found.")
         return
 
-    with get_progress() as progress:
-        task = progress.add_task("Processing images", total=len(images_paths))
-
-        for img_path in images_paths:
-            img, img_bgr, original_size, scale = load_image(img_path, resize=resize)
-
-            if img is None:
-                logger.warning(f"Skipping invalid image: {img_path}")
-                progress.advance(task)
-                continue
-
-            # Run OCR
-            detections = processor.process(img, conf=det_thd, scale=scale)
-
-            for d in detections:
-                per_class[d.class_name] += 1
-
-            n_processed += 1
-
-            # Save paths
-            relative_path = img_path.relative_to(input_dir)
-            save_path = output_dir / relative_path
-            save_path.parent.mkdir(parents=True, exist_ok=True)
-
-            # Save visual overlay
-            if detections:
-                blended = blend_detections(img_bgr, detections)
-                save_image(blended, save_path.with_suffix(".detected.png"))
-
-            # Save detections as JSON
-            text_data = [d.to_json() for d in detections]
-            with open(save_path.with_suffix(".json"), "w") as f:
-                json.dump(text_data, f, indent=2)
-
-            progress.advance(task)
-
-    # Summary
-    elapsed = time.perf_counter() - t_start
-    summary = {
-        "total_images": len(images_paths),
-        "processed_images": n_processed,
-        "total_text_boxes": int(sum(per_class.values())),
-        "avg_time_per_image_sec": round(elapsed / max(1, n_processed), 3),
+    cfg = {
+        "input_dir": input_dir,
+        "output_dir": output_dir,
+        "text_detectors": text_detectors,
+        "det_thd": det_thd,
+        "resize": resize,
+        "tile_size": tile_size,
+        "tile_overlap": tile_overlap,
+        "device": device,
+        "concurrent_detectors": concurrent_detectors,
     }
 
-    with open(output_dir / "summary.json", "w") as f:
-        json.dump(summary, f, indent=2)
+    run_pipeline(
+        images_paths,
+        _setup,
+        [
+            PipelineStage("detect", _detect, models=True),
+            PipelineStage("render", _render, workers=2),
+            PipelineStage("save", _save, workers=writers),
+        ],
+        cfg,
+        name="ocr",
+        workers=workers,
+        prefetch=prefetch,
+        batch_size=batch_size,
+        stage_workers=stage_workers,
+        profile=profile_window if profile else None,
+        resume=resume,
+        total_key="total_text_boxes",
+    )
 
     logger.info(f"✔ Finished. Results saved to: {output_dir}")
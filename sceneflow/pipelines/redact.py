@@ -1,22 +1,103 @@
-import json
-import time
-from collections import Counter
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import torch
 
 from sceneflow.core.camouflage import Camouflage
+from sceneflow.core.mask_cache import MaskCache
 from sceneflow.core.mask_generator import MaskGenerator
+from sceneflow.pipelines._common import PipelineStage, output_path, run_pipeline, segmentor_kwargs
 from sceneflow.utils.draw import blend_detections, generate_static_scene_mask
+from sceneflow.utils.embedding_cache import EmbeddingCache
 from sceneflow.utils.io import (
     get_all_images,
-    load_image,
     save_image,
     save_mask,
 )
 from sceneflow.utils.logger import logger
-from sceneflow.utils.progress import get_progress
+
+
+def _setup(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    cache = None
+    if cfg["cache_dir"]:
+        cache = MaskCache(cfg["cache_dir"], max_bytes=int(cfg["cache_max_gb"] * 1024**3))
+
+    embedding_cache = None
+    if cfg["embedding_cache_dir"]:
+        embedding_cache = EmbeddingCache(
+            cfg["embedding_cache_dir"], max_bytes=int(cfg["embedding_cache_max_gb"] * 1024**3)
+        )
+
+    mask_gen = MaskGenerator.from_pretrained(
+        cfg["detectors"],
+        cfg["ovd_detectors"],
+        cfg["segmentor"],
+        device=cfg["device"],
+        cache=cache,
+        embedding_cache=embedding_cache,
+        segmentor_kwargs=segmentor_kwargs(cfg),
+        tile_size=cfg["tile_size"],
+        tile_overlap=cfg["tile_overlap"],
+        detect_size=cfg["detect_size"],
+        segment_size=cfg["segment_size"],
+        concurrent=cfg["concurrent_detectors"],
+        replicas=cfg.get("replicas", 1),
+    )
+    camouflage = Camouflage(method=cfg["camouflage_method"])
+
+    logger.info(f"Detector  : {mask_gen.__class__.__name__}")
+    logger.info(f"Segmentor : {type(camouflage).__name__}")
+
+    return {"cfg": cfg, "mask_gen": mask_gen, "camouflage": camouflage}
+
+
+def _detect(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    cfg = state["cfg"]
+
+    jobs = state["mask_gen"].detect_batch(
+        [it["image"][0] for it in items],
+        conf=cfg["det_thd"],
+        prompt=cfg["allowed_classes"],
+        scales=[it["image"][3] for it in items],
+        original_sizes=[it["image"][2] for it in items],
+        nms_iou=cfg["nms_iou"],
+    )
+    for it, job in zip(items, jobs):
+        it["job"] = job
+
+
+def _segment(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    for it in items:
+        it["detections"], it["masks"], _ = state["mask_gen"].segment(it.pop("job"))
+
+
+def _camouflage(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    for it in items:
+        img_bgr, detections, masks = it["image"][1], it["detections"], it["masks"]
+
+        outputs = {}
+        if len(masks) > 0:
+            outputs["camouflaged"] = state["camouflage"].hide(img_bgr, masks)
+        if len(detections) > 0:
+            outputs["blended"] = blend_detections(img_bgr, detections)
+        outputs["static"] = generate_static_scene_mask(img_bgr, detections)
+        it["outputs"] = outputs
+
+
+def _save(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    cfg = state["cfg"]
+
+    for it in items:
+        save_path = output_path(it["path"], cfg["input_dir"], cfg["output_dir"])
+        outputs = it.pop("outputs")
+
+        if "camouflaged" in outputs:
+            save_image(outputs["camouflaged"], save_path.with_suffix(".camouflaged.png"))
+        if "blended" in outputs:
+            save_image(outputs["blended"], save_path.with_suffix(".blended.png"))
+        save_mask(outputs["static"], save_path.parent / (save_path.name + ".png"))
+
+        it["record"]["counts"] = it["detections"].class_counts()
 
 
 def redact(
@@ -30,6 +111,26 @@ def redact(
     allowed_classes: Optional[str],
     camouflage_method: str,
     resize: Optional[Tuple[int, int]] = None,
+    tile_size: Optional[int] = None,
+    tile_overlap: float = 0.2,
+    detect_size: Optional[int] = None,
+    segment_size: Optional[int] = None,
+    prefetch: int = 4,
+    writers: int = 2,
+    workers: int = 1,
+    batch_size: int = 1,
+    stage_workers: Optional[Dict[str, int]] = None,
+    profile: bool = False,
+    profile_window: Tuple[int, int] = (2, 20),
+    resume: bool = False,
+    cache_dir: Optional[str] = None,
+    cache_max_gb: float = 10.0,
+    embedding_cache_dir: Optional[str] = None,
+    embedding_cache_max_gb: float = 20.0,
+    sam_max_boxes: Optional[int] = None,
+    sam_min_area: Optional[float] = None,
+    small_object_mask: Optional[str] = None,
+    concurrent_detectors: bool = False,
 ):
     # Paths
     input_dir = Path(input_dir)
@@ -39,12 +140,6 @@ def redact(
     # Device
     device = "cpu" if torch.cuda.is_available() else "cpu"
     logger.info(f"Running on device: {device}")
-
-    mask_gen = MaskGenerator.from_pretrained(detectors, ovd_detectors, segmentor, device=device)
-    camouflage = Camouflage(method=camouflage_method)
-
-    logger.info(f"Detector  : {mask_gen.__class__.__name__}")
-    logger.info(f"Segmentor : {type(camouflage).__name__}")
     logger.info(f"Camouflage : {camouflage_method}")
 
     allow: List[str | int] | None = None
@@ -53,6 +148,10 @@ def redact(
 
     logger.info(f"Allowed classes: {allow}")
     logger.info(f"Resize images to: {resize}")
+    if tile_size:
+        logger.info(f"Tiles: {tile_size}px, {tile_overlap:.0%} overlap")
+    if detect_size or segment_size:
+        logger.info(f"Detect size: {detect_size}, segment size: {segment_size}")
     logger.info(f"NMS IoU threshold: {nms_iou}")
     logger.info(f"Detection threshold: {det_thd}")
 
@@ -61,68 +160,51 @@ def redact(
         logger.warning("No images found.")
         return
 
-    # Stats
-    per_class = Counter()
-    n_processed = 0
-    n_skipped = 0
-    t_start = time.perf_counter()
+    cfg = {
+        "input_dir": input_dir,
+        "output_dir": output_dir,
+        "detectors": list(detectors),
+        "ovd_detectors": [name for name in ovd_detectors if name != "none"],
+        "segmentor": segmentor,
+        "camouflage_method": camouflage_method,
+        "allowed_classes": allow,
+        "det_thd": det_thd,
+        "nms_iou": nms_iou,
+        "resize": resize,
+        "tile_size": tile_size,
+        "tile_overlap": tile_overlap,
+        "detect_size": detect_size,
+        "segment_size": segment_size,
+        "device": device,
+        "cache_dir": cache_dir,
+        "cache_max_gb": cache_max_gb,
+        "embedding_cache_dir": embedding_cache_dir,
+        "embedding_cache_max_gb": embedding_cache_max_gb,
+        "sam_max_boxes": sam_max_boxes,
+        "sam_min_area": sam_min_area,
+        "small_object_mask": small_object_mask,
+        "concurrent_detectors": concurrent_detectors,
+    }
 
     # Process images
-    with get_progress() as progress:
-        task = progress.add_task("Processing images", total=len(images_paths))
-
-        for img_path in images_paths:
-            # Load image
-            img, img_bgr, original_size, scale = load_image(img_path, resize=resize)
-
-            if img is None:
-                logger.warning(f"Skipping invalid image: {img_path}")
-                progress.advance(task)
-                continue
-
-            # Generate masks
-            detections, masks, _ = mask_gen.generate(
-                img, conf=det_thd, allowed_classes=allow, scale=scale, original_size=original_size, nms_iou=nms_iou
-            )
-
-            # stats update
-            for d in detections:
-                per_class[d["class_name"]] += 1
-
-            n_processed += 1
-
-            # Save paths
-            relative_path = img_path.relative_to(input_dir)
-            save_path = output_dir / relative_path
-            save_path.parent.mkdir(parents=True, exist_ok=True)
-
-            # Apply camouflage
-            if len(masks) > 0:
-                inpainted = camouflage.hide(img_bgr.copy(), masks)
-                save_image(inpainted, save_path.with_suffix(".camouflaged.png"))
-
-            if len(detections) > 0:
-                blended = blend_detections(img_bgr, detections)
-                save_image(blended, save_path.with_suffix(".blended.png"))
-
-            # Save
-            static_mask = generate_static_scene_mask(img_bgr, detections)
-
-            save_mask(static_mask, save_path.parent / (save_path.name + ".png"))
-
-            progress.advance(task)
-
-    # Write summary
-    elapsed = time.perf_counter() - t_start
-    summary = {
-        "total_images": len(images_paths),
-        "processed_images": n_processed,
-        "skipped_images": n_skipped,
-        "total_detections_removed": int(sum(per_class.values())),
-        "per_class_counts": dict(per_class),
-        "avg_time_per_image_sec": round(elapsed / max(1, n_processed), 3),
-    }
-    with open(output_dir / "summary.json", "w") as f:
-        json.dump(summary, f, indent=2)
+    run_pipeline(
+        images_paths,
+        _setup,
+        [
+            PipelineStage("detect", _detect, models=True),
+            PipelineStage("segment", _segment, models=True),
+            PipelineStage("camouflage", _camouflage, workers=4),
+            PipelineStage("save", _save, workers=writers),
+        ],
+        cfg,
+        name="redact",
+        workers=workers,
+        prefetch=prefetch,
+        batch_size=batch_size,
+        stage_workers=stage_workers,
+        profile=profile_window if profile else None,
+        resume=resume,
+        total_key="total_detections_removed",
+    )
 
     logger.info(f"✔ Finished. Results saved to: {output_dir}")
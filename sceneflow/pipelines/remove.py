@@ -1,15 +1,81 @@
-import json
-import time
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import torch
 
+from sceneflow.core.mask_cache import MaskCache
 from sceneflow.core.mask_generator import MaskGenerator
 from sceneflow.core.remover import Remover
-from sceneflow.utils.io import get_all_images, load_image, save_image
+from sceneflow.pipelines._common import PipelineStage, output_path, run_pipeline, segmentor_kwargs
+from sceneflow.utils.embedding_cache import EmbeddingCache
+from sceneflow.utils.io import get_all_images, save_image
 from sceneflow.utils.logger import logger
-from sceneflow.utils.progress import get_progress
+
+
+def _setup(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    cache = None
+    if cfg["cache_dir"]:
+        cache = MaskCache(cfg["cache_dir"], max_bytes=int(cfg["cache_max_gb"] * 1024**3))
+
+    embedding_cache = None
+    if cfg["embedding_cache_dir"]:
+        embedding_cache = EmbeddingCache(
+            cfg["embedding_cache_dir"], max_bytes=int(cfg["embedding_cache_max_gb"] * 1024**3)
+        )
+
+    mask_gen = MaskGenerator.from_pretrained(
+        detectors=[],
+        ovd_detectors=[cfg["ovd_detector"]],
+        segmentor=cfg["segmentor"],
+        device=cfg["device"],
+        cache=cache,
+        embedding_cache=embedding_cache,
+        segmentor_kwargs=segmentor_kwargs(cfg),
+        tile_size=cfg["tile_size"],
+        tile_overlap=cfg["tile_overlap"],
+        detect_size=cfg["detect_size"],
+        segment_size=cfg["segment_size"],
+        replicas=cfg.get("replicas", 1),
+    )
+    remover = Remover(inpainter=cfg["inpainter"], device=cfg["device"], replicas=cfg.get("replicas", 1))
+    return {"cfg": cfg, "mask_gen": mask_gen, "remover": remover}
+
+
+def _detect(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    cfg = state["cfg"]
+
+    jobs = state["mask_gen"].detect_batch(
+        [it["image"][0] for it in items],
+        conf=cfg["det_thd"],
+        prompt=cfg["prompt"],
+        nms_iou=cfg["nms_iou"],
+    )
+    for it, job in zip(items, jobs):
+        it["job"] = job
+
+
+def _segment(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    for it in items:
+        _, masks, _ = state["mask_gen"].segment(it.pop("job"))
+        if not masks.any():
+            logger.info(f"No objects found for: {it['path'].name}")
+            it["record"]["status"] = "empty"
+            continue
+        it["masks"] = masks
+
+
+def _inpaint(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    for it in items:
+        it["inpainted"] = state["remover"].remove(it["image"][0].copy(), it["masks"])
+
+
+def _save(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    cfg = state["cfg"]
+
+    for it in items:
+        save_path = output_path(it["path"], cfg["input_dir"], cfg["output_dir"])
+        save_image(it.pop("inpainted"), save_path.with_suffix(".inpainted.png"))
+        it["record"]["counts"] = {"objects": len(it["masks"])}
 
 
 def remove_objects_with_prompts(
@@ -21,7 +87,26 @@ def remove_objects_with_prompts(
     prompt: str,
     det_thd: float = 0.25,
     resize: Optional[Tuple[int, int]] = None,
+    tile_size: Optional[int] = None,
+    tile_overlap: float = 0.2,
+    detect_size: Optional[int] = None,
+    segment_size: Optional[int] = None,
     nms_iou: float = 0.5,
+    prefetch: int = 4,
+    writers: int = 2,
+    workers: int = 1,
+    batch_size: int = 1,
+    stage_workers: Optional[Dict[str, int]] = None,
+    profile: bool = False,
+    profile_window: Tuple[int, int] = (2, 20),
+    resume: bool = False,
+    cache_dir: Optional[str] = None,
+    cache_max_gb: float = 10.0,
+    embedding_cache_dir: Optional[str] = None,
+    embedding_cache_max_gb: float = 20.0,
+    sam_max_boxes: Optional[int] = None,
+    sam_min_area: Optional[float] = None,
+    small_object_mask: Optional[str] = None,
 ):
     # Paths
     input_dir = Path(input_dir)
@@ -36,78 +121,64 @@ def remove_objects_with_prompts(
     logger.info(f"Inpainter: {inpainter}")
     logger.info(f"Detection threshold: {det_thd}")
     logger.info(f"Resize images to: {resize}")
+    if tile_size:
+        logger.info(f"Tiles: {tile_size}px, {tile_overlap:.0%} overlap")
+    if detect_size or segment_size:
+        logger.info(f"Detect size: {detect_size}, segment size: {segment_size}")
 
     prompt = [p.strip() for p in prompt.split(",") if p.strip()]
     if not prompt:
         logger.warning("No valid prompt classes provided.")
         return
 
-    # Init models
-    mask_gen = MaskGenerator.from_pretrained(
-        detectors=[],
-        ovd_detectors=[ovd_detector],
-        segmentor=segmentor,
-        device=device,
-    )
-    remover = Remover(inpainter=inpainter, device=device)
-
-    summary = {
-        "total_images": 0,
-        "processed_images": 0,
-        "removed_objects": 0,
-        "avg_time_per_image_sec": 0.0,
-    }
-
     image_paths = get_all_images(input_dir)
     if not image_paths:
         logger.warning("No images found.")
         return
 
-    t_start = time.perf_counter()
-
-    with get_progress() as progress:
-        task = progress.add_task("Removing objects", total=len(image_paths))
-
-        for img_path in image_paths:
-            img = load_image(img_path, resize=resize)[0]
-            if img is None:
-                logger.warning(f"Skipping invalid image: {img_path}")
-                progress.advance(task)
-                continue
-
-            # Detect and segment
-            _, masks, _ = mask_gen.generate(
-                img.copy(),
-                conf=det_thd,
-                prompt=prompt,
-                nms_iou=nms_iou,
-            )
-            if not masks.any():
-                logger.info(f"No objects found for: {img_path.name}")
-                progress.advance(task)
-                continue
-
-            # Inpaint
-            inpainted = remover.remove(img.copy(), masks)
-
-            # Save
-            relative_path = img_path.relative_to(input_dir)
-            save_path = output_dir / relative_path
-            save_path.parent.mkdir(parents=True, exist_ok=True)
-
-            save_image(inpainted, save_path.with_suffix(".inpainted.png"))
-
-            summary["processed_images"] += 1
-            summary["removed_objects"] += len(masks)
-
-            progress.advance(task)
-
-    elapsed = time.perf_counter() - t_start
-    summary["total_images"] = len(image_paths)
-    summary["avg_time_per_image_sec"] = round(elapsed / max(1, summary["processed_images"]), 3)
+    cfg = {
+        "input_dir": input_dir,
+        "output_dir": output_dir,
+        "ovd_detector": ovd_detector,
+        "segmentor": segmentor,
+        "inpainter": inpainter,
+        "prompt": prompt,
+        "det_thd": det_thd,
+        "nms_iou": nms_iou,
+        "resize": resize,
+        "tile_size": tile_size,
+        "tile_overlap": tile_overlap,
+        "detect_size": detect_size,
+        "segment_size": segment_size,
+        "device": device,
+        "cache_dir": cache_dir,
+        "cache_max_gb": cache_max_gb,
+        "embedding_cache_dir": embedding_cache_dir,
+        "embedding_cache_max_gb": embedding_cache_max_gb,
+        "sam_max_boxes": sam_max_boxes,
+        "sam_min_area": sam_min_area,
+        "small_object_mask": small_object_mask,
+    }
 
-    # Save summary
-    with open(output_dir / "summary.json", "w") as f:
-        json.dump(summary, f, indent=2)
+    run_pipeline(
+        image_paths,
+        _setup,
+        [
+            PipelineStage("detect", _detect, models=True),
+            PipelineStage("segment", _segment, models=True),
+            PipelineStage("inpaint", _inpaint, models=True),
+            PipelineStage("save", _save, workers=writers),
+        ],
+        cfg,
+        name="remove",
+        workers=workers,
+        prefetch=prefetch,
+        batch_size=batch_size,
+        stage_workers=stage_workers,
+        profile=profile_window if profile else None,
+        resume=resume,
+        total_key="removed_objects",
+        description="Removing objects",
+    )
 
     logger.info(f"✔ Done. Results saved to {output_dir}")
@@ -0,0 +1,133 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sceneflow.core.camouflage import Camouflage
+from sceneflow.core.mask_store import MaskStore, decode_masks
+from sceneflow.pipelines._common import PipelineStage, output_path, run_pipeline
+from sceneflow.utils.draw import blend_detections, generate_static_scene_mask
+from sceneflow.utils.io import save_image, save_mask
+from sceneflow.utils.logger import logger
+
+# Model-free: nothing in this module may import torch or a runner backend
+
+RENDER_OUTPUTS = ("camouflaged", "blended", "static")
+
+
+def _setup(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    store = MaskStore(cfg["store"], readonly=True)
+    return {"cfg": cfg, "store": store, "camouflage": Camouflage(method=cfg["camouflage_method"])}
+
+
+def _render(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    cfg = state["cfg"]
+    outputs = cfg["outputs"]
+
+    for it in items:
+        img_path, (_, img_bgr, original_size, _) = it["path"], it["image"]
+        entry = state["store"].get(img_path.relative_to(cfg["input_dir"]).as_posix())
+        if entry is None:
+            logger.warning(f"No masks stored for: {img_path}")
+            it["record"]["status"] = "skipped"
+            continue
+
+        image_size, detections = entry
+        if tuple(image_size) != tuple(original_size):
+            raise ValueError(f"Stored mask size {image_size} does not match image {img_path} {original_size}")
+
+        # Decoded once for camouflage, overlay and static mask, which share its union
+        masks = decode_masks(detections, image_size)
+        rendered = {}
+
+        if "camouflaged" in outputs and len(masks) > 0:
+            rendered["camouflaged"] = state["camouflage"].hide(img_bgr, masks)
+
+        if "blended" in outputs and len(detections) > 0:
+            rendered["blended"] = blend_detections(img_bgr, detections, masks=masks)
+
+        if "static" in outputs:
+            rendered["static"] = generate_static_scene_mask(img_bgr, detections, masks=masks)
+
+        counts: Dict[str, int] = {}
+        for d in detections:
+            counts[d["class_name"]] = counts.get(d["class_name"], 0) + 1
+        it["record"]["counts"] = counts
+        it["outputs"] = rendered
+
+
+def _save(state: Dict[str, Any], items: List[Dict[str, Any]]):
+    cfg = state["cfg"]
+
+    for it in items:
+        save_path = output_path(it["path"], cfg["input_dir"], cfg["output_dir"])
+        rendered = it.pop("outputs")
+
+        if "camouflaged" in rendered:
+            save_image(rendered["camouflaged"], save_path.with_suffix(".camouflaged.png"))
+        if "blended" in rendered:
+            save_image(rendered["blended"], save_path.with_suffix(".blended.png"))
+        if "static" in rendered:
+            save_mask(rendered["static"], save_path.parent / (save_path.name + ".png"))
+
+
+def render(
+    store: str,
+    output_dir: str,
+    camouflage_method: str,
+    input_dir: Optional[str] = None,
+    outputs: Sequence[str] = RENDER_OUTPUTS,
+    prefetch: int = 4,
+    writers: int = 2,
+    workers: Optional[int] = None,
+    stage_workers: Optional[Dict[str, int]] = None,
+    profile: bool = False,
+    profile_window: Tuple[int, int] = (2, 20),
+    resume: bool = False,
+):
+    """Render camouflage, overlays and static-scene masks from a mask store, without any model."""
+    store_path = Path(store)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with MaskStore(store_path, readonly=True) as mask_store:
+        store_file = mask_store.path
+        input_dir = Path(input_dir or mask_store.meta("input_dir"))
+        rel_paths = mask_store.keys()
+
+    if not rel_paths:
+        logger.warning("Mask store is empty.")
+        return
+
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Mask store: {store_file} ({len(rel_paths)} images)")
+    logger.info(f"Camouflage : {camouflage_method}")
+    logger.info(f"Outputs: {', '.join(outputs)}")
+
+    cfg = {
+        "input_dir": input_dir,
+        "output_dir": output_dir,
+        "store": store_file,
+        "camouflage_method": camouflage_method,
+        "outputs": sorted(outputs),
+        "resize": None,
+    }
+
+    run_pipeline(
+        [input_dir / p for p in rel_paths],
+        _setup,
+        [
+            PipelineStage("render", _render, workers=os.cpu_count() or 1),
+            PipelineStage("save", _save, workers=writers),
+        ],
+        cfg,
+        name="render",
+        workers=workers,
+        prefetch=prefetch,
+        stage_workers=stage_workers,
+        profile=profile_window if profile else None,
+        resume=resume,
+        total_key="total_detections_rendered",
+        description="Rendering images",
+    )
+
+    logger.info(f"✔ Finished. Results saved to: {output_dir}")
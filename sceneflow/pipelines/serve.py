@@ -0,0 +1,409 @@
+import ipaddress
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import cv2
+import numpy as np
+import torch
+
+from sceneflow.core.camouflage import AVAILABLE_CAMOUFLAGE_METHODS, Camouflage
+from sceneflow.core.mask_generator import MaskGenerator
+from sceneflow.core.ocr_processor import OCRProcessor
+from sceneflow.core.remover import Remover
+from sceneflow.pipelines._batcher import MicroBatcher, Overloaded
+from sceneflow.pipelines._common import _close_state, segmentor_kwargs
+from sceneflow.utils.io import decode_image
+from sceneflow.utils.logger import logger
+from sceneflow.utils.timing import TIMINGS
+
+IMAGE_FORMATS = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp"}
+
+# (HTTP status, content type, body)
+Response = Tuple[int, str, bytes]
+
+
+class RequestError(Exception):
+    """A bad request, answered with *status* and the message."""
+
+    def __init__(self, message: str, status: int = HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = int(status)
+
+
+def _setup(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Load the models of the enabled endpoints once, as a `RunnerPool` of *replicas* each. Endpoints
+    using the same model (OWL-ViT and SAM for ``redact`` and ``remove``) share its pool.
+    """
+    state: Dict[str, Any] = {"cfg": cfg}
+
+    if "redact" in cfg["endpoints"]:
+        state["mask_gen"] = MaskGenerator.from_pretrained(
+            cfg["detectors"],
+            cfg["ovd_detectors"],
+            cfg["segmentor"],
+            device=cfg["device"],
+            segmentor_kwargs=segmentor_kwargs(cfg),
+            tile_size=cfg["tile_size"],
+            detect_size=cfg["detect_size"],
+            segment_size=cfg["segment_size"],
+            replicas=cfg["replicas"],
+        )
+
+    if "ocr" in cfg["endpoints"]:
+        state["processor"] = OCRProcessor.from_pretrained(
+            cfg["text_detectors"], device=cfg["device"], tile_size=cfg["tile_size"], replicas=cfg["replicas"]
+        )
+
+    if "remove" in cfg["endpoints"]:
+        state["remove_gen"] = MaskGenerator.from_pretrained(
+            detectors=[],
+            ovd_detectors=[cfg["ovd_detector"]],
+            segmentor=cfg["remove_segmentor"],
+            device=cfg["device"],
+            segmentor_kwargs=segmentor_kwargs(cfg),
+            tile_size=cfg["tile_size"],
+            detect_size=cfg["detect_size"],
+            segment_size=cfg["segment_size"],
+            replicas=cfg["replicas"],
+        )
+        state["remover"] = Remover(inpainter=cfg["inpainter"], device=cfg["device"], replicas=cfg["replicas"])
+
+    return state
+
+
+def _split(value: Optional[str]) -> Tuple[str, ...]:
+    return tuple(sorted({c.strip() for c in value.split(",") if c.strip()})) if value else ()
+
+
+def _float(params: Dict[str, str], name: str, default: float) -> float:
+    try:
+        return float(params.get(name, default))
+    except ValueError:
+        raise RequestError(f"'{name}' must be a number, got '{params[name]}'") from None
+
+
+def _decode(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    try:
+        img, img_bgr, _, _ = decode_image(data)
+    except ValueError as e:
+        raise RequestError(str(e)) from None
+    return img, img_bgr
+
+
+def _image(image: np.ndarray, params: Dict[str, str]) -> Response:
+    fmt = params.get("format", "png")
+    if fmt not in IMAGE_FORMATS:
+        raise RequestError(f"Unknown format '{fmt}', one of {sorted(IMAGE_FORMATS)}")
+    ok, buf = cv2.imencode(f".{fmt}", np.ascontiguousarray(image))
+    if not ok:
+        raise RuntimeError(f"Unable to encode the result as {fmt}")
+    return HTTPStatus.OK, IMAGE_FORMATS[fmt], buf.tobytes()
+
+
+def _json(data: Any, status: int = HTTPStatus.OK) -> Response:
+    return int(status), "application/json", json.dumps(data).encode("utf-8")
+
+
+class ServeApp:
+    """
+    Models and micro-batchers behind ``sceneflow serve``, independent of the HTTP layer.
+
+    Each endpoint decodes the image in the calling thread, then submits it to the `MicroBatcher`
+    of the endpoint: concurrent requests with the same threshold and prompt go through the
+    detectors in one batched call, followed by segmentation (and inpainting for ``remove``) in the
+    same worker. With *replicas* above 1, as many batches run at once on pooled runners.
+    Camouflage and encoding happen back in the calling thread.
+
+    `handle` returns ``(status, content type, body)``; a full queue is answered with 503.
+    Request latencies go to `TIMINGS` under ``("requests", endpoint)`` and `stats` reports their
+    percentiles with those of the queues, stages and models.
+    """
+
+    def __init__(self, cfg: Dict[str, Any]):
+        self.cfg = cfg
+        self.state = _setup(cfg)
+        self._camouflages: Dict[str, Camouflage] = {}
+        self._lock = threading.Lock()
+        self.errors: Counter = Counter()
+        self.started = time.time()
+
+        batching = {
+            "max_batch_size": cfg["max_batch_size"],
+            "max_wait_ms": cfg["max_wait_ms"],
+            "max_queue": cfg["max_queue"],
+            "workers": cfg["replicas"],
+        }
+        self.batchers: Dict[str, MicroBatcher] = {}
+        if "mask_gen" in self.state:
+            self.batchers["redact"] = MicroBatcher(self._redact_batch, name="redact", **batching)
+        if "processor" in self.state:
+            self.batchers["ocr"] = MicroBatcher(self._ocr_batch, name="ocr", **batching)
+        if "remove_gen" in self.state:
+            self.batchers["remove"] = MicroBatcher(self._remove_batch, name="remove", **batching)
+
+    # Batched model calls, run by the batcher workers
+
+    def _redact_batch(self, key: Tuple[float, Tuple[str, ...]], images: List[np.ndarray]):
+        conf, prompt = key
+        return self.state["mask_gen"].generate_batch(
+            images, conf=conf, prompt=list(prompt) or None, nms_iou=self.cfg["nms_iou"]
+        )
+
+    def _ocr_batch(self, conf: float, images: List[np.ndarray]):
+        return self.state["processor"].process_batch(images, conf=conf)
+
+    def _remove_batch(self, key: Tuple[float, Tuple[str, ...]], images: List[np.ndarray]):
+        conf, prompt = key
+        results = self.state["remove_gen"].generate_batch(
+            images, conf=conf, prompt=list(prompt), nms_iou=self.cfg["nms_iou"]
+        )
+        # None when nothing was found, the request then gets its image back
+        return [
+            self.state["remover"].remove(image.copy(), masks) if masks.any() else None
+            for image, (_, masks, _) in zip(images, results)
+        ]
+
+    # Endpoints
+
+    def _submit(self, endpoint: str, image: np.ndarray, key: Any) -> Any:
+        try:
+            future = self.batchers[endpoint].submit(image, key)
+        except Overloaded as e:
+            raise RequestError(str(e), HTTPStatus.SERVICE_UNAVAILABLE) from e
+        try:
+            return future.result(self.cfg["request_timeout"])
+        except FutureTimeoutError:
+            future.cancel()
+            raise RequestError(f"No result after {self.cfg['request_timeout']}s", HTTPStatus.GATEWAY_TIMEOUT) from None
+
+    def _camouflage(self, method: str) -> Camouflage:
+        if method not in AVAILABLE_CAMOUFLAGE_METHODS:
+            raise RequestError(f"Unknown camouflage method '{method}', one of {sorted(AVAILABLE_CAMOUFLAGE_METHODS)}")
+        with self._lock:
+            if method not in self._camouflages:
+                self._camouflages[method] = Camouflage(method=method)
+            return self._camouflages[method]
+
+    def redact(self, data: bytes, params: Dict[str, str]) -> Response:
+        """Camouflaged image (PNG by default), or the detections with ``output=json``."""
+        output = params.get("output", "image")
+        if output not in ("image", "json"):
+            raise RequestError(f"Unknown output '{output}', one of ['image', 'json']")
+        camouflage = self._camouflage(params.get("method", self.cfg["camouflage_method"]))
+        conf = _float(params, "conf", self.cfg["det_thd"])
+        prompt = _split(params.get("classes", self.cfg["allowed_classes"]))
+        img, img_bgr = _decode(data)
+
+        detections, masks, _ = self._submit("redact", img, (conf, prompt))
+
+        if output == "json":
+            return _json({"detections": detections.as_dicts(), "counts": detections.class_counts()})
+        return _image(camouflage.hide(img_bgr, masks), params)
+
+    def ocr(self, data: bytes, params: Dict[str, str]) -> Response:
+        """Text boxes, scores and recognized text as JSON."""
+        conf = _float(params, "conf", self.cfg["ocr_thd"])
+        img, _ = _decode(data)
+
+        detections = self._submit("ocr", img, conf)
+        return _json({"detections": detections.as_dicts(), "counts": detections.class_counts()})
+
+    def remove(self, data: bytes, params: Dict[str, str]) -> Response:
+        """Image with the objects named in ``prompt`` inpainted away (PNG by default)."""
+        prompt = _split(params.get("prompt", self.cfg["prompt"]))
+        if not prompt:
+            raise RequestError("'remove' needs a prompt, e.g. ?prompt=person,car")
+        conf = _float(params, "conf", self.cfg["remove_thd"])
+        img, img_bgr = _decode(data)
+
+        inpainted = self._submit("remove", img, (conf, prompt))
+        return _image(inpainted if inpainted is not None else img_bgr, params)
+
+    def handle(self, endpoint: str, data: bytes, params: Dict[str, str]) -> Response:
+        if endpoint not in self.batchers:
+            self.errors[HTTPStatus.NOT_FOUND] += 1
+            return _json({"error": f"Endpoint '{endpoint}' is not enabled"}, HTTPStatus.NOT_FOUND)
+
+        t0 = time.perf_counter()
+        try:
+            response = getattr(self, endpoint)(data, params)
+        except RequestError as e:
+            self.errors[e.status] += 1
+            return _json({"error": str(e)}, e.status)
+        except Exception as e:
+            logger.exception(f"Request to /{endpoint} failed")
+            self.errors[HTTPStatus.INTERNAL_SERVER_ERROR] += 1
+            return _json({"error": f"{type(e).__name__}: {e}"}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+        TIMINGS.record("requests", endpoint, time.perf_counter() - t0)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "uptime_sec": time.time() - self.started,
+            "batchers": {name: batcher.stats() for name, batcher in self.batchers.items()},
+            "errors": {str(int(status)): n for status, n in sorted(self.errors.items())},
+            "latency": TIMINGS.summary(),
+        }
+
+    def close(self):
+        """Finish queued requests, then give the models back to the shared model cache."""
+        for batcher in self.batchers.values():
+            batcher.close()
+        _close_state(self.state)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "ThreadingHTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, response: Response, headers: Sequence[Tuple[str, str]] = ()):
+        status, content_type, body = response
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            self.send_header("Retry-After", "1")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        app: ServeApp = self.server.app
+        path = urlsplit(self.path).path.strip("/")
+        if path == "health":
+            self._reply(_json({"status": "ok", "endpoints": sorted(app.batchers)}))
+        elif path == "stats":
+            self._reply(_json(app.stats()))
+        else:
+            self._reply(_json({"error": f"Unknown path '/{path}'"}, HTTPStatus.NOT_FOUND))
+
+    def do_POST(self):
+        app: ServeApp = self.server.app
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+
+        if length > app.cfg["max_body_mb"] * 1024**2:
+            # The body is not read, so the connection cannot be reused
+            self.close_connection = True
+            self._reply(_json({"error": f"Body over {app.cfg['max_body_mb']} MB"}, HTTPStatus.REQUEST_ENTITY_TOO_LARGE))
+            return
+
+        data = self.rfile.read(length)
+        if not data:
+            self._reply(_json({"error": "Send the encoded image as the request body"}, HTTPStatus.BAD_REQUEST))
+            return
+
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self._reply(app.handle(url.path.strip("/"), data, params))
+
+    def log_message(self, format: str, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def make_server(app: ServeApp, host: str = "127.0.0.1", port: int = 8080) -> ThreadingHTTPServer:
+    """HTTP server for *app*, one thread per connection; ``port=0`` picks a free port."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.app = app
+    return server
+
+
+def create_app(
+    endpoints: Sequence[str] = ("redact",),
+    detectors: Sequence[str] = ("rtdetr_l", "yolo11x"),
+    ovd_detectors: Sequence[str] = ("owlvit_base",),
+    segmentor: str = "sam_l",
+    nms_iou: float = 0.7,
+    det_thd: float = 0.4,
+    allowed_classes: Optional[str] = None,
+    camouflage_method: str = "solid",
+    text_detectors: Sequence[str] = ("mmocr_dbnet_abinet",),
+    ocr_thd: float = 0.5,
+    ovd_detector: str = "owlvit_base",
+    remove_segmentor: str = "sam_h",
+    inpainter: str = "big_lama",
+    prompt: Optional[str] = None,
+    remove_thd: float = 0.25,
+    tile_size: Optional[int] = None,
+    detect_size: Optional[int] = None,
+    segment_size: Optional[int] = None,
+    sam_max_boxes: Optional[int] = None,
+    sam_min_area: Optional[float] = None,
+    small_object_mask: Optional[str] = None,
+    max_batch_size: int = 8,
+    max_wait_ms: float = 10.0,
+    max_queue: int = 64,
+    replicas: int = 1,
+    request_timeout: float = 60.0,
+    max_body_mb: float = 50.0,
+) -> ServeApp:
+    """Load the models of *endpoints* and start their batchers, without opening a socket."""
+    # Device
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Running on device: {device}")
+
+    cfg = {
+        "endpoints": list(dict.fromkeys(endpoints)),
+        "detectors": list(detectors),
+        "ovd_detectors": [name for name in ovd_detectors if name != "none"],
+        "segmentor": segmentor,
+        "nms_iou": nms_iou,
+        "det_thd": det_thd,
+        "allowed_classes": allowed_classes,
+        "camouflage_method": camouflage_method,
+        "text_detectors": list(text_detectors),
+        "ocr_thd": ocr_thd,
+        "ovd_detector": ovd_detector,
+        "remove_segmentor": remove_segmentor,
+        "inpainter": inpainter,
+        "prompt": prompt,
+        "remove_thd": remove_thd,
+        "tile_size": tile_size,
+        "detect_size": detect_size,
+        "segment_size": segment_size,
+        "sam_max_boxes": sam_max_boxes,
+        "sam_min_area": sam_min_area,
+        "small_object_mask": small_object_mask,
+        "max_batch_size": max_batch_size,
+        "max_wait_ms": max_wait_ms,
+        "max_queue": max_queue,
+        "replicas": max(1, replicas),
+        "request_timeout": request_timeout,
+        "max_body_mb": max_body_mb,
+        "device": device,
+    }
+    logger.info(f"Endpoints: {', '.join(cfg['endpoints'])}")
+    logger.info(f"Batches of up to {max_batch_size} images, {max_wait_ms:g} ms max wait, {max_queue} queued max")
+    return ServeApp(cfg)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, **kwargs):
+    """Serve the endpoints until Ctrl+C; *kwargs* go to `create_app`."""
+    try:
+        local = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        local = host == "localhost"
+    if not local:
+        logger.warning(f"Serving on {host}: the API has no authentication, anyone who can reach it can use it")
+
+    app = create_app(**kwargs)
+    server = make_server(app, host, port)
+    logger.info(f"✔ Serving on http://{host}:{server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        app.close()
+        logger.info(f"Latency: {json.dumps(TIMINGS.summary().get('requests', {}))}")
@@ -1,22 +1,16 @@
-from .lama import big_lama  # noqa: F401
-from .mmocr import mmocr_dbnet_abinet, mmocr_dbnet_crnn, mmocr_drrg_abinet, mmocr_fcenet_crnn  # noqa: F401
-from .owlvit import owlvit_base, owlvit_large  # noqa: F401
-from .rtdetr import rtdetr_l, rtdetr_xl  # noqa: F401
-from .sam import sam_b, sam_h, sam_l  # noqa: F401
-from .tesseract import (  # noqa: F401
-    tesseract_auto,
-    tesseract_auto_with_osd,
-    tesseract_default,
-    tesseract_osd_only,
-    tesseract_raw_line,
-    tesseract_single_block,
-    tesseract_single_column,
-    tesseract_single_line,
-    tesseract_single_word,
-    tesseract_sparse,
-)
+import importlib
 
-# noqa: F401
-from .trocr import trocr_handwritten  # noqa: F401
-from .yolo import yolov8n, yolov8x  # noqa: F401
-from .yolo_world import yolov8x_worldv2  # noqa: F401
+from ._factory import _BUILTINS
+
+# Factories are resolved on first access so that importing the registries does not import every
+# backend (ultralytics, transformers, mmocr, segment_anything, LaMa). Built from `_factory._BUILTINS`,
+# the one list of built-in runners: "yolov8n-seg" is the factory `yolov8n_seg` of module `.yolo`
+_LAZY_IMPORTS = {name.replace("-", "_"): f".{module}" for _, module, names, _ in _BUILTINS for name in names}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,202 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sceneflow.utils.logger import logger
+
+from ._pool import RunnerPool
+
+# (registry, model name, device, repr of the sorted factory kwargs)
+CacheKey = Tuple[str, str, str, str]
+
+
+def _key_value(value: Any) -> str:
+    if value is None or isinstance(value, (bool, int, float, str, tuple, list)):
+        return repr(value)
+    # Objects (e.g. an EmbeddingCache) by identity: the cached runner keeps them alive, so the id is not reused
+    return f"{type(value).__name__}@{id(value):x}"
+
+
+def cache_key(registry: str, name: str, device: str = "cpu", kwargs: Optional[Dict[str, Any]] = None) -> CacheKey:
+    return (registry, name, str(device), repr(sorted((k, _key_value(v)) for k, v in (kwargs or {}).items())))
+
+
+def runner_nbytes(*runners: Any) -> int:
+    """
+    Size of the torch parameters and buffers the *runners* hold, 0 for other backends. Tensors
+    shared between them (replicas over the same weights) are counted once.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return 0
+
+    modules = []
+    for runner in runners:
+        for value in vars(runner).values():
+            for obj in (value, getattr(value, "model", None)):
+                if isinstance(obj, torch.nn.Module):
+                    modules.append(obj)
+
+    seen, total = set(), 0
+    for module in modules:
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            if id(tensor) not in seen:
+                seen.add(id(tensor))
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+@dataclass
+class _Entry:
+    runner: Any
+    nbytes: int
+    refs: int = 0
+    pool: Optional[RunnerPool] = None
+
+
+class ModelCache:
+    """
+    Process-wide cache of loaded runners, so the same weights are loaded once however many
+    pipelines, generators or roles ask for them.
+
+    `acquire` returns the cached runner for a key (building it on a miss) and counts a reference;
+    `release` gives it back. Released runners stay loaded, ready for the next caller, until the
+    cached models exceed *max_bytes*: the least recently used idle ones are then unloaded.
+    Runners still referenced are never unloaded, so the budget can be exceeded while they are in
+    use; with ``max_bytes=0`` every runner is unloaded as soon as it is released.
+
+    Runners are built outside the cache lock, so loading one model does not hold up callers of
+    the others; concurrent callers asking for the same missing key wait for a single build.
+
+    `pool` gives the one `RunnerPool` of a cached runner, so that callers using it from several
+    threads share its replicas instead of each leasing the runner itself; the replicas count
+    towards *max_bytes* and are unloaded with it.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024**3):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._building: Dict[CacheKey, Future] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, key: CacheKey, build: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    entry.refs += 1
+                    self._entries.move_to_end(key)
+                    return entry.runner
+
+                # One caller builds a missing runner, the others for the same key wait for it
+                building = self._building.get(key)
+                owner = building is None
+                if owner:
+                    self.misses += 1
+                    building = self._building[key] = Future()
+
+            if owner:
+                return self._build(key, build, building)
+            # Re-raises the builder's error; otherwise take a reference on the next turn
+            building.result()
+
+    def _build(self, key: CacheKey, build: Callable[[], Any], building: Future) -> Any:
+        # Loading can take minutes: the cache stays usable for other models meanwhile
+        try:
+            runner = build()
+            nbytes = runner_nbytes(runner)
+        except BaseException as exc:
+            with self._lock:
+                del self._building[key]
+            building.set_exception(exc)
+            raise
+
+        with self._lock:
+            del self._building[key]
+            self._entries[key] = _Entry(runner, nbytes, refs=1)
+            self._evict()
+        building.set_result(None)
+        logger.debug(f"Model cache loaded {key[:3]} ({nbytes / 1024**2:.1f} MB)")
+        return runner
+
+    def pool(self, runner: Any, size: int = 1) -> Optional[RunnerPool]:
+        """The pool of a cached *runner*, grown to at least *size* replicas; None if it is not cached."""
+        with self._lock:
+            entry = next((e for e in self._entries.values() if e.runner is runner), None)
+            if entry is None:
+                return None
+            if entry.pool is None:
+                entry.pool = RunnerPool(runner)
+            pool = entry.pool
+
+        # Replicas are built outside the cache lock, like runners
+        if pool.grow(size):
+            nbytes = runner_nbytes(*pool.replicas)
+            with self._lock:
+                entry.nbytes = nbytes
+                self._evict()
+            logger.debug(f"Model cache grew the pool of {runner!r} to {len(pool)} ({nbytes / 1024**2:.1f} MB)")
+        return pool
+
+    def release(self, runner: Any) -> bool:
+        """Drop one reference to *runner*; False if it does not come from this cache."""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry.runner is runner:
+                    entry.refs = max(0, entry.refs - 1)
+                    self._entries.move_to_end(key)
+                    self._evict()
+                    return True
+        return False
+
+    def evict(self, predicate: Optional[Callable[[CacheKey], bool]] = None) -> int:
+        """Unload the idle runners whose key matches *predicate* (all idle ones by default)."""
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if e.refs == 0 and (predicate is None or predicate(k))]
+            for key in keys:
+                self._unload(key)
+            return len(keys)
+
+    def _evict(self):
+        for key in [k for k, e in self._entries.items() if e.refs == 0]:
+            if self.nbytes <= self.max_bytes:
+                break
+            self._unload(key)
+
+    def _unload(self, key: CacheKey):
+        entry = self._entries.pop(key)
+        logger.debug(f"Model cache unloaded {key[:3]} ({entry.nbytes / 1024**2:.1f} MB)")
+        # Drop the last reference before handing the freed memory back to the device
+        del entry
+
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def keys(self) -> List[CacheKey]:
+        with self._lock:
+            return list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (
+            f"ModelCache(models={len(self)}, size={self.nbytes / 1024**3:.2f}/{self.max_bytes / 1024**3:.1f} GB, "
+            f"hits={self.hits}, misses={self.misses})"
+        )
+
+
+# Shared by every registry; the budget can be set with SCENEFLOW_MODEL_CACHE_GB
+MODEL_CACHE = ModelCache(max_bytes=int(float(os.environ.get("SCENEFLOW_MODEL_CACHE_GB", 8)) * 1024**3))
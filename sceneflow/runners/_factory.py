@@ -1,28 +1,87 @@
-from ._helpers import ModelRunner
+from typing import TYPE_CHECKING, Any
+
+from ._cache import MODEL_CACHE
+from ._pool import RunnerPool
 from ._registry import ModelRegistry
 
+if TYPE_CHECKING:
+    from ._helpers import ModelRunner
+
 DETECTORS = ModelRegistry("detectors")
 OVD_DETECTORS = ModelRegistry("ovd_detectors")
 SEGMENTORS = ModelRegistry("segmentors")
 TEXT_DETECTORS = ModelRegistry("text_detectors")
 INPAINTERS = ModelRegistry("inpainters")
 
+# Built-in runners by module, imported on first use: "yolov8n-seg" is the factory `yolov8n_seg`
+_BUILTINS = [
+    (DETECTORS, "yolo", ["yolov8n", "yolov8x", "yolo11x"], None),
+    (DETECTORS, "yolo", ["yolov8n-seg", "yolov8x-seg", "yolo11x-seg"], {"masks": True}),
+    (DETECTORS, "rtdetr", ["rtdetr_l", "rtdetr_xl"], None),
+    (OVD_DETECTORS, "owlvit", ["owlvit_base", "owlvit_large"], None),
+    (OVD_DETECTORS, "yolo_world", ["yolov8x-worldv2"], None),
+    (SEGMENTORS, "sam", ["sam_b", "sam_l", "sam_h"], None),
+    (INPAINTERS, "lama", ["big_lama"], None),
+    (TEXT_DETECTORS, "trocr", ["trocr_handwritten"], None),
+    (
+        TEXT_DETECTORS,
+        "mmocr",
+        ["mmocr_dbnet_crnn", "mmocr_dbnet_abinet", "mmocr_drrg_abinet", "mmocr_fcenet_crnn"],
+        None,
+    ),
+    (
+        TEXT_DETECTORS,
+        "tesseract",
+        [
+            "tesseract_osd_only",
+            "tesseract_auto_with_osd",
+            "tesseract_auto",
+            "tesseract_single_column",
+            "tesseract_single_block",
+            "tesseract_single_line",
+            "tesseract_single_word",
+            "tesseract_sparse",
+            "tesseract_raw_line",
+            "tesseract_default",
+        ],
+        None,
+    ),
+]
+for _registry, _module, _names, _meta in _BUILTINS:
+    for _name in _names:
+        _registry.register_lazy(_name, f"sceneflow.runners.{_module}:{_name.replace('-', '_')}", meta=_meta)
+
+
+# The load_* helpers share runners process-wide, see `ModelCache`: hand them back with `release_model`
+def load_detector(name: str, device: str = "cpu", kwargs: dict = {}) -> "ModelRunner":
+    return DETECTORS.acquire(name, device=device, **kwargs)
+
+
+def load_ovd_detector(name: str, device: str = "cpu", kwargs: dict = {}) -> "ModelRunner":
+    return OVD_DETECTORS.acquire(name, device=device, **kwargs)
+
 
-def load_detector(name: str, device: str = "cpu", kwargs: dict = {}) -> ModelRunner:
-    return DETECTORS.get(name, device=device, **kwargs)
+def load_segmentor(name: str, device: str = "cpu", kwargs: dict = {}) -> "ModelRunner":
+    return SEGMENTORS.acquire(name, device=device, **kwargs)
 
 
-def load_ovd_detector(name: str, device: str = "cpu", kwargs: dict = {}) -> ModelRunner:
-    return OVD_DETECTORS.get(name, device=device, **kwargs)
+def load_text_detector(name: str, device: str = "cpu", kwargs: dict = {}) -> "ModelRunner":
+    return TEXT_DETECTORS.acquire(name, device=device, **kwargs)
 
 
-def load_segmentor(name: str, device: str = "cpu", kwargs: dict = {}) -> ModelRunner:
-    return SEGMENTORS.get(name, device=device, **kwargs)
+def load_inpainter(name: str, device: str = "cpu", kwargs: dict = {}) -> "ModelRunner":
+    return INPAINTERS.acquire(name, device=device, **kwargs)
 
 
-def load_text_detector(name: str, device: str = "cpu", kwargs: dict = {}) -> ModelRunner:
-    return TEXT_DETECTORS.get(name, device=device, **kwargs)
+def pool_model(runner: "ModelRunner", replicas: int = 1) -> RunnerPool:
+    """
+    The `RunnerPool` of a runner from the ``load_*`` helpers, with at least *replicas* replicas.
+    Every holder of the runner gets the same pool, so each replica is only ever used by one thread.
+    """
+    pool = MODEL_CACHE.pool(runner, replicas)
+    return pool if pool is not None else RunnerPool(runner, replicas)
 
 
-def load_inpainter(name: str, device: str = "cpu", kwargs: dict = {}) -> ModelRunner:
-    return INPAINTERS.get(name, device=device, **kwargs)
+def release_model(runner: Any) -> bool:
+    """Give back a runner from one of the ``load_*`` helpers, or the `RunnerPool` built around it."""
+    return MODEL_CACHE.release(runner.runner if isinstance(runner, RunnerPool) else runner)
@@ -1,14 +1,22 @@
+import copy
 import json
+import sys
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import torch
 
+from sceneflow.utils.masks import CroppedMasks, occupancy_box
+
 
 class ModelRunner:
     """Generic base class for model runners."""
 
+    # True when run() keeps no state on the instance, so one instance can serve several threads
+    thread_safe: bool = False
+
     def __init__(self, model_name: Optional[str] = None, device: str = "cpu"):
         self.model_name = model_name or self.__class__.__name__
         self.device = device
@@ -24,9 +32,23 @@ class ModelRunner:
         """Execute the model's core function (e.g., predict, extract)."""
         raise NotImplementedError("Inherited classes must implement `run()`")
 
+    def run_batch(self, images: Sequence[np.ndarray], **kwargs) -> List[Any]:
+        """Run the model on several images, returns one result per image. Falls back to a loop over `run()`."""
+        return [self.run(image, **kwargs) for image in images]
+
     def __call__(self, *args, **kwargs):
         return self.run(*args, **kwargs)
 
+    def replicate(self) -> "ModelRunner":
+        """
+        Another instance of this runner for concurrent use, see `RunnerPool`. Loads the weights again;
+        runners whose per-call state lives outside the weights override it to share them.
+        """
+        replica = copy.copy(self)
+        replica._model = None
+        replica._load_model()
+        return replica
+
     def __repr__(self):
         return f"({self.__class__.__name__} model={self.model_name} device={self.device})"
 
@@ -38,6 +60,67 @@ class ModelRunner:
         return self._model
 
 
+class PromptCache:
+    """
+    Least recently used cache of per-prompt-set results, e.g. the text embeddings of an
+    open-vocabulary detector, keyed by the prompt tuple.
+    """
+
+    def __init__(self, max_items: int = 8):
+        self.max_items = max_items
+        self._items: "OrderedDict[Tuple[str, ...], Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, texts: Sequence[str], compute: Callable[[Tuple[str, ...]], Any]) -> Any:
+        """Cached value for *texts*, calling ``compute(texts)`` on a miss."""
+        key = tuple(texts)
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+        self.misses += 1
+        value = compute(key)
+        if self.max_items > 0:
+            self._items[key] = value
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return f"PromptCache(items={len(self)}/{self.max_items}, hits={self.hits}, misses={self.misses})"
+
+
+def detections_from_ultralytics(result: Any, names: Dict[int, str]) -> "DetectionBatch":
+    """Convert one ultralytics ``Results`` object to a `DetectionBatch`."""
+    if result is None or not result.boxes:
+        return DetectionBatch()
+
+    boxes = result.boxes
+    class_ids = boxes.cls.int().cpu().numpy()
+    return DetectionBatch(
+        boxes=boxes.xyxy.cpu().numpy(),
+        scores=boxes.conf.cpu().numpy(),
+        class_ids=class_ids,
+        class_names=[names.get(c, str(c)) for c in class_ids.tolist()],
+    )
+
+
+def crop_masks(masks: torch.Tensor, size: Tuple[int, int]) -> CroppedMasks:
+    """Crop ``(N, H, W)`` bool masks on their device, so only the boxes are copied back to the host."""
+    rows, cols = masks.any(dim=2).cpu().numpy(), masks.any(dim=1).cpu().numpy()
+    crops, boxes = [], []
+    for mask, r, c in zip(masks, rows, cols):
+        x0, y0, x1, y1 = box = occupancy_box(r, c)
+        crops.append(mask[y0:y1, x0:x1].cpu().numpy().astype(np.uint8))
+        boxes.append(box)
+    return CroppedMasks(crops, np.array(boxes).reshape(-1, 4), size)
+
+
 @dataclass
 class Detection:
     """
@@ -88,7 +171,11 @@ class Detection:
         return max(0.0, x1 - x0) * max(0.0, y1 - y0)
 
     def __getitem__(self, key: str) -> Any:
-        return self.as_dict()[key]
+        # Same values as `as_dict()[key]` without building the whole dict
+        if key not in _DETECTION_KEYS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        return value.tolist() if key == "bbox" else value
 
     @classmethod
     def from_dict(cls, d: Dict[str, Any]) -> "Detection":
@@ -101,3 +188,245 @@ class Detection:
             segmentation=d.get("segmentation"),
             text=d.get("text"),
         )
+
+
+_DETECTION_KEYS = frozenset(("bbox", "score", "class_id", "class_name", "segmentation", "text"))
+
+
+def _intern(name: Optional[str]) -> Optional[str]:
+    return sys.intern(str(name)) if name is not None else None
+
+
+class DetectionBatch:
+    """
+    Detections of one image as parallel arrays instead of one `Detection` object per box.
+
+    Holds ``(N, 4)`` float32 xyxy *boxes*, float64 *scores*, int64 *class_ids* (-1 when unknown),
+    interned *class_names* and optional *texts*. Masks (as `CroppedMasks`) and their COCO RLEs are
+    kept lazily: set whichever one is at hand and the other is computed on first access.
+
+    Iterating, or indexing with an int, yields `Detection` objects built on the fly, so code written
+    for lists of detections keeps working; changes to those objects are not written back.
+    """
+
+    __slots__ = ("boxes", "scores", "class_ids", "class_names", "texts", "_masks", "_segmentations")
+
+    def __init__(
+        self,
+        boxes: Optional[np.ndarray] = None,
+        scores: Optional[np.ndarray] = None,
+        class_ids: Optional[np.ndarray] = None,
+        class_names: Optional[Sequence[Optional[str]]] = None,
+        texts: Optional[Sequence[Optional[str]]] = None,
+        masks: Optional[Union[CroppedMasks, np.ndarray]] = None,
+        segmentations: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+    ):
+        self.boxes = np.asarray(boxes if boxes is not None else (), dtype=np.float32).reshape(-1, 4)
+        n = len(self.boxes)
+        self.scores = np.asarray(scores if scores is not None else np.zeros(n), dtype=np.float64).reshape(n)
+        self.class_ids = np.asarray(class_ids if class_ids is not None else np.full(n, -1), dtype=np.int64).reshape(n)
+        self.class_names = [_intern(c) for c in class_names] if class_names is not None else [None] * n
+        self.texts = list(texts) if texts is not None else None
+        self._masks = CroppedMasks.from_dense(masks) if isinstance(masks, np.ndarray) else masks
+        self._segmentations = list(segmentations) if segmentations is not None else None
+
+        if len(self.class_names) != n or (self.texts is not None and len(self.texts) != n):
+            raise ValueError(f"DetectionBatch fields must all have {n} entries")
+
+    # Construction
+
+    @classmethod
+    def from_detections(cls, detections: Sequence[Detection]) -> "DetectionBatch":
+        if isinstance(detections, DetectionBatch):
+            return detections
+        detections = list(detections)
+        if not detections:
+            return cls()
+
+        texts = [d.text for d in detections]
+        segmentations = [d.segmentation for d in detections]
+        return cls(
+            boxes=np.array([np.asarray(d.bbox, dtype=np.float32) for d in detections]),
+            scores=[d.score for d in detections],
+            class_ids=[-1 if d.class_id is None else d.class_id for d in detections],
+            class_names=[d.class_name for d in detections],
+            texts=texts if any(t is not None for t in texts) else None,
+            segmentations=segmentations if any(s is not None for s in segmentations) else None,
+        )
+
+    @classmethod
+    def from_dicts(cls, dicts: Sequence[Dict[str, Any]]) -> "DetectionBatch":
+        """Inverse of `as_dicts`."""
+        if not dicts:
+            return cls()
+        texts = [d.get("text") for d in dicts]
+        segmentations = [d.get("segmentation") for d in dicts]
+        return cls(
+            boxes=[d["bbox"] for d in dicts],
+            scores=[d["score"] for d in dicts],
+            class_ids=[-1 if d.get("class_id") is None else d["class_id"] for d in dicts],
+            class_names=[d.get("class_name") for d in dicts],
+            texts=texts if any(t is not None for t in texts) else None,
+            segmentations=segmentations if any(s is not None for s in segmentations) else None,
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["DetectionBatch"]) -> "DetectionBatch":
+        batches = [cls.from_detections(b) for b in batches]
+        batches = [b for b in batches if len(b)]
+        if len(batches) == 0:
+            return cls()
+        if len(batches) == 1:
+            return batches[0]
+
+        texts = None
+        if any(b.texts is not None for b in batches):
+            texts = [t for b in batches for t in (b.texts if b.texts is not None else [None] * len(b))]
+        masks, segmentations = None, None
+        if all(b._masks is not None for b in batches):
+            masks = CroppedMasks.concat([b._masks for b in batches])
+        elif all(b._segmentations is not None or b._masks is not None for b in batches):
+            segmentations = [s for b in batches for s in b.segmentations]
+        elif any(b._segmentations is not None for b in batches):
+            segmentations = [s for b in batches for s in (b._segmentations or [None] * len(b))]
+
+        return cls(
+            boxes=np.concatenate([b.boxes for b in batches]),
+            scores=np.concatenate([b.scores for b in batches]),
+            class_ids=np.concatenate([b.class_ids for b in batches]),
+            class_names=[c for b in batches for c in b.class_names],
+            texts=texts,
+            masks=masks,
+            segmentations=segmentations,
+        )
+
+    # Masks and RLEs
+
+    @property
+    def masks(self) -> Optional[CroppedMasks]:
+        """Masks cropped to their boxes, decoded from the RLEs when only those are known."""
+        if self._masks is None and self._segmentations is not None and len(self):
+            if all(s is not None for s in self._segmentations):
+                self._masks = CroppedMasks.from_rles(self._segmentations)
+        return self._masks
+
+    @masks.setter
+    def masks(self, masks: Optional[Union[CroppedMasks, np.ndarray]]):
+        if masks is not None and len(masks) != len(self):
+            raise ValueError(f"Got {len(masks)} masks for {len(self)} detections")
+        self._masks = CroppedMasks.from_dense(masks) if isinstance(masks, np.ndarray) else masks
+        self._segmentations = None
+
+    @property
+    def segmentations(self) -> List[Optional[Dict[str, Any]]]:
+        """COCO RLE per detection (``None`` when unknown), encoded from the masks on first access."""
+        if self._segmentations is None:
+            if self._masks is None or len(self) == 0:
+                return [None] * len(self)
+            self._segmentations = self._masks.to_rles()
+        return self._segmentations
+
+    @segmentations.setter
+    def segmentations(self, segmentations: Optional[Sequence[Optional[Dict[str, Any]]]]):
+        if segmentations is not None and len(segmentations) != len(self):
+            raise ValueError(f"Got {len(segmentations)} segmentations for {len(self)} detections")
+        self._segmentations = list(segmentations) if segmentations is not None else None
+
+    # Vectorized ops
+
+    def select(self, index: Any) -> "DetectionBatch":
+        """Sub-batch for an index array, boolean mask or slice."""
+        if isinstance(index, slice):
+            idx = np.arange(len(self))[index]
+        else:
+            idx = np.asarray(index)
+            idx = np.flatnonzero(idx) if idx.dtype == bool else idx.astype(np.int64).reshape(-1)
+
+        return DetectionBatch(
+            boxes=self.boxes[idx],
+            scores=self.scores[idx],
+            class_ids=self.class_ids[idx],
+            class_names=[self.class_names[i] for i in idx],
+            texts=[self.texts[i] for i in idx] if self.texts is not None else None,
+            masks=self._masks[idx] if self._masks is not None else None,
+            segmentations=[self._segmentations[i] for i in idx] if self._segmentations is not None else None,
+        )
+
+    def filter_classes(self, allowed: Sequence[str]) -> "DetectionBatch":
+        allowed = set(allowed)
+        return self.select(np.array([c in allowed for c in self.class_names], dtype=bool))
+
+    def scale_(self, scale: Tuple[float, float]) -> "DetectionBatch":
+        """Multiply the boxes in place by ``(scale_y, scale_x)``; masks are left as they are."""
+        self.boxes *= np.array([scale[1], scale[0], scale[1], scale[0]], dtype=np.float32)
+        return self
+
+    def translate_(self, offset: Tuple[int, int], size: Tuple[int, int]) -> "DetectionBatch":
+        """
+        Move the boxes in place by ``(dx, dy)``, e.g. from a tile into the full image of *size*
+        ``(H, W)``; masks are moved along.
+        """
+        dx, dy = offset
+        self.boxes += np.array([dx, dy, dx, dy], dtype=np.float32)
+        masks = self.masks
+        if masks is not None:
+            self.masks = masks.translate(offset, size)
+        return self
+
+    def class_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for name in self.class_names:
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    # Row access
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        """One `Detection.as_dict()` per box."""
+        texts = self.texts if self.texts is not None else [None] * len(self)
+        return [
+            {
+                "bbox": box,
+                "score": score,
+                "class_id": None if class_id < 0 else class_id,
+                "class_name": class_name,
+                "segmentation": segmentation,
+                "text": text,
+            }
+            for box, score, class_id, class_name, segmentation, text in zip(
+                self.boxes.tolist(),
+                self.scores.tolist(),
+                self.class_ids.tolist(),
+                self.class_names,
+                self.segmentations,
+                texts,
+            )
+        ]
+
+    def to_detections(self) -> List[Detection]:
+        return [self[i] for i in range(len(self))]
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def __iter__(self) -> Iterator[Detection]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index: Any) -> Any:
+        if not isinstance(index, (int, np.integer)):
+            return self.select(index)
+
+        class_id = int(self.class_ids[index])
+        has_segmentation = self._segmentations is not None or self._masks is not None
+        return Detection(
+            bbox=self.boxes[index].copy(),
+            score=float(self.scores[index]),
+            class_id=None if class_id < 0 else class_id,
+            class_name=self.class_names[index],
+            segmentation=self.segmentations[index] if has_segmentation else None,
+            text=self.texts[index] if self.texts is not None else None,
+        )
+
+    def __repr__(self) -> str:
+        return f"DetectionBatch(n={len(self)}, classes={sorted(set(c for c in self.class_names if c))})"
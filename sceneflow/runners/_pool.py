@@ -0,0 +1,96 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Sequence
+
+_UNSET = object()
+
+
+class RunnerPool:
+    """
+    *size* replicas of a runner, leased to concurrent callers one at a time.
+
+    Runners that keep per-call state (SAM's predictor holds the current image, YOLO-World the
+    current classes) cannot serve several threads at once. The pool builds ``size - 1`` more with
+    `ModelRunner.replicate`, which shares the weights where that is safe, and `lease` hands out an
+    idle one, waiting at most *timeout* seconds (forever when None) before raising `TimeoutError`.
+    Runners marked ``thread_safe`` are not copied: the one instance serves up to *size* callers.
+
+    The pool has the `run` / `run_batch` interface of a runner, so it can stand in for one in
+    `MaskGenerator`, `OCRProcessor` or `Remover`. Runners from the model cache have a single pool,
+    shared by all their holders and grown to the largest size asked for, see `pool_model`.
+    """
+
+    def __init__(self, runner: Any, size: int = 1, timeout: Optional[float] = None):
+        self.runner = runner
+        self.size = 0
+        self.timeout = timeout
+        self.replicas: List[Any] = []
+
+        # Last in, first out: the most recently used replica has the warmest caches
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._grow_lock = threading.Lock()
+        self.leases = 0
+        self.wait_sec = 0.0
+        self.grow(size)
+
+    def grow(self, size: int) -> int:
+        """Add replicas until there are *size*, returns how many were added."""
+        size = max(1, int(size))
+        # Replicating can load weights: leases go on meanwhile, concurrent growers wait
+        with self._grow_lock:
+            added = max(0, size - self.size)
+            for _ in range(added):
+                shared = not self.replicas or getattr(self.runner, "thread_safe", False)
+                replica = self.runner if shared else self.runner.replicate()
+                self.replicas.append(replica)
+                self.size += 1
+                self._idle.put(replica)
+            return added
+
+    def __getattr__(self, name: str) -> Any:
+        # Read-only view of the runner's settings (model_name, device, min_box_area...)
+        if name == "runner":
+            raise AttributeError(name)
+        return getattr(self.runner, name)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = _UNSET) -> Iterator[Any]:
+        """Borrow an idle replica for the duration of the ``with`` block."""
+        timeout = self.timeout if timeout is _UNSET else timeout
+        t0 = time.perf_counter()
+        try:
+            replica = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No idle replica of '{self.model_name}' after {timeout}s") from None
+
+        with self._lock:
+            self.leases += 1
+            self.wait_sec += time.perf_counter() - t0
+        try:
+            yield replica
+        finally:
+            self._idle.put(replica)
+
+    def run(self, *args, **kwargs) -> Any:
+        with self.lease() as replica:
+            return replica.run(*args, **kwargs)
+
+    def run_batch(self, images: Sequence[Any], **kwargs) -> List[Any]:
+        with self.lease() as replica:
+            return replica.run_batch(images, **kwargs)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.run(*args, **kwargs)
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"(RunnerPool runner={self.runner!r} size={self.size} idle={self.idle} leases={self.leases})"
@@ -1,15 +1,22 @@
-from typing import Any, Callable, Dict, List, Optional
+import importlib
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from ._cache import MODEL_CACHE, ModelCache, cache_key
 
 
 class ModelRegistry:
     """
     A named registry for model runner instances or classes.
     Each model is responsible for its own loading and execution.
+
+    Entries can be registered lazily as ``"module:factory"`` strings, so a backend (ultralytics,
+    transformers, mmocr...) is only imported once one of its models is asked for.
     """
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, cache: ModelCache = MODEL_CACHE):
         self.name = name
-        self._registry: Dict[str, Callable] = {}
+        self.cache = cache
+        self._registry: Dict[str, Union[Callable, str]] = {}
         self._meta: Dict[str, Dict[str, Any]] = {}
 
     def register(self, name: str, meta: Optional[Dict[str, Any]] = None):
@@ -18,18 +25,63 @@ class ModelRegistry:
         """
 
         def decorator(runner: Callable):
-            if name in self._registry:
+            # A lazy entry is replaced when its module is imported
+            if name in self._registry and not isinstance(self._registry[name], str):
                 raise ValueError(f"'{name}' is already registered in '{self.name}'")
             self._registry[name] = runner
-            self._meta[name] = meta or {}
+            self._meta[name] = meta or self._meta.get(name) or {}
             return runner
 
         return decorator
 
+    def register_lazy(self, name: str, target: str, meta: Optional[Dict[str, Any]] = None):
+        """
+        Register *name* as ``"module:factory"``, imported on first `get`. *meta* is available
+        without importing the module.
+        """
+        if name in self._registry:
+            raise ValueError(f"'{name}' is already registered in '{self.name}'")
+        self._registry[name] = target
+        self._meta[name] = meta or {}
+
+    def _resolve(self, name: str) -> Callable:
+        runner = self._registry[name]
+        if isinstance(runner, str):
+            module_name, attr = runner.split(":")
+            factory = getattr(importlib.import_module(module_name), attr, None)
+            # Importing the module registers its runners, replacing the lazy entries
+            runner = self._registry[name]
+            if factory is None or runner is not factory:
+                raise ValueError(
+                    f"'{module_name}' does not register '{attr}' as '{name}' in '{self.name}', "
+                    "the lazy entry and the module are out of sync"
+                )
+        return runner
+
     def get(self, name: str, **kwargs) -> Callable:
         if name not in self._registry:
             raise ValueError(f"'{name}' not found in registry '{self.name}'")
-        return self._registry[name](**kwargs)
+        return self._resolve(name)(**kwargs)
+
+    def acquire(self, name: str, device: str = "cpu", **kwargs) -> Any:
+        """
+        Shared runner for *name* on *device*, built by `get` the first time and taken from the
+        model cache afterwards. Give it back with `release` once done.
+        """
+        if name not in self._registry:
+            raise ValueError(f"'{name}' not found in registry '{self.name}'")
+        key = cache_key(self.name, name, device, kwargs)
+        return self.cache.acquire(key, lambda: self.get(name, device=device, **kwargs))
+
+    def release(self, runner: Any) -> bool:
+        """Give back a runner from `acquire`; it stays loaded until the cache needs the memory."""
+        return self.cache.release(runner)
+
+    def meta(self, name: str) -> Dict[str, Any]:
+        """Metadata given at registration, e.g. ``{"masks": True}`` for detectors that also segment."""
+        if name not in self._registry:
+            raise ValueError(f"'{name}' not found in registry '{self.name}'")
+        return dict(self._meta[name])
 
     def has(self, name: str) -> bool:
         return name in self._registry
@@ -38,11 +90,12 @@ class ModelRegistry:
         if name in self._registry:
             del self._registry[name]
             self._meta.pop(name, None)
+            self.cache.evict(lambda key: key[:2] == (self.name, name))
         else:
             raise ValueError(f"'{name}' is not registered in '{self.name}'")
 
     def list(self) -> Dict[str, Callable]:
-        return dict(self._registry)
+        return {name: self._resolve(name) for name in self._registry}
 
     def list_models(self) -> List[str]:
         return sorted(self._registry.keys())
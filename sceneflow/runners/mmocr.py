@@ -1,13 +1,19 @@
-from typing import List, Optional
+import logging
+from typing import Optional
 
 import numpy as np
+from mmengine.logging import MMLogger
 from mmocr.apis import MMOCRInferencer
 from mmocr.utils.polygon_utils import poly2bbox
 
 from sceneflow.runners._factory import TEXT_DETECTORS
-from sceneflow.runners._helpers import Detection, ModelRunner
+from sceneflow.runners._helpers import DetectionBatch, ModelRunner
 from sceneflow.utils.stdout_utils import suppress_stdout_stderr
 
+# Suppress mmocr and mmengine logs
+MMLogger.get_instance("mmocr").setLevel(logging.ERROR)
+MMLogger.get_instance("mmengine").setLevel(logging.ERROR)
+
 
 class MMOCRRunner(ModelRunner):
     """Generic MMOCR runner that accepts detector and recognizer configuration."""
@@ -25,54 +31,52 @@ class MMOCRRunner(ModelRunner):
         )
 
     @suppress_stdout_stderr()
-    def run(self, image: np.ndarray, conf: float = 0.5, **kwargs) -> List[Detection]:
+    def run(self, image: np.ndarray, conf: float = 0.5, **kwargs) -> DetectionBatch:
         results = self._model(image, show=False)
 
-        detections: List[Detection] = []
+        boxes, scores, texts = [], [], []
 
         for item in results["predictions"]:
             polygons = item.get("det_polygons", [])
             det_scores = item.get("det_scores", [])
             rec_scores = item.get("rec_scores", [])
-            texts = item.get("rec_texts", [])
+            rec_texts = item.get("rec_texts", [])
 
-            if not (len(polygons) == len(det_scores) == len(texts) == len(rec_scores)):
+            if not (len(polygons) == len(det_scores) == len(rec_texts) == len(rec_scores)):
                 continue
 
-            for polygon, det_score, text, rec_score in zip(polygons, det_scores, texts, rec_scores):
+            for polygon, det_score, text, rec_score in zip(polygons, det_scores, rec_texts, rec_scores):
                 if float(det_score) < conf or float(rec_score) < conf:
                     continue
 
-                bbox = poly2bbox(polygon)
-
-                detections.append(
-                    Detection(
-                        bbox=np.array(bbox, dtype=np.float32),
-                        score=float(det_score),
-                        class_id=0,
-                        class_name="text",
-                        text=text,
-                    )
-                )
+                boxes.append(poly2bbox(polygon))
+                scores.append(float(det_score))
+                texts.append(text)
 
-        return detections
+        return DetectionBatch(
+            boxes=boxes,
+            scores=scores,
+            class_ids=np.zeros(len(boxes)),
+            class_names=["text"] * len(boxes),
+            texts=texts,
+        )
 
 
 @TEXT_DETECTORS.register("mmocr_dbnet_crnn")
-def mmocr_dbnet_crnn():
-    return MMOCRRunner("mmocr_dbnet_crnn", det="DBNet", rec="CRNN")
+def mmocr_dbnet_crnn(device: str = "cpu"):
+    return MMOCRRunner("mmocr_dbnet_crnn", det="DBNet", rec="CRNN", device=device)
 
 
 @TEXT_DETECTORS.register("mmocr_dbnet_abinet")
-def mmocr_dbnet_abinet():
-    return MMOCRRunner("mmocr_dbnet_abinet", det="DBNet", rec="ABINet")
+def mmocr_dbnet_abinet(device: str = "cpu"):
+    return MMOCRRunner("mmocr_dbnet_abinet", det="DBNet", rec="ABINet", device=device)
 
 
 @TEXT_DETECTORS.register("mmocr_drrg_abinet")
-def mmocr_drrg_abinet():
-    return MMOCRRunner("mmocr_drrg_abinet", det="DRRG", rec="ABINet")
+def mmocr_drrg_abinet(device: str = "cpu"):
+    return MMOCRRunner("mmocr_drrg_abinet", det="DRRG", rec="ABINet", device=device)
 
 
 @TEXT_DETECTORS.register("mmocr_fcenet_crnn")
-def mmocr_fcenet_crnn():
-    return MMOCRRunner("mmocr_fcenet_crnn", det="FCENet", rec="CRNN")
+def mmocr_fcenet_crnn(device: str = "cpu"):
+    return MMOCRRunner("mmocr_fcenet_crnn", det="FCENet", rec="CRNN", device=device)
@@ -1,43 +1,94 @@
+import copy
 import os
-from typing import List, Sequence
+from typing import List, Sequence, Tuple
 
 import numpy as np
 import torch
 from transformers import OwlViTForObjectDetection, OwlViTProcessor
+from transformers.models.owlvit.modeling_owlvit import OwlViTObjectDetectionOutput
 
 from ._factory import OVD_DETECTORS
-from ._helpers import Detection, ModelRunner
-
-HF_TOKEN = os.getenv("HF_TOKEN")
-if HF_TOKEN is None:
-    raise EnvironmentError("Environment variable 'HF_TOKEN' is not set. Please set it to your Hugging Face token.")
+from ._helpers import DetectionBatch, ModelRunner, PromptCache
 
 
 class OwlViTRunner(ModelRunner):
+    """
+    OWL-ViT open-vocabulary detector.
+
+    The text tower only depends on the prompts, so its query embeddings are cached per prompt
+    tuple (*max_prompt_sets* most recent ones); each image then only goes through the image tower
+    and the box and class heads.
+    """
+
+    def __init__(self, model_name: str, device: str = "cpu", max_prompt_sets: int = 8):
+        self._queries = PromptCache(max_prompt_sets)
+        super().__init__(model_name=model_name, device=device)
+
     def _load_model(self):
-        self._processor = OwlViTProcessor.from_pretrained(self.model_name, token=HF_TOKEN)
-        self._model = OwlViTForObjectDetection.from_pretrained(self.model_name, token=HF_TOKEN).to(self.device)
+        token = os.getenv("HF_TOKEN")
+        if token is None:
+            raise EnvironmentError(
+                "Environment variable 'HF_TOKEN' is not set. Please set it to your Hugging Face token."
+            )
+        self._processor = OwlViTProcessor.from_pretrained(self.model_name, token=token)
+        self._model = OwlViTForObjectDetection.from_pretrained(self.model_name, token=token).to(self.device)
 
-    def run(self, image: np.ndarray, texts: Sequence[str], conf: float = 0.25, **kwargs) -> List[Detection]:
+    def replicate(self) -> "OwlViTRunner":
+        """Replica sharing the weights, with its own processor (fast tokenizers are not re-entrant) and query cache."""
+        replica = copy.copy(self)
+        replica._processor = copy.deepcopy(self._processor)
+        replica._queries = PromptCache(self._queries.max_items)
+        return replica
+
+    def run(self, image: np.ndarray, texts: Sequence[str], conf: float = 0.25, **kwargs) -> DetectionBatch:
+        return self.run_batch([image], texts=texts, conf=conf, **kwargs)[0]
+
+    def run_batch(
+        self, images: Sequence[np.ndarray], texts: Sequence[str], conf: float = 0.25, **kwargs
+    ) -> List[DetectionBatch]:
         processor = self._processor
         model = self.model
 
-        inputs = processor(text=texts, images=image, return_tensors="pt").to(self.device)
+        query_embeds, query_mask = self._queries.get(texts, self._embed_queries)
+        pixel_values = processor(images=list(images), return_tensors="pt")["pixel_values"].to(self.device)
         with torch.no_grad():
-            outputs = model(**inputs)
+            feature_map = model.image_embedder(pixel_values=pixel_values)[0]
+            batch_size, height, width, dim = feature_map.shape
+            image_feats = feature_map.reshape(batch_size, height * width, dim)
+
+            logits = model.class_predictor(
+                image_feats,
+                query_embeds.expand(batch_size, -1, -1),
+                query_mask.expand(batch_size, -1),
+            )[0]
+            pred_boxes = model.box_predictor(image_feats, feature_map)
+        outputs = OwlViTObjectDetectionOutput(logits=logits, pred_boxes=pred_boxes)
 
-        target_sizes = torch.tensor([image.shape[:2]], device=self.device)
-        results = processor.post_process_object_detection(outputs, threshold=conf, target_sizes=target_sizes)[0]
+        target_sizes = torch.tensor([image.shape[:2] for image in images], device=self.device)
+        results = processor.post_process_object_detection(outputs, threshold=conf, target_sizes=target_sizes)
 
-        return [
-            Detection(
-                bbox=box,
-                score=float(score),
-                class_id=int(label),
-                class_name=texts[int(label)],
+        batches = []
+        for res in results:
+            labels = res["labels"].cpu().numpy()
+            batches.append(
+                DetectionBatch(
+                    boxes=res["boxes"].cpu().numpy(),
+                    scores=res["scores"].cpu().numpy(),
+                    class_ids=labels,
+                    class_names=[texts[label] for label in labels.tolist()],
+                )
             )
-            for box, score, label in zip(results["boxes"].cpu(), results["scores"].cpu(), results["labels"].cpu())
-        ]
+        return batches
+
+    def _embed_queries(self, texts: Tuple[str, ...]) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Normalized ``(1, Q, D)`` query embeddings and ``(1, Q)`` valid-query mask, as in the full forward pass."""
+        owlvit = self.model.owlvit
+        inputs = self._processor(text=[list(texts)], return_tensors="pt").to(self.device)
+        with torch.no_grad():
+            text_outputs = owlvit.text_model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"])
+            embeds = owlvit.text_projection(text_outputs[1])
+            embeds = embeds / torch.linalg.norm(embeds, ord=2, dim=-1, keepdim=True)
+        return embeds[None], inputs["input_ids"][None, :, 0] > 0
 
 
 @OVD_DETECTORS.register("owlvit_base")
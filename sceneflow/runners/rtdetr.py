@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Sequence
 
 import numpy as np
 from ultralytics import RTDETR
@@ -7,7 +7,7 @@ from ultralytics.engine.results import Results as UltralyticsResults
 from sceneflow.utils.hub import download_model_weights_to_zoo
 
 from ._factory import DETECTORS
-from ._helpers import Detection, ModelRunner
+from ._helpers import DetectionBatch, ModelRunner, detections_from_ultralytics
 
 
 class RTDETRRunner(ModelRunner):
@@ -15,23 +15,13 @@ class RTDETRRunner(ModelRunner):
         path = download_model_weights_to_zoo(self.model_name) or f"{self.model_name}.pt"
         self._model = RTDETR(str(path)).to(self.device)
 
-    def run(self, image: np.ndarray, conf: float = 0.25, **kwargs) -> List[Detection]:
-        results: List[UltralyticsResults] = self.model.predict(source=image, conf=conf, verbose=False)
-        if not results or not results[0].boxes:
-            return []
+    def run(self, image: np.ndarray, conf: float = 0.25, **kwargs) -> DetectionBatch:
+        return self.run_batch([image], conf=conf, **kwargs)[0]
 
-        boxes = results[0].boxes
+    def run_batch(self, images: Sequence[np.ndarray], conf: float = 0.25, **kwargs) -> List[DetectionBatch]:
+        results: List[UltralyticsResults] = self.model.predict(source=list(images), conf=conf, verbose=False)
         names = getattr(self.model.model, "names", {})
-
-        return [
-            Detection(
-                bbox=box.cpu().numpy(),
-                score=float(score),
-                class_id=int(cls_id),
-                class_name=names.get(int(cls_id), str(int(cls_id))),
-            )
-            for box, cls_id, score in zip(boxes.xyxy.cpu(), boxes.cls.int().cpu(), boxes.conf.cpu())
-        ]
+        return [detections_from_ultralytics(result, names) for result in results]
 
 
 @DETECTORS.register("rtdetr_l")
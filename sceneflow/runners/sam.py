@@ -1,17 +1,53 @@
+import copy
 from pathlib import Path
-from typing import List
+from typing import Optional, Sequence, Tuple, Union
 
+import cv2
 import numpy as np
 import torch
 from segment_anything import SamPredictor, sam_model_registry
 
+from sceneflow.utils.embedding_cache import EmbeddingCache
 from sceneflow.utils.hub import download_model_weights_to_zoo
+from sceneflow.utils.io import image_digest
+from sceneflow.utils.masks import Box, CroppedMasks
+from sceneflow.utils.timing import timed
 
 from ._factory import SEGMENTORS
-from ._helpers import Detection, ModelRunner
+from ._helpers import Detection, DetectionBatch, ModelRunner, crop_masks
+
+SMALL_OBJECT_MASKS = ("box", "ellipse")
 
 
 class SAMRunner(ModelRunner):
+    """
+    Box-prompted SAM. Image embeddings go through *embedding_cache* (by default a small in-memory
+    LRU), so prompting the same image again only runs the mask decoder. `run` also takes an
+    *embedding_cache* of its own, so that callers sharing one cached runner keep separate caches.
+
+    The decoder gets at most *max_boxes_per_call* prompts at a time and each chunk is cropped
+    before the next one runs, so memory stays bounded in crowded scenes. Detections whose box is
+    under *min_box_area* pixels skip SAM and get a filled *small_object_mask* ("box" or
+    "ellipse") instead; when all of them do, the image encoder does not run at all.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        device: str = "cpu",
+        embedding_cache: Optional[EmbeddingCache] = None,
+        max_boxes_per_call: int = 64,
+        min_box_area: float = 0,
+        small_object_mask: str = "box",
+    ):
+        if small_object_mask not in SMALL_OBJECT_MASKS:
+            raise ValueError(f"Unknown small object mask '{small_object_mask}', expected one of {SMALL_OBJECT_MASKS}")
+        self.embedding_cache = EmbeddingCache() if embedding_cache is None else embedding_cache
+        self.max_boxes_per_call = max(1, int(max_boxes_per_call))
+        self.min_box_area = min_box_area
+        self.small_object_mask = small_object_mask
+        super().__init__(model_name, device=device)
+
     def _load_model(self):
         variant = self.model_name.replace("sam_", "")
         ckpt = download_model_weights_to_zoo(f"sam_{variant}") or f"sam_{variant}"
@@ -26,35 +62,103 @@ class SAMRunner(ModelRunner):
         sam = sam_model_registry[model_key](checkpoint=str(ckpt)).to(self.device)
         self._model = SamPredictor(sam)
 
-    def run(self, image: np.ndarray, detections: List[Detection], **kwargs) -> List[np.ndarray]:
-        if not detections:
-            return []
-
-        predictor: SamPredictor = self.model
-        predictor.set_image(image)
-
-        boxes = torch.tensor([det.bbox.tolist() for det in detections], dtype=torch.float32)
-        transformed_boxes = predictor.transform.apply_boxes_torch(boxes, image.shape[:2]).to(predictor.device)
-
+    def replicate(self) -> "SAMRunner":
+        """Replica with its own predictor (the current image) over the same weights and embedding cache."""
+        replica = copy.copy(self)
+        replica._model = SamPredictor(self.model.model)
+        return replica
+
+    def run(
+        self,
+        image: np.ndarray,
+        detections: Union[DetectionBatch, Sequence[Detection]],
+        embedding_cache: Optional[EmbeddingCache] = None,
+        **kwargs,
+    ) -> CroppedMasks:
+        size = image.shape[:2]
+        if len(detections) == 0:
+            return CroppedMasks.empty(size)
+
+        boxes = DetectionBatch.from_detections(detections).boxes
+        crops = [None] * len(boxes)
+        crop_boxes = np.zeros((len(boxes), 4), dtype=np.int64)
+
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        small = areas < self.min_box_area
+        for i in np.flatnonzero(small):
+            crops[i], crop_boxes[i] = _shape_mask(boxes[i], size, self.small_object_mask)
+
+        prompted = np.flatnonzero(~small)
+        if len(prompted) > 0:
+            predictor: SamPredictor = self.model
+            cache = self.embedding_cache if embedding_cache is None else embedding_cache
+            self._set_image(predictor, image, cache)
+            for start in range(0, len(prompted), self.max_boxes_per_call):
+                chunk = prompted[start : start + self.max_boxes_per_call]
+                masks = self._predict(predictor, boxes[chunk], size)
+                for i, crop, box in zip(chunk, masks.crops, masks.boxes):
+                    crops[i], crop_boxes[i] = crop, box
+
+        return CroppedMasks(crops, crop_boxes, size)
+
+    @staticmethod
+    def _predict(predictor: SamPredictor, boxes: np.ndarray, size: Tuple[int, int]) -> CroppedMasks:
+        transformed_boxes = predictor.transform.apply_boxes_torch(torch.from_numpy(boxes.copy()), size)
         masks, _, _ = predictor.predict_torch(
             point_coords=None,
             point_labels=None,
-            boxes=transformed_boxes,
+            boxes=transformed_boxes.to(predictor.device),
             multimask_output=False,
         )
-        return masks.squeeze(1).cpu().numpy().astype(np.uint8)
+        return crop_masks(masks.squeeze(1), size)
+
+    def _set_image(self, predictor: SamPredictor, image: np.ndarray, embedding_cache: EmbeddingCache):
+        """`SamPredictor.set_image`, with the encoder output read from / written to *embedding_cache*."""
+        key = f"{self.model_name}-{image_digest(image)}"
+        features = embedding_cache.get(key)
+        if features is None:
+            with timed("sam_encoder"):
+                predictor.set_image(image)
+            embedding_cache.put(key, predictor.features.cpu().numpy())
+            return
+
+        # Same state as `set_torch_image` leaves, without running the image encoder
+        predictor.reset_image()
+        predictor.original_size = image.shape[:2]
+        predictor.input_size = predictor.transform.get_preprocess_shape(
+            image.shape[0], image.shape[1], predictor.transform.target_length
+        )
+        predictor.features = torch.from_numpy(np.array(features)).to(predictor.device)
+        predictor.is_image_set = True
+
+
+def _shape_mask(box: np.ndarray, size: Tuple[int, int], shape: str) -> Tuple[np.ndarray, Box]:
+    """Filled box or inscribed ellipse for a detection box, as a crop and its integer box."""
+    height, width = size
+    x0, y0 = max(0, int(np.floor(box[0]))), max(0, int(np.floor(box[1])))
+    x1, y1 = min(width, int(np.ceil(box[2]))), min(height, int(np.ceil(box[3])))
+    if x1 <= x0 or y1 <= y0:
+        return np.zeros((0, 0), dtype=np.uint8), (0, 0, 0, 0)
+
+    if shape == "box":
+        return np.ones((y1 - y0, x1 - x0), dtype=np.uint8), (x0, y0, x1, y1)
+
+    crop = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+    w, h = x1 - x0, y1 - y0
+    cv2.ellipse(crop, (w // 2, h // 2), (max(1, w // 2), max(1, h // 2)), 0, 0, 360, 1, thickness=-1)
+    return crop, (x0, y0, x1, y1)
 
 
 @SEGMENTORS.register("sam_b")
-def sam_b(name: str = "sam_b", device: str = "cpu") -> SAMRunner:
-    return SAMRunner(name, device=device)
+def sam_b(name: str = "sam_b", device: str = "cpu", **kwargs) -> SAMRunner:
+    return SAMRunner(name, device=device, **kwargs)
 
 
 @SEGMENTORS.register("sam_l")
-def sam_l(name: str = "sam_l", device: str = "cpu") -> SAMRunner:
-    return SAMRunner(name, device=device)
+def sam_l(name: str = "sam_l", device: str = "cpu", **kwargs) -> SAMRunner:
+    return SAMRunner(name, device=device, **kwargs)
 
 
 @SEGMENTORS.register("sam_h")
-def sam_h(name: str = "sam_h", device: str = "cpu") -> SAMRunner:
-    return SAMRunner(name, device=device)
+def sam_h(name: str = "sam_h", device: str = "cpu", **kwargs) -> SAMRunner:
+    return SAMRunner(name, device=device, **kwargs)
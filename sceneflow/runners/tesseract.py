@@ -1,26 +1,27 @@
-from typing import List
-
 import numpy as np
 import pytesseract
 from pytesseract import Output
 
 from sceneflow.runners._factory import TEXT_DETECTORS
 
-from ._helpers import Detection, ModelRunner
+from ._helpers import DetectionBatch, ModelRunner
 
 
 class TesseractRunner(ModelRunner):
+    # Each call runs its own tesseract process
+    thread_safe = True
+
     def _load_model(self):
         self.config = "--oem 3 --psm 6"
 
-    def run(self, image: np.ndarray, conf: float = 0.0, **kwargs) -> List[Detection]:
+    def run(self, image: np.ndarray, conf: float = 0.0, **kwargs) -> DetectionBatch:
         # Run Tesseract OCR on the input image
         data = pytesseract.image_to_data(image, config=self.config, output_type=Output.DICT)
 
         # Ensure confidence is in percentage
         conf = conf * 100 if conf < 1.0 else conf
 
-        detections = []
+        boxes, scores, texts = [], [], []
         for i in range(len(data["text"])):
             text = data["text"][i]
             if not text.strip():
@@ -29,16 +30,11 @@ class TesseractRunner(ModelRunner):
             if score < conf:
                 continue
             x, y, w, h = data["left"][i], data["top"][i], data["width"][i], data["height"][i]
-            bbox_xyxy = np.array([x, y, x + w, y + h], dtype=np.float32)
+            boxes.append([x, y, x + w, y + h])
+            scores.append(score / 100.0)  # Convert to [0, 1] range
+            texts.append(text)
 
-            detections.append(
-                Detection(
-                    bbox=bbox_xyxy,
-                    score=score / 100.0,  # Convert to [0, 1] range
-                    text=text,
-                )
-            )
-        return detections
+        return DetectionBatch(boxes=boxes, scores=scores, texts=texts)
 
 
 # Register useful PSM modes from 0 to 13 (excluding deprecated or rarely used ones)
@@ -56,80 +52,80 @@ PSM_MODES = {
 
 
 @TEXT_DETECTORS.register("tesseract_osd_only")
-def tesseract_osd_only():
+def tesseract_osd_only(device: str = "cpu"):
     """Tesseract OCR with PSM 0 (OSD only)."""
-    runner = TesseractRunner("tesseract_osd_only")
+    runner = TesseractRunner("tesseract_osd_only", device=device)
     runner.config = "--oem 3 --psm 0"
     return runner
 
 
 @TEXT_DETECTORS.register("tesseract_auto_with_osd")
-def tesseract_auto_with_osd():
+def tesseract_auto_with_osd(device: str = "cpu"):
     """Tesseract OCR with PSM 1 (Automatic page segmentation with OSD)."""
-    runner = TesseractRunner("tesseract_auto_with_osd")
+    runner = TesseractRunner("tesseract_auto_with_osd", device=device)
     runner.config = "--oem 3 --psm 1"
     return runner
 
 
 @TEXT_DETECTORS.register("tesseract_auto")
-def tesseract_auto():
+def tesseract_auto(device: str = "cpu"):
     """Tesseract OCR with PSM 3 (Fully automatic page segmentation, no OSD)."""
-    runner = TesseractRunner("tesseract_auto")
+    runner = TesseractRunner("tesseract_auto", device=device)
     runner.config = "--oem 3 --psm 3"
     return runner
 
 
 @TEXT_DETECTORS.register("tesseract_single_column")
-def tesseract_single_column():
+def tesseract_single_column(device: str = "cpu"):
     """Tesseract OCR with PSM 4 (Assume a single column of text)."""
-    runner = TesseractRunner("tesseract_single_column")
+    runner = TesseractRunner("tesseract_single_column", device=device)
     runner.config = "--oem 3 --psm 4"
     return runner
 
 
 @TEXT_DETECTORS.register("tesseract_single_block")
-def tesseract_single_block():
+def tesseract_single_block(device: str = "cpu"):
     """Tesseract OCR with PSM 6 (Assume a single uniform block of text)."""
-    runner = TesseractRunner("tesseract_single_block")
+    runner = TesseractRunner("tesseract_single_block", device=device)
     runner.config = "--oem 3 --psm 6"
     return runner
 
 
 @TEXT_DETECTORS.register("tesseract_single_line")
-def tesseract_single_line():
+def tesseract_single_line(device: str = "cpu"):
     """Tesseract OCR with PSM 7 (Treat the image as a single text line)."""
-    runner = TesseractRunner("tesseract_single_line")
+    runner = TesseractRunner("tesseract_single_line", device=device)
     runner.config = "--oem 3 --psm 7"
     return runner
 
 
 @TEXT_DETECTORS.register("tesseract_single_word")
-def tesseract_single_word():
+def tesseract_single_word(device: str = "cpu"):
     """Tesseract OCR with PSM 8 (Treat the image as a single word)."""
-    runner = TesseractRunner("tesseract_single_word")
+    runner = TesseractRunner("tesseract_single_word", device=device)
     runner.config = "--oem 3 --psm 8"
     return runner
 
 
 @TEXT_DETECTORS.register("tesseract_sparse")
-def tesseract_sparse():
+def tesseract_sparse(device: str = "cpu"):
     """Tesseract OCR with PSM 11 (Sparse text with OSD)."""
-    runner = TesseractRunner("tesseract_sparse")
+    runner = TesseractRunner("tesseract_sparse", device=device)
     runner.config = "--oem 3 --psm 11"
     return runner
 
 
 @TEXT_DETECTORS.register("tesseract_raw_line")
-def tesseract_raw_line():
+def tesseract_raw_line(device: str = "cpu"):
     """Tesseract OCR with PSM 13 (Raw line — no layout analysis)."""
-    runner = TesseractRunner("tesseract_raw_line")
+    runner = TesseractRunner("tesseract_raw_line", device=device)
     runner.config = "--oem 3 --psm 13"
     return runner
 
 
 @TEXT_DETECTORS.register("tesseract_default")
-def tesseract_default():
+def tesseract_default(device: str = "cpu"):
     """Tesseract OCR with default settings (PSM 3)."""
-    runner = TesseractRunner("tesseract_default")
+    runner = TesseractRunner("tesseract_default", device=device)
     runner.config = ""
     return runner
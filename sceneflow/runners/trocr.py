@@ -1,10 +1,8 @@
-from typing import List
-
 import numpy as np
 from transformers import TrOCRProcessor, VisionEncoderDecoderModel
 
 from sceneflow.runners._factory import TEXT_DETECTORS
-from sceneflow.runners._helpers import Detection, ModelRunner
+from sceneflow.runners._helpers import DetectionBatch, ModelRunner
 
 
 class TrOCRRunner(ModelRunner):
@@ -15,21 +13,19 @@ class TrOCRRunner(ModelRunner):
         self.processor = TrOCRProcessor.from_pretrained(self.model_name)
         self._model = VisionEncoderDecoderModel.from_pretrained(self.model_name).to(self.device)
 
-    def run(self, image: np.ndarray, conf: float = 0.0, **kwargs) -> List[Detection]:
+    def run(self, image: np.ndarray, conf: float = 0.0, **kwargs) -> DetectionBatch:
         """Runs TrOCR on an image and returns the recognized text as a single detection."""
         pixel_values = self.processor(image, return_tensors="pt").pixel_values.to(self.device)
         generated_ids = self.model.generate(pixel_values)
         generated_text = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
 
-        return [
-            Detection(
-                bbox=np.array([0, 0, image.shape[1], image.shape[0]], dtype=np.float32),
-                score=1.0,
-                class_id=0,
-                class_name="text",
-                text=generated_text,
-            )
-        ]
+        return DetectionBatch(
+            boxes=[[0, 0, image.shape[1], image.shape[0]]],
+            scores=[1.0],
+            class_ids=[0],
+            class_names=["text"],
+            texts=[generated_text],
+        )
 
 
 @TEXT_DETECTORS.register("trocr_handwritten")
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Sequence
 
 import numpy as np
 from ultralytics import YOLO
@@ -7,7 +7,7 @@ from ultralytics.engine.results import Results as UltralyticsResults
 from sceneflow.utils.hub import download_model_weights_to_zoo
 
 from ._factory import DETECTORS
-from ._helpers import Detection, ModelRunner
+from ._helpers import DetectionBatch, ModelRunner, crop_masks, detections_from_ultralytics
 
 
 class YoloRunner(ModelRunner):
@@ -15,25 +15,36 @@ class YoloRunner(ModelRunner):
         path = download_model_weights_to_zoo(self.model_name) or self.model_name
         self._model = YOLO(str(path) + ".pt").to(self.device)
 
-    def run(self, image: np.ndarray, conf: float = 0.25, **kwargs) -> List[Detection]:
+    def run(self, image: np.ndarray, conf: float = 0.25, **kwargs) -> DetectionBatch:
+        return self.run_batch([image], conf=conf, **kwargs)[0]
+
+    def run_batch(self, images: Sequence[np.ndarray], conf: float = 0.25, **kwargs) -> List[DetectionBatch]:
         results: List[UltralyticsResults] = self.model.predict(
-            source=image, conf=conf, device=self.device, verbose=False
+            source=list(images), conf=conf, device=self.device, verbose=False
         )
-        if not results or not results[0].boxes:
-            return []
+        names = getattr(self.model.model, "names", {})
+        return [detections_from_ultralytics(result, names) for result in results]
+
 
-        boxes = results[0].boxes
+class YoloSegRunner(YoloRunner):
+    """
+    Ultralytics ``-seg`` model: boxes and instance masks in one forward pass, so `MaskGenerator`
+    needs no separate segmentor. Masks are returned at the input image resolution.
+    """
+
+    def run_batch(self, images: Sequence[np.ndarray], conf: float = 0.25, **kwargs) -> List[DetectionBatch]:
+        results: List[UltralyticsResults] = self.model.predict(
+            source=list(images), conf=conf, device=self.device, retina_masks=True, verbose=False
+        )
         names = getattr(self.model.model, "names", {})
 
-        return [
-            Detection(
-                bbox=box,
-                score=float(score),
-                class_id=int(cls_id),
-                class_name=names.get(int(cls_id), str(int(cls_id))),
-            )
-            for box, cls_id, score in zip(boxes.xyxy.cpu(), boxes.cls.int().cpu(), boxes.conf.cpu())
-        ]
+        out = []
+        for image, result in zip(images, results):
+            detections = detections_from_ultralytics(result, names)
+            if len(detections) > 0 and result.masks is not None:
+                detections.masks = crop_masks(result.masks.data > 0.5, image.shape[:2])
+            out.append(detections)
+        return out
 
 
 @DETECTORS.register("yolov8n")
@@ -49,3 +60,18 @@ def yolov8x(name: str = "yolov8x", device: str = "cpu") -> YoloRunner:
 @DETECTORS.register("yolo11x")
 def yolo11x(name: str = "yolo11x", device: str = "cpu") -> YoloRunner:
     return YoloRunner(name, device=device)
+
+
+@DETECTORS.register("yolov8n-seg", meta={"masks": True})
+def yolov8n_seg(name: str = "yolov8n-seg", device: str = "cpu") -> YoloSegRunner:
+    return YoloSegRunner(name, device=device)
+
+
+@DETECTORS.register("yolov8x-seg", meta={"masks": True})
+def yolov8x_seg(name: str = "yolov8x-seg", device: str = "cpu") -> YoloSegRunner:
+    return YoloSegRunner(name, device=device)
+
+
+@DETECTORS.register("yolo11x-seg", meta={"masks": True})
+def yolo11x_seg(name: str = "yolo11x-seg", device: str = "cpu") -> YoloSegRunner:
+    return YoloSegRunner(name, device=device)
@@ -1,4 +1,4 @@
-from typing import List, Sequence
+from typing import List, Sequence, Tuple
 
 import numpy as np
 from ultralytics import YOLOWorld
@@ -6,12 +6,20 @@ from ultralytics import YOLOWorld
 from sceneflow.utils.hub import download_model_weights_to_zoo
 
 from ._factory import OVD_DETECTORS
-from ._helpers import Detection, ModelRunner
+from ._helpers import DetectionBatch, ModelRunner, PromptCache, detections_from_ultralytics
 
 
 class YoloWorldRunner(ModelRunner):
-    def __init__(self, model_name: str, device: str = "cpu"):
-        self._classes = None
+    """
+    YOLO-World open-vocabulary detector.
+
+    The class embeddings of the CLIP text encoder are cached per prompt tuple (*max_prompt_sets*
+    most recent ones), so switching back to a known prompt set only swaps them into the head.
+    """
+
+    def __init__(self, model_name: str, device: str = "cpu", max_prompt_sets: int = 8):
+        self._classes: Tuple[str, ...] = ()
+        self._class_embeds = PromptCache(max_prompt_sets)
         super().__init__(model_name=model_name, device=device)
 
     def _load_model(self):
@@ -20,21 +28,43 @@ class YoloWorldRunner(ModelRunner):
             path = str(path) + ".pt"
         self._model = YOLOWorld(path).to(self.device)
 
-    def run(self, image: np.ndarray, texts: Sequence[str], conf: float = 0.5, **kwargs) -> List[Detection]:
-        if self._classes is None:
-            self._classes = texts
-            self.model.set_classes(texts)
+    def replicate(self) -> "YoloWorldRunner":
+        # The classes are set on the model itself, so each replica needs its own copy of the weights
+        replica = super().replicate()
+        replica._classes = ()
+        replica._class_embeds = PromptCache(self._class_embeds.max_items)
+        return replica
+
+    def run(self, image: np.ndarray, texts: Sequence[str], conf: float = 0.5, **kwargs) -> DetectionBatch:
+        return self.run_batch([image], texts=texts, conf=conf, **kwargs)[0]
+
+    def run_batch(
+        self, images: Sequence[np.ndarray], texts: Sequence[str], conf: float = 0.5, **kwargs
+    ) -> List[DetectionBatch]:
+        self._set_classes(texts)
+
+        results = self.model.predict(source=list(images), conf=conf, device=self.device, verbose=False)
+        names = dict(enumerate(texts))
+        return [detections_from_ultralytics(result, names) for result in results]
 
-        results = self.model.predict(source=image, conf=conf, device=self.device, verbose=False)
-        if not results or not results[0].boxes:
-            return []
+    def _set_classes(self, texts: Sequence[str]):
+        texts = tuple(texts)
+        if texts == self._classes:
+            return
 
-        boxes = results[0].boxes
+        world = self.model.model
+        txt_feats = self._class_embeds.get(texts, self._embed_classes)
+        if world.txt_feats is not txt_feats:
+            world.txt_feats = txt_feats
+            world.model[-1].nc = len(texts)
+            world.names = list(texts)
+            # The predictor keeps the class names it was set up with
+            self.model.predictor = None
+        self._classes = texts
 
-        return [
-            Detection(box, float(score), int(cls_idx), texts[int(cls_idx)])
-            for box, score, cls_idx in zip(boxes.xyxy.cpu(), boxes.conf.cpu(), boxes.cls.int().cpu())
-        ]
+    def _embed_classes(self, texts: Tuple[str, ...]):
+        self.model.set_classes(list(texts))
+        return self.model.model.txt_feats
 
 
 @OVD_DETECTORS.register("yolov8x-worldv2")
@@ -1,11 +1,15 @@
+from __future__ import annotations
+
 import random
-from typing import List
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import cv2
 import numpy as np
-from pycocotools import mask as mask_utils
 
-from sceneflow.runners._helpers import Detection
+from sceneflow.utils.masks import CroppedMasks
+
+if TYPE_CHECKING:
+    from sceneflow.runners._helpers import Detection, DetectionBatch
 
 
 def random_color(seed=None):
@@ -14,44 +18,94 @@ def random_color(seed=None):
     return tuple(random.choices(range(50, 256), k=3))
 
 
-def generate_static_scene_mask(image, detections):
+MaskCrop = Tuple[np.ndarray, Tuple[int, int, int, int], Tuple[int, int]]
+
+
+def _rle_crop(rle: Optional[Dict[str, Any]]) -> Optional[MaskCrop]:
+    if rle is None:
+        return None
+    masks = CroppedMasks.from_rles([rle])
+    return masks.crops[0], tuple(masks.boxes[0]), masks.size
+
+
+def _iter_detections(
+    detections: Union[DetectionBatch, Sequence[Any]], masks: Optional[CroppedMasks] = None
+) -> Iterator[Tuple[Sequence[float], Optional[str], float, Optional[MaskCrop]]]:
+    """
+    ``(bbox, class_name, score, (crop, crop_box, frame_size))`` per detection, the mask part being
+    ``None`` without a segmentation. A `DetectionBatch` is read column-wise.
+
+    *masks*, already decoded with one mask per detection, are used instead of the segmentations.
+    """
+    if masks is not None and len(masks) != len(detections):
+        masks = None
+
+    # Duck-typed: importing the runners would pull in torch for the model-free render pipeline
+    if hasattr(detections, "class_names"):
+        masks = detections.masks if masks is None else masks
+        rles = detections.segmentations if masks is None else None
+        for i, (bbox, label, score) in enumerate(
+            zip(detections.boxes.tolist(), detections.class_names, detections.scores.tolist())
+        ):
+            if masks is not None:
+                yield bbox, label, score, (masks.crops[i], tuple(masks.boxes[i]), masks.size)
+            else:
+                yield bbox, label, score, _rle_crop(rles[i])
+        return
+
+    for i, det in enumerate(detections):
+        if masks is not None:
+            yield det["bbox"], det["class_name"], det["score"], (masks.crops[i], tuple(masks.boxes[i]), masks.size)
+        else:
+            yield det["bbox"], det["class_name"], det["score"], _rle_crop(det["segmentation"])
+
+
+def generate_static_scene_mask(image, detections, masks: Optional[CroppedMasks] = None):
+    """Inverted union of the masks; pass already decoded *masks* to skip decoding the segmentations."""
     height, width = image.shape[:2]
-    fg_mask = np.zeros((height, width), dtype=np.uint8)
 
-    for det in detections:
-        rle = det["segmentation"]
-        if rle is not None:
-            mask = mask_utils.decode(rle).astype(np.uint8)
-            fg_mask = cv2.bitwise_or(fg_mask, mask)
+    if masks is None:
+        masks = getattr(detections, "masks", None)
+    if masks is None:
+        rles = [det["segmentation"] for det in detections if det["segmentation"] is not None]
+        masks = CroppedMasks.from_rles(rles, (height, width))
+    fg_mask = masks.union()
 
     # Invert
     static_scene_mask = cv2.bitwise_not(fg_mask * 255)
     return static_scene_mask
 
 
-def blend_detections(image: np.ndarray, detections: List[Detection], alpha: float = 1.0) -> np.ndarray:
+def blend_detections(
+    image: np.ndarray,
+    detections: Union[DetectionBatch, List[Detection]],
+    alpha: float = 1.0,
+    masks: Optional[CroppedMasks] = None,
+) -> np.ndarray:
+    """
+    Draw masks, boxes and labels; *detections* may be a `DetectionBatch`, `Detection` objects or
+    their `as_dict()` form. *masks*, one per detection, replace decoding their segmentations.
+    """
     overlay = image.copy()
 
-    for i, det in enumerate(detections):
-        x0, y0, x1, y1 = det.xyxy
-        label = det["class_name"]
-        score = det["score"]
-        mask = det["segmentation"]
+    for i, (bbox, label, score, mask) in enumerate(_iter_detections(detections, masks)):
+        x0, y0, x1, y1 = (int(v) for v in bbox)
 
         # Get color
         color = random_color(seed=i)
 
         if mask is not None:
-            mask = mask_utils.decode(mask)
-
-            if mask.shape != image.shape[:2]:
-                raise ValueError(f"Mask shape {mask.shape} does not match image shape {image.shape[:2]}")
+            crop, (mx0, my0, mx1, my1), mask_size = mask
+            if tuple(mask_size) != image.shape[:2]:
+                raise ValueError(f"Mask shape {mask_size} does not match image shape {image.shape[:2]}")
 
-            mask_indices = mask.astype(bool)
+            # Only the pixels under the mask's box are touched
+            region = overlay[my0:my1, mx0:mx1]
+            mask_indices = crop.astype(bool)
             for c in range(3):
-                overlay[:, :, c][mask_indices] = (
-                    overlay[:, :, c][mask_indices] * (1 - alpha) + color[c] * alpha
-                ).astype(np.uint8)
+                region[:, :, c][mask_indices] = (region[:, :, c][mask_indices] * (1 - alpha) + color[c] * alpha).astype(
+                    np.uint8
+                )
 
         # Draw bboxes
         cv2.rectangle(overlay, (x0, y0), (x1, y1), color=color, thickness=2)
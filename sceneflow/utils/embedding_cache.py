@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .logger import logger
+
+
+class EmbeddingCache:
+    """
+    Cache of per-image model embeddings, e.g. the SAM image-encoder output.
+
+    The *max_items* most recently used arrays are kept in memory. With *cache_dir*, every entry is
+    also written as a ``.npy`` file and read back memory-mapped, so re-runs on the same dataset
+    (another detector or threshold, ``remove`` after ``redact``) skip the encoder; the least
+    recently used files are evicted beyond *max_bytes*. Writes are atomic, so several worker
+    processes can share one directory.
+
+    Keys must identify both the image content and the model, see `image_digest`.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_items: int = 8, max_bytes: int = 10 * 1024**3):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._size = sum(p.stat().st_size for p in self.cache_dir.glob("*.npy"))
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npy"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            array = self._memory.get(key)
+            if array is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return array
+
+        array = self._load(key) if self.cache_dir is not None else None
+        with self._lock:
+            if array is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, array)
+        return array
+
+    def put(self, key: str, array: np.ndarray):
+        with self._lock:
+            self._remember(key, array)
+
+        if self.cache_dir is None:
+            return
+
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        size = tmp.stat().st_size
+
+        with self._lock:
+            # Rewriting a key replaces its bytes instead of adding to them
+            try:
+                old_size = path.stat().st_size
+            except OSError:
+                old_size = 0
+            os.replace(tmp, path)
+            self._size += size - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _remember(self, key: str, array: np.ndarray):
+        if self.max_items <= 0:
+            return
+        self._memory[key] = array
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        path = self._path(key)
+        try:
+            array = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        # Mark as recently used
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return array
+
+    def _evict(self):
+        entries = []
+        for p in self.cache_dir.glob("*.npy"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        n_evicted = 0
+        for _, size, p in entries:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+                total -= size
+                n_evicted += 1
+            except OSError:
+                continue
+
+        self._size = total
+        logger.debug(f"Embedding cache evicted {n_evicted} entries ({total / 1024**2:.1f} MB left)")
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def __repr__(self) -> str:
+        return f"EmbeddingCache(dir={self.cache_dir}, memory={len(self)}/{self.max_items}, hits={self.hits})"
@@ -1,11 +1,16 @@
+import hashlib
 import json
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Optional, Tuple
 
 import cv2
 import numpy as np
 
 from .logger import logger
+from .timing import timed
+
+# (RGB image, BGR image, original (H, W), (scale_y, scale_x) back to the original size)
+LoadedImage = Tuple[np.ndarray, np.ndarray, Tuple[int, int], np.ndarray]
 
 
 def get_all_images(input_dir: Path, exts=(".jpg", ".jpeg", ".png")):
@@ -17,7 +22,8 @@ def get_all_images(input_dir: Path, exts=(".jpg", ".jpeg", ".png")):
     return images
 
 
-def load_image(path: Path, resize: Optional[Tuple[int, int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+@timed("load_image")
+def load_image(path: Path, resize: Optional[Tuple[int, int]] = None) -> LoadedImage:
     """Load an image using OpenCV and return it."""
 
     # Read image
@@ -27,6 +33,20 @@ def load_image(path: Path, resize: Optional[Tuple[int, int]] = None) -> Tuple[np
         logger.error(f"Unable to read image: {path}")
         raise FileNotFoundError(path)
 
+    return _prepare_image(img_bgr, resize)
+
+
+@timed("decode_image")
+def decode_image(data: bytes, resize: Optional[Tuple[int, int]] = None) -> LoadedImage:
+    """Decode a PNG/JPEG/... held in memory, same outputs as `load_image`."""
+    img_bgr = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img_bgr is None:
+        raise ValueError(f"Unable to decode image ({len(data)} bytes)")
+
+    return _prepare_image(img_bgr, resize)
+
+
+def _prepare_image(img_bgr: np.ndarray, resize: Optional[Tuple[int, int]] = None) -> LoadedImage:
     img = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
     original_size = img.shape[:2]
 
@@ -41,6 +61,39 @@ def load_image(path: Path, resize: Optional[Tuple[int, int]] = None) -> Tuple[np
     return img, img_bgr, original_size, scale
 
 
+@timed("resize")
+def fit_long_side(image: np.ndarray, max_side: Optional[int]) -> Tuple[np.ndarray, Tuple[float, float]]:
+    """
+    Downscale *image* so that its longest side is at most *max_side* pixels, never upscaling.
+
+    Returns the image and the ``(scale_y, scale_x)`` factors mapping its coordinates back to the input.
+    """
+    height, width = image.shape[:2]
+    if not max_side or max(height, width) <= max_side:
+        return image, (1.0, 1.0)
+
+    factor = max_side / max(height, width)
+    new_h, new_w = max(1, round(height * factor)), max(1, round(width * factor))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    return resized, (height / new_h, width / new_w)
+
+
+def image_digest(image: np.ndarray) -> str:
+    """Content hash of a decoded image, including its shape and dtype."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{image.shape}:{image.dtype}".encode())
+    h.update(np.ascontiguousarray(image).data)
+    return h.hexdigest()
+
+
+def try_load_image(path: Path, resize: Optional[Tuple[int, int]] = None):
+    """Like ``load_image`` but returns a tuple of ``None`` for unreadable files."""
+    try:
+        return load_image(path, resize=resize)
+    except FileNotFoundError:
+        return None, None, None, None
+
+
 def save_image(image: np.ndarray, save_path: Path):
     if image.dtype != np.uint8:
         image = image.astype(np.uint8)
@@ -48,7 +101,10 @@ def save_image(image: np.ndarray, save_path: Path):
     if image.ndim == 2:
         image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
 
-    cv2.imwrite(str(save_path), image)
+    with timed("save_image"):
+        ok = cv2.imwrite(str(save_path), image)
+    if not ok:
+        raise IOError(f"Failed to write image: {save_path}")
 
 
 def save_mask(mask: np.ndarray, save_path: Path):
@@ -60,9 +116,17 @@ def save_mask(mask: np.ndarray, save_path: Path):
 
     # To 255
     if mask.max() == 1 and mask.ndim == 2:
-        mask *= 255
+        mask = mask * 255
+
+    with timed("save_mask"):
+        ok = cv2.imwrite(str(save_path), mask)
+    if not ok:
+        raise IOError(f"Failed to write mask: {save_path}")
+
 
-    cv2.imwrite(str(save_path), mask)
+def save_json(data: Any, save_path: Path):
+    with timed("save_json"), open(save_path, "w") as f:
+        json.dump(data, f, indent=2)
 
 
 def save_annotations(data: dict, save_path: Path):
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pycocotools import mask as mask_utils
+
+from sceneflow.utils.timing import timed
+
+Box = Tuple[int, int, int, int]
+
+
+def occupancy_box(rows: np.ndarray, cols: np.ndarray) -> Box:
+    """``(x0, y0, x1, y1)`` of the set pixels given per-row and per-column occupancy, zeros if empty."""
+    ys, xs = np.flatnonzero(rows), np.flatnonzero(cols)
+    if len(ys) == 0:
+        return (0, 0, 0, 0)
+    return (int(xs[0]), int(ys[0]), int(xs[-1]) + 1, int(ys[-1]) + 1)
+
+
+def _nearest_index(src: int, dst: int) -> np.ndarray:
+    """Source index of every destination pixel, as `cv2.resize` with ``INTER_NEAREST`` computes it."""
+    inv_scale = 1.0 / (dst / src)
+    return np.minimum(np.floor(np.arange(dst) * inv_scale).astype(np.int64), src - 1)
+
+
+def _rle_counts(crop: np.ndarray, box: Box, height: int, width: int) -> List[int]:
+    """Uncompressed COCO RLE counts of *crop* pasted at *box*, without building the full frame."""
+    x0, y0, x1, y1 = box
+    if crop.size == 0:
+        return [height * width]
+
+    # Value changes down each column (COCO RLE is column-major), zero-padded above and below
+    padded = np.zeros((crop.shape[0] + 2, crop.shape[1]), dtype=np.int8)
+    padded[1:-1] = crop != 0
+    cols, rows = np.nonzero(np.diff(padded, axis=0).T)
+    bounds = (x0 + cols) * height + (y0 + rows)
+
+    # A run ending at the bottom of a column and one starting at the top of the next are the same run
+    if len(bounds) > 2:
+        joined = np.flatnonzero(bounds[1:-1:2] == bounds[2::2])
+        if len(joined):
+            bounds = np.delete(bounds, np.concatenate([2 * joined + 1, 2 * joined + 2]))
+
+    counts = np.diff(bounds, prepend=0, append=height * width).tolist()
+    # pycocotools drops the empty background run after a mask touching the last pixel
+    return counts[:-1] if len(counts) > 1 and counts[-1] == 0 else counts
+
+
+class CroppedMasks:
+    """
+    Binary masks of one image, each stored as the crop of its bounding box.
+
+    Mask *i* is ``crops[i]`` (uint8 0/1) pasted at ``boxes[i] = (x0, y0, x1, y1)`` into an empty
+    frame of *size* ``(H, W)``. A few dozen objects on a 4K frame take kilobytes to megabytes
+    instead of hundreds of MB as an ``(N, H, W)`` array.
+
+    Indexing with an int or iterating gives full-frame masks built one at a time, for code that
+    needs them; `union`, `any`, `resize` and `to_rles` only touch the cropped pixels.
+
+    The union is computed once and shared by every consumer of the same instance (camouflage,
+    static-scene mask...), so treat the set as immutable: operations return new instances.
+    """
+
+    __slots__ = ("crops", "boxes", "size", "_union")
+
+    def __init__(self, crops: Sequence[np.ndarray], boxes: Any, size: Tuple[int, int]):
+        self.crops = list(crops)
+        self.boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        self.size = (int(size[0]), int(size[1]))
+        self._union: Optional[np.ndarray] = None
+
+        if len(self.crops) != len(self.boxes):
+            raise ValueError(f"Got {len(self.crops)} crops for {len(self.boxes)} boxes")
+
+    @classmethod
+    def empty(cls, size: Tuple[int, int]) -> "CroppedMasks":
+        return cls([], np.zeros((0, 4)), size)
+
+    @classmethod
+    def from_dense(cls, masks: np.ndarray) -> "CroppedMasks":
+        """Crop an ``(N, H, W)`` or ``(H, W)`` array of masks; any non-zero value is foreground."""
+        masks = np.asarray(masks)
+        if masks.ndim == 2:
+            masks = masks[None]
+        if masks.ndim != 3:
+            raise ValueError(f"Expected masks of shape (H, W) or (N, H, W), got {masks.shape}")
+
+        crops, boxes = [], []
+        for mask, rows, cols in zip(masks, masks.any(axis=2), masks.any(axis=1)):
+            x0, y0, x1, y1 = box = occupancy_box(rows, cols)
+            crops.append((mask[y0:y1, x0:x1] != 0).astype(np.uint8))
+            boxes.append(box)
+        return cls(crops, np.array(boxes).reshape(-1, 4), masks.shape[1:])
+
+    @classmethod
+    def from_rles(cls, rles: Sequence[Dict[str, Any]], size: Optional[Tuple[int, int]] = None) -> "CroppedMasks":
+        """Decode COCO RLEs one at a time, so at most one full frame is alive."""
+        if size is None:
+            if not rles:
+                raise ValueError("The image size is needed to decode an empty list of RLEs")
+            size = tuple(rles[0]["size"])
+
+        crops, boxes = [], []
+        for rle in rles:
+            x, y, w, h = (int(v) for v in mask_utils.toBbox(rle))
+            crops.append(np.ascontiguousarray(mask_utils.decode(rle)[y : y + h, x : x + w]))
+            boxes.append((x, y, x + w, y + h))
+        return cls(crops, np.array(boxes).reshape(-1, 4), size)
+
+    @classmethod
+    def concat(cls, masks: Sequence["CroppedMasks"]) -> "CroppedMasks":
+        """Masks of several sets of the same image, in order."""
+        if not masks:
+            raise ValueError("Cannot concatenate an empty list of mask sets")
+        sizes = {m.size for m in masks}
+        if len(sizes) > 1:
+            raise ValueError(f"Cannot concatenate masks of different image sizes {sorted(sizes)}")
+        return cls([c for m in masks for c in m.crops], np.concatenate([m.boxes for m in masks]), masks[0].size)
+
+    # Whole-set operations
+
+    def any(self) -> bool:
+        return any(crop.any() for crop in self.crops)
+
+    def extent(self) -> Box:
+        """Bounding box ``(x0, y0, x1, y1)`` of all masks together, zeros when they are all empty."""
+        boxes = self.boxes[(self.boxes[:, 2] > self.boxes[:, 0]) & (self.boxes[:, 3] > self.boxes[:, 1])]
+        if len(boxes) == 0:
+            return (0, 0, 0, 0)
+        return (int(boxes[:, 0].min()), int(boxes[:, 1].min()), int(boxes[:, 2].max()), int(boxes[:, 3].max()))
+
+    def union(self, region: Optional[Box] = None) -> np.ndarray:
+        """
+        OR of all masks as one read-only ``(H, W)`` uint8 0/1 frame, or a view of its *region*
+        ``(x0, y0, x1, y1)``. Built on first call and reused afterwards.
+        """
+        if self._union is None:
+            union = np.zeros(self.size, dtype=np.uint8)
+            for i in range(len(self)):
+                self.paste(i, union)
+            union.flags.writeable = False
+            self._union = union
+
+        if region is None:
+            return self._union
+        x0, y0, x1, y1 = region
+        return self._union[y0:y1, x0:x1]
+
+    def paste(self, index: int, out: np.ndarray) -> np.ndarray:
+        """OR mask *index* into the ``(H, W)`` array *out*, in place."""
+        x0, y0, x1, y1 = self.boxes[index]
+        if x1 > x0 and y1 > y0:
+            region = out[y0:y1, x0:x1]
+            np.bitwise_or(region, self.crops[index], out=region)
+        return out
+
+    def resize(self, size: Tuple[int, int]) -> "CroppedMasks":
+        """
+        Same masks for the image resized to *size* ``(H, W)``, pixel for pixel what `cv2.resize` with
+        ``INTER_NEAREST`` gives on the full frames.
+        """
+        size = (int(size[0]), int(size[1]))
+        if size == self.size:
+            return self
+
+        src_y, src_x = _nearest_index(self.size[0], size[0]), _nearest_index(self.size[1], size[1])
+        crops, boxes = [], []
+        for crop, (x0, y0, x1, y1) in zip(self.crops, self.boxes):
+            X0, X1 = np.searchsorted(src_x, [x0, x1])
+            Y0, Y1 = np.searchsorted(src_y, [y0, y1])
+            if X1 <= X0 or Y1 <= Y0:
+                crops.append(np.zeros((0, 0), dtype=np.uint8))
+                boxes.append((0, 0, 0, 0))
+                continue
+            crops.append(crop[np.ix_(src_y[Y0:Y1] - y0, src_x[X0:X1] - x0)])
+            boxes.append((X0, Y0, X1, Y1))
+        return CroppedMasks(crops, np.array(boxes).reshape(-1, 4), size)
+
+    def translate(self, offset: Tuple[int, int], size: Tuple[int, int]) -> "CroppedMasks":
+        """Same masks moved by ``(dx, dy)`` into a frame of *size* ``(H, W)``, e.g. from a tile to the image."""
+        dx, dy = offset
+        boxes = self.boxes.copy()
+        boxes[(boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])] += np.array([dx, dy, dx, dy])
+        return CroppedMasks(self.crops, boxes, size)
+
+    @timed("to_rle")
+    def to_rles(self) -> List[Dict[str, Any]]:
+        """COCO RLE per mask with ``counts`` as str, computed from the crops alone."""
+        height, width = self.size
+        rles = []
+        for crop, box in zip(self.crops, self.boxes.tolist()):
+            rle = mask_utils.frPyObjects(
+                {"size": [height, width], "counts": _rle_counts(crop, box, height, width)}, height, width
+            )
+            rle["counts"] = rle["counts"].decode("utf-8")
+            rles.append(rle)
+        return rles
+
+    def to_dense(self) -> np.ndarray:
+        """All masks as one ``(N, H, W)`` uint8 array."""
+        out = np.zeros((len(self), *self.size), dtype=np.uint8)
+        for i in range(len(self)):
+            self.paste(i, out[i])
+        return out
+
+    def select(self, index: Any) -> "CroppedMasks":
+        """Subset for an index array, boolean mask or slice."""
+        idx = np.arange(len(self))[index]
+        return CroppedMasks([self.crops[i] for i in idx], self.boxes[idx], self.size)
+
+    # Sequence of full-frame masks
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return (len(self), *self.size)
+
+    def __len__(self) -> int:
+        return len(self.crops)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index: Any) -> Any:
+        if not isinstance(index, (int, np.integer)):
+            return self.select(index)
+        return self.paste(index, np.zeros(self.size, dtype=np.uint8))
+
+    def __repr__(self) -> str:
+        nbytes = sum(crop.nbytes for crop in self.crops)
+        return f"CroppedMasks(n={len(self)}, size={self.size}, crop_bytes={nbytes})"
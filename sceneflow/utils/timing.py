@@ -0,0 +1,133 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Dict, Iterator, Optional, Tuple
+
+# Histogram buckets grow by 2^(1/8) (~9%) from 1 µs, which bounds the percentile error
+_MIN_SEC = 1e-6
+_GROWTH = 2 ** (1 / 8)
+_LOG_GROWTH = math.log(_GROWTH)
+
+
+class LatencyStats:
+    """
+    Constant-memory latency summary: count, total, max and a log-bucketed histogram.
+
+    Percentiles are read from the histogram, so recording costs O(1) whatever the run length and
+    stats from several threads or processes merge by adding bucket counts.
+    """
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, sec: float):
+        self.count += 1
+        self.total += sec
+        self.max = max(self.max, sec)
+        idx = int(math.log(sec / _MIN_SEC) / _LOG_GROWTH) if sec > _MIN_SEC else 0
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+
+    def merge(self, other: "LatencyStats"):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        for idx, n in other.buckets.items():
+            self.buckets[idx] = self.buckets.get(idx, 0) + n
+
+    def percentile(self, q: float) -> float:
+        """Approximate *q*-th percentile in seconds (upper edge of the matching bucket)."""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                return min(self.max, _MIN_SEC * _GROWTH ** (idx + 1))
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        ms = 1000.0
+        return {
+            "count": self.count,
+            "total_sec": round(self.total, 3),
+            "mean_ms": round(self.total / max(1, self.count) * ms, 3),
+            "p50_ms": round(self.percentile(50) * ms, 3),
+            "p95_ms": round(self.percentile(95) * ms, 3),
+            "p99_ms": round(self.percentile(99) * ms, 3),
+            "max_ms": round(self.max * ms, 3),
+        }
+
+    def __getstate__(self):
+        return self.count, self.total, self.max, self.buckets
+
+    def __setstate__(self, state):
+        self.count, self.total, self.max, self.buckets = state
+
+
+class Timings:
+    """
+    Thread-safe collector of `LatencyStats` keyed by ``(group, name)``.
+
+    Groups used across sceneflow are ``"stages"`` (pipeline stages), ``"ops"`` (image loading,
+    NMS, SAM, RLE encoding, camouflage, saves, ...) and ``"models"`` (one entry per runner).
+
+    A profiler can set `span` to a ``(group, name) -> context manager`` factory to also see every
+    `timed` block as a trace span.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], LatencyStats] = {}
+        self.span: Optional[Callable[[str, str], ContextManager]] = None
+
+    def record(self, group: str, name: str, sec: float):
+        with self._lock:
+            stats = self._stats.get((group, name))
+            if stats is None:
+                stats = self._stats[(group, name)] = LatencyStats()
+            stats.add(sec)
+
+    @contextmanager
+    def timed(self, name: str, group: str = "ops") -> Iterator[None]:
+        span = self.span
+        t0 = time.perf_counter()
+        try:
+            if span is None:
+                yield
+            else:
+                with span(group, name):
+                    yield
+        finally:
+            self.record(group, name, time.perf_counter() - t0)
+
+    def merge(self, stats: Dict[Tuple[str, str], LatencyStats]):
+        with self._lock:
+            for key, other in stats.items():
+                if key not in self._stats:
+                    self._stats[key] = LatencyStats()
+                self._stats[key].merge(other)
+
+    def drain(self) -> Dict[Tuple[str, str], LatencyStats]:
+        """Return everything recorded so far and start over, e.g. to ship it to another process."""
+        with self._lock:
+            stats, self._stats = self._stats, {}
+        return stats
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            out: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (group, name), stats in sorted(self._stats.items()):
+                out.setdefault(group, {})[name] = stats.as_dict()
+        return out
+
+
+# Process-wide collector, cheap enough to leave on
+TIMINGS = Timings()
+timed = TIMINGS.timed
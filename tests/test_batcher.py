@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from sceneflow.pipelines._batcher import MicroBatcher, Overloaded
+
+
+def _double(key, items):
+    return [2 * x for x in items]
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+
+    def fn(key, items):
+        calls.append(list(items))
+        return _double(key, items)
+
+    batcher = MicroBatcher(fn, max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(10)]
+    assert [f.result(5) for f in futures] == [2 * i for i in range(10)]
+    batcher.close()
+
+    assert [len(c) for c in calls] == [4, 4, 2]
+    assert batcher.stats()["batch_sizes"] == {"2": 1, "4": 2}
+
+
+def test_lone_request_waits_at_most_max_wait():
+    batcher = MicroBatcher(_double, max_batch_size=8, max_wait_ms=50)
+    t0 = time.perf_counter()
+    assert batcher(21, timeout=5) == 42
+    elapsed = time.perf_counter() - t0
+    batcher.close()
+    assert 0.04 <= elapsed < 1.0
+
+
+def test_keys_are_never_mixed():
+    calls = []
+
+    def fn(key, items):
+        calls.append((key, list(items)))
+        return [(key, x) for x in items]
+
+    batcher = MicroBatcher(fn, max_batch_size=8, max_wait_ms=50)
+    futures = [batcher.submit(i, key=i % 2) for i in range(6)]
+    assert [f.result(5) for f in futures] == [(i % 2, i) for i in range(6)]
+    batcher.close()
+    assert all(all(x % 2 == key for x in items) for key, items in calls)
+
+
+def test_full_queue_raises_overloaded():
+    release = threading.Event()
+
+    def fn(key, items):
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(fn, max_batch_size=1, max_wait_ms=0, max_queue=2)
+    busy = batcher.submit("busy")
+    # Wait for the worker to take the first request off the queue
+    while batcher.depth:
+        time.sleep(0.001)
+
+    waiting = [batcher.submit(i) for i in range(2)]
+    with pytest.raises(Overloaded):
+        batcher.submit("one too many")
+    assert batcher.stats()["rejected"] == 1
+
+    release.set()
+    assert busy.result(5) == "busy"
+    assert [f.result(5) for f in waiting] == [0, 1]
+    batcher.close()
+
+
+def test_error_reaches_every_request_of_the_batch():
+    def fn(key, items):
+        raise ValueError("bad batch")
+
+    batcher = MicroBatcher(fn, max_batch_size=4, max_wait_ms=100)
+    futures = [batcher.submit(i) for i in range(4)]
+    for future in futures:
+        with pytest.raises(ValueError, match="bad batch"):
+            future.result(5)
+
+    # The worker survives the error
+    batcher.fn = _double
+    assert batcher(1, timeout=5) == 2
+    batcher.close()
+
+
+def test_wrong_number_of_results_is_an_error():
+    batcher = MicroBatcher(lambda key, items: items[:1], max_batch_size=2, max_wait_ms=100)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="returned 1 results for 2 items"):
+            future.result(5)
+    batcher.close()
+
+
+def test_close_finishes_queued_requests():
+    batcher = MicroBatcher(_double, max_batch_size=2, max_wait_ms=1000, workers=2)
+    futures = [batcher.submit(i) for i in range(5)]
+    batcher.close()
+    assert [f.result(0) for f in futures] == [0, 2, 4, 6, 8]
+
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.submit(0)
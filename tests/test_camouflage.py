@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from sceneflow.core.camouflage import AVAILABLE_CAMOUFLAGE_METHODS, Camouflage
+from sceneflow.utils.masks import CroppedMasks
+
+
+def _scene(size=(120, 160), seed=0):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, (*size, 3), dtype=np.uint8)
+    masks = np.zeros((3, *size), dtype=np.uint8)
+    masks[0, 10:40, 20:70] = 1
+    masks[1, 60:110, 100:150] = 1
+    masks[2, 30:50, 60:90] = 1
+    return image, masks
+
+
+@pytest.mark.parametrize("method", sorted(set(AVAILABLE_CAMOUFLAGE_METHODS) - {"noise"}))
+def test_cropped_masks_match_dense_masks(method):
+    image, masks = _scene()
+    camouflage = Camouflage(method)
+    np.testing.assert_array_equal(
+        camouflage.hide(image, CroppedMasks.from_dense(masks)), camouflage.hide(image, list(masks))
+    )
+
+
+@pytest.mark.parametrize("method", sorted(AVAILABLE_CAMOUFLAGE_METHODS))
+def test_hide_leaves_the_input_untouched(method):
+    image, masks = _scene()
+    original = image.copy()
+    out = Camouflage(method).hide(image, CroppedMasks.from_dense(masks))
+    np.testing.assert_array_equal(image, original)
+    assert out is not image and not np.array_equal(out, image)
+
+
+@pytest.mark.parametrize("method", sorted(AVAILABLE_CAMOUFLAGE_METHODS))
+def test_no_masks_returns_the_image(method):
+    image, _ = _scene()
+    out = Camouflage(method).hide(image, CroppedMasks.empty(image.shape[:2]))
+    np.testing.assert_array_equal(out, image)
+
+    with pytest.raises(ValueError, match="No masks provided"):
+        Camouflage(method).hide(image, [])
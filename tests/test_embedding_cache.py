@@ -0,0 +1,39 @@
+import numpy as np
+
+from sceneflow.utils.embedding_cache import EmbeddingCache
+
+
+def _size_on_disk(cache):
+    return sum(p.stat().st_size for p in cache.cache_dir.glob("*.npy"))
+
+
+def test_put_then_get_from_disk(tmp_path):
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    EmbeddingCache(tmp_path).put("sam_b-abc", array)
+
+    cache = EmbeddingCache(tmp_path)
+    assert np.array_equal(cache.get("sam_b-abc"), array)
+    assert cache.get("sam_b-def") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_rewriting_a_key_counts_it_once(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    for _ in range(5):
+        cache.put("sam_b-abc", np.zeros((4, 4), dtype=np.float32))
+    assert cache._size == _size_on_disk(cache)
+
+    cache.put("sam_b-def", np.zeros((8, 8), dtype=np.float32))
+    assert cache._size == _size_on_disk(cache)
+    assert EmbeddingCache(tmp_path)._size == cache._size
+
+
+def test_rewrites_do_not_evict(tmp_path):
+    array = np.zeros((16, 16), dtype=np.float32)
+    cache = EmbeddingCache(tmp_path, max_items=0)
+    cache.put("sam_b-abc", array)
+    cache.max_bytes = 2 * _size_on_disk(cache)
+    cache.put("sam_b-def", array)
+    for _ in range(5):
+        cache.put("sam_b-def", array)
+    assert cache.get("sam_b-abc") is not None
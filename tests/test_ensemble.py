@@ -0,0 +1,47 @@
+import threading
+import time
+
+import pytest
+
+from sceneflow.core._ensemble import Ensemble
+
+
+class _Runner:
+    def __init__(self, name, delay=0.0):
+        self.model_name = name
+        self.delay = delay
+
+
+def test_results_come_back_in_runner_order():
+    runners = [_Runner("a", 0.05), _Runner("b", 0.0), _Runner("c", 0.02)]
+    for concurrent in (False, True):
+        ensemble = Ensemble(runners, concurrent=concurrent)
+        assert ensemble.map(lambda r: (time.sleep(r.delay), r.model_name)[1]) == ["a", "b", "c"]
+        ensemble.close()
+
+
+def test_concurrent_runners_run_side_by_side():
+    barrier = threading.Barrier(3, timeout=5)
+    ensemble = Ensemble([_Runner(name) for name in "abc"], concurrent=True)
+    # Would time out if the runners ran one after the other
+    assert ensemble.map(lambda r: barrier.wait() is not None) == [True] * 3
+    ensemble.close()
+
+
+def test_concurrent_runners_split_torch_threads():
+    torch = pytest.importorskip("torch")
+    default = torch.get_num_threads()
+    torch.set_num_threads(6)
+    try:
+        ensemble = Ensemble([_Runner(name) for name in "abc"], concurrent=True)
+        assert ensemble.map(lambda r: torch.get_num_threads()) == [2, 2, 2]
+        ensemble.close()
+
+        # Threads outside the ensemble keep the default
+        counts = []
+        thread = threading.Thread(target=lambda: counts.append((torch.ones(2).sum(), torch.get_num_threads())[1]))
+        thread.start()
+        thread.join()
+        assert counts == [6] and torch.get_num_threads() == 6
+    finally:
+        torch.set_num_threads(default)
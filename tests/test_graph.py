@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+
+import pytest
+
+from sceneflow.pipelines._common import PipelineStage, iter_records
+from sceneflow.pipelines._graph import Stage, StageGraph
+
+
+def _jitter(x):
+    time.sleep(random.uniform(0, 0.005))
+    return x
+
+
+def test_ordered_keeps_input_order():
+    graph = StageGraph([Stage("a", _jitter, workers=4), Stage("b", lambda x: x * 2, workers=3)], ordered=True)
+    assert list(graph.run(range(50))) == [2 * i for i in range(50)]
+
+
+def test_unordered_yields_every_item():
+    graph = StageGraph([Stage("a", _jitter, workers=4)], ordered=False)
+    assert sorted(graph.run(range(50))) == list(range(50))
+
+
+def test_stage_error_is_reraised():
+    def fail(x):
+        if x == 7:
+            raise KeyError(x)
+        return x
+
+    graph = StageGraph([Stage("a", fail, workers=2), Stage("b", _jitter)])
+    with pytest.raises(KeyError):
+        list(graph.run(range(100)))
+
+
+def test_source_error_is_reraised():
+    def items():
+        yield 1
+        raise OSError("disk gone")
+
+    with pytest.raises(OSError, match="disk gone"):
+        list(StageGraph([Stage("a", _jitter)]).run(items()))
+
+
+def test_needs_a_stage():
+    with pytest.raises(ValueError):
+        StageGraph([])
+
+
+class _Model:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _pipeline(tmp_path, n, fn=None):
+    state = {}
+
+    def setup(cfg):
+        state.update(model=_Model(), replicas=cfg["replicas"])
+        return state
+
+    def stage(state, items):
+        for it in items:
+            if fn is not None:
+                fn(it)
+            it["record"]["counts"] = {"x": 1}
+
+    paths = [tmp_path / f"{i}.jpg" for i in range(n)]
+    return state, setup, [PipelineStage("detect", stage, models=True)], paths
+
+
+def test_iter_records_asks_setup_for_replicas(tmp_path):
+    state, setup, stages, paths = _pipeline(tmp_path, 2)
+    list(iter_records(paths, setup, stages, {}, stage_workers={"detect": 3}))
+    assert state["replicas"] == 3
+
+    list(iter_records(paths, setup, stages, {}, stage_workers={"load": 4}))
+    assert state["replicas"] == 1
+
+
+def test_iter_records_rejects_unknown_stage(tmp_path):
+    _, setup, stages, paths = _pipeline(tmp_path, 1)
+    with pytest.raises(ValueError, match="Unknown stage"):
+        list(iter_records(paths, setup, stages, {}, stage_workers={"segment": 2}))
+
+
+def test_iter_records_closes_state_on_error(tmp_path, monkeypatch):
+    # Every image loads, so that the stage runs on them
+    monkeypatch.setattr("sceneflow.pipelines._common.try_load_image", lambda path, resize: ("img",))
+
+    def fail(item):
+        raise RuntimeError("model crashed")
+
+    state, setup, stages, paths = _pipeline(tmp_path, 3, fn=fail)
+    with pytest.raises(RuntimeError, match="model crashed"):
+        list(iter_records(paths, setup, stages, {}))
+    assert state["model"].closed
+
+
+def test_iter_records_closes_state_when_stopped_early(tmp_path, monkeypatch):
+    monkeypatch.setattr("sceneflow.pipelines._common.try_load_image", lambda path, resize: ("img",))
+
+    state, setup, stages, paths = _pipeline(tmp_path, 10)
+    records = iter_records(paths, setup, stages, {})
+    assert next(records)["counts"] == {"x": 1}
+    assert not state["model"].closed
+    records.close()
+    assert state["model"].closed
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_iter_records_decodes_inline_without_prefetch(tmp_path, monkeypatch, prefetch):
+    threads = {"load": set(), "detect": set()}
+
+    def load(path, resize):
+        threads["load"].add(threading.current_thread().name)
+        return ("img",)
+
+    monkeypatch.setattr("sceneflow.pipelines._common.try_load_image", load)
+    _, setup, stages, paths = _pipeline(
+        tmp_path, 4, fn=lambda it: threads["detect"].add(threading.current_thread().name)
+    )
+    records = list(iter_records(paths, setup, stages, {}, prefetch=prefetch))
+
+    assert len(records) == 4
+    assert (threads["load"] == threads["detect"]) == (prefetch == 0)
+
+
+def test_iter_records_runs_stages_without_threads_inline(tmp_path, monkeypatch):
+    monkeypatch.setattr("sceneflow.pipelines._common.try_load_image", lambda path, resize: ("img",))
+    threads = {"detect": set(), "save": set()}
+
+    def stage(name):
+        def fn(state, items):
+            threads[name].add(threading.current_thread().name)
+
+        return fn
+
+    stages = [PipelineStage("detect", stage("detect"), workers=2), PipelineStage("save", stage("save"), workers=0)]
+    paths = [tmp_path / f"{i}.jpg" for i in range(6)]
+    assert len(list(iter_records(paths, lambda cfg: {}, stages, {}))) == 6
+    assert threads["save"] and threads["save"] <= threads["detect"]
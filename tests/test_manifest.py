@@ -0,0 +1,116 @@
+import os
+
+import cv2
+import numpy as np
+
+from sceneflow.pipelines._common import PipelineStage, run_pipeline
+from sceneflow.pipelines._manifest import RunManifest, file_stamp, run_fingerprint
+
+
+def _image(path, value=0):
+    cv2.imwrite(str(path), np.full((8, 8, 3), value, dtype=np.uint8))
+    return path
+
+
+def test_lookup_after_commit(tmp_path):
+    path = _image(tmp_path / "a.png")
+    with RunManifest(tmp_path / "manifest.sqlite", "fp") as manifest:
+        assert manifest.lookup(path) is None
+        manifest.commit(path, {"status": "ok", "counts": {"person": 2}})
+        assert manifest.lookup(path) == {"status": "ok", "counts": {"person": 2}}
+
+
+def test_lookup_survives_reopening(tmp_path):
+    path = _image(tmp_path / "a.png")
+    with RunManifest(tmp_path / "manifest.sqlite", "fp") as manifest:
+        manifest.commit(path, {"status": "empty"})
+    with RunManifest(tmp_path / "manifest.sqlite", "fp") as manifest:
+        assert manifest.lookup(path) == {"status": "empty"}
+
+
+def test_lookup_needs_the_same_fingerprint(tmp_path):
+    path = _image(tmp_path / "a.png")
+    with RunManifest(tmp_path / "manifest.sqlite", "fp") as manifest:
+        manifest.commit(path, {"status": "ok"})
+    with RunManifest(tmp_path / "manifest.sqlite", "other") as manifest:
+        assert manifest.lookup(path) is None
+
+
+def test_lookup_ignores_unfinished_images(tmp_path):
+    path = _image(tmp_path / "a.png")
+    with RunManifest(tmp_path / "manifest.sqlite", "fp") as manifest:
+        manifest.commit(path, {"status": "skipped"})
+        assert manifest.lookup(path) is None
+
+
+def test_lookup_detects_changed_content(tmp_path):
+    path = _image(tmp_path / "a.png")
+    with RunManifest(tmp_path / "manifest.sqlite", "fp") as manifest:
+        manifest.commit(path, {"status": "ok"})
+        # Same size, different pixels and mtime
+        _image(path, value=255)
+        st = path.stat()
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+        assert manifest.lookup(path) is None
+
+
+def test_lookup_accepts_touched_but_unchanged_file(tmp_path):
+    path = _image(tmp_path / "a.png")
+    with RunManifest(tmp_path / "manifest.sqlite", "fp") as manifest:
+        manifest.commit(path, {"status": "ok"})
+        st = path.stat()
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+        assert manifest.lookup(path) == {"status": "ok"}
+
+
+def test_commit_uses_the_stamp_taken_at_load(tmp_path):
+    path = _image(tmp_path / "a.png")
+    stamp = file_stamp(path)
+    with RunManifest(tmp_path / "manifest.sqlite", "fp") as manifest:
+        # Changed after it was read: the stored stamp still describes the processed content
+        _image(path, value=255)
+        os.utime(path, (stamp[0] + 10, stamp[0] + 10))
+        manifest.commit(path, {"status": "ok"}, stamp=stamp)
+        assert manifest.lookup(path) is None
+
+        manifest.commit(path, {"status": "ok"})
+        assert manifest.lookup(path) == {"status": "ok"}
+
+
+def test_fingerprint_ignores_paths_and_device():
+    cfg = {"det_thd": 0.4, "input_dir": "a", "output_dir": "b", "device": "cpu", "cache_dir": None}
+    assert run_fingerprint("redact", cfg) == run_fingerprint("redact", {**cfg, "output_dir": "c", "device": "cuda"})
+    # Moving or resizing the mask cache does not change the outputs
+    assert run_fingerprint("redact", cfg) == run_fingerprint("redact", {**cfg, "cache_dir": "d", "cache_max_gb": 1})
+    assert run_fingerprint("redact", cfg) != run_fingerprint("redact", {**cfg, "det_thd": 0.5})
+    assert run_fingerprint("redact", cfg) != run_fingerprint("masks", cfg)
+
+
+def test_run_pipeline_resumes(tmp_path):
+    paths = [_image(tmp_path / f"{i}.png", value=i) for i in range(4)]
+    calls = []
+
+    def stage(state, items):
+        for it in items:
+            calls.append(it["path"])
+            it["record"]["counts"] = {"person": 1}
+
+    def run(resume):
+        return run_pipeline(
+            paths,
+            lambda cfg: {},
+            [PipelineStage("detect", stage)],
+            {"output_dir": str(tmp_path / "out")},
+            name="test",
+            resume=resume,
+        )
+
+    stats = run(resume=False)
+    assert (stats.n_processed, stats.n_resumed, len(calls)) == (4, 0, 4)
+
+    # Only the changed image is processed again
+    _image(paths[2], value=200)
+    stats = run(resume=True)
+    assert (stats.n_processed, stats.n_resumed, len(calls)) == (1, 3, 5)
+    assert calls[-1] == paths[2]
+    assert stats.per_class["person"] == 4
@@ -0,0 +1,35 @@
+from sceneflow.core.mask_cache import MaskCache, cache_key
+from sceneflow.runners._helpers import DetectionBatch
+
+
+def _size_on_disk(cache):
+    return sum(p.stat().st_size for p in cache.cache_dir.glob("*.json"))
+
+
+def test_put_then_get(tmp_path):
+    cache = MaskCache(tmp_path)
+    key = cache_key("abc", {"conf": 0.25})
+    assert cache.get(key) is None
+    cache.put(key, DetectionBatch(), (4, 6))
+
+    detections, masks, _ = cache.get(key)
+    assert len(detections) == 0 and masks.size == (4, 6)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_rewriting_a_key_counts_it_once(tmp_path):
+    cache = MaskCache(tmp_path)
+    key = cache_key("abc", {"conf": 0.25})
+    for _ in range(5):
+        cache.put(key, DetectionBatch(), (4, 6))
+    assert cache._size == _size_on_disk(cache)
+
+    cache.put(cache_key("def", {}), DetectionBatch(), (8, 8))
+    assert cache._size == _size_on_disk(cache)
+    assert MaskCache(tmp_path)._size == cache._size
+
+
+def test_cache_key_depends_on_params():
+    assert cache_key("abc", {"conf": 0.25, "nms": 0.5}) == cache_key("abc", {"nms": 0.5, "conf": 0.25})
+    assert cache_key("abc", {"conf": 0.25}) != cache_key("abc", {"conf": 0.3})
+    assert cache_key("abc", {}) != cache_key("abd", {})
@@ -0,0 +1,35 @@
+import numpy as np
+
+from benchmarks.fakes import make_detections, register_fakes
+from sceneflow.core.mask_generator import MaskGenerator
+from sceneflow.utils.embedding_cache import EmbeddingCache
+
+register_fakes()
+
+
+def _generator(embedding_cache):
+    return MaskGenerator.from_pretrained(["fake_detector"], [], "fake_segmentor", embedding_cache=embedding_cache)
+
+
+def test_embedding_caches_share_the_segmentor(tmp_path, monkeypatch):
+    first = _generator(EmbeddingCache(tmp_path / "a"))
+    second = _generator(EmbeddingCache(tmp_path / "b"))
+    try:
+        # The cache is not part of the model key: one segmentor for both generators
+        assert first.segmentor is second.segmentor
+
+        seen = []
+        run = first.segmentor.run
+
+        def recording_run(image, detections, embedding_cache=None, **kwargs):
+            seen.append(embedding_cache)
+            return run(image, detections, **kwargs)
+
+        monkeypatch.setattr(first.segmentor, "run", recording_run)
+        image = np.zeros((64, 96, 3), dtype=np.uint8)
+        for generator in (first, second):
+            generator._segment(image, make_detections(image.shape[:2], 2, with_rle=False))
+        assert seen == [first.embedding_cache, second.embedding_cache]
+    finally:
+        first.close()
+        second.close()
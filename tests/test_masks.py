@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+import pytest
+from pycocotools import mask as mask_utils
+
+from sceneflow.core.camouflage import combine_masks
+from sceneflow.utils.masks import CroppedMasks
+
+
+def _dense_masks(size=(37, 53), n=12, seed=0):
+    rng = np.random.default_rng(seed)
+    height, width = size
+    masks = np.zeros((n, height, width), dtype=np.uint8)
+    for mask in masks[:-4]:
+        x0, y0 = rng.integers(0, width), rng.integers(0, height)
+        x1, y1 = rng.integers(x0, width + 1), rng.integers(y0, height + 1)
+        # Holes make several runs per column
+        mask[y0:y1, x0:x1] = rng.random((y1 - y0, x1 - x0)) > 0.3
+    # Edge cases: the last pixel, the first pixel, a full frame and an empty mask
+    masks[-4, -3:, -2:] = 1
+    masks[-3, 0, 0] = 1
+    masks[-2] = 1
+    return masks
+
+
+@pytest.fixture(params=[0, 1, 2])
+def dense(request):
+    return _dense_masks(seed=request.param)
+
+
+def test_to_dense_round_trip(dense):
+    np.testing.assert_array_equal(CroppedMasks.from_dense(dense).to_dense(), dense)
+
+
+def test_to_rles_matches_pycocotools(dense):
+    expected = mask_utils.encode(np.asfortranarray(dense.transpose(1, 2, 0)))
+    rles = CroppedMasks.from_dense(dense).to_rles()
+    assert len(rles) == len(expected)
+    for rle, ref in zip(rles, expected):
+        assert rle["size"] == list(ref["size"])
+        assert rle["counts"] == ref["counts"].decode("utf-8")
+
+
+def test_from_rles_round_trip(dense):
+    masks = CroppedMasks.from_dense(dense)
+    decoded = CroppedMasks.from_rles(masks.to_rles())
+    assert decoded.size == masks.size
+    np.testing.assert_array_equal(decoded.to_dense(), dense)
+
+
+def test_union_matches_combine_masks(dense):
+    masks = CroppedMasks.from_dense(dense)
+    np.testing.assert_array_equal(masks.union(), combine_masks(list(dense)))
+    np.testing.assert_array_equal(masks.union((5, 3, 20, 30)), combine_masks(list(dense))[3:30, 5:20])
+    assert not masks.union().flags.writeable
+
+
+@pytest.mark.parametrize("size", [(74, 106), (18, 26), (37, 80), (100, 13)])
+def test_resize_matches_cv2(dense, size):
+    resized = CroppedMasks.from_dense(dense).resize(size)
+    assert resized.size == size
+    for mask, ref in zip(resized, dense):
+        np.testing.assert_array_equal(mask, cv2.resize(ref, size[::-1], interpolation=cv2.INTER_NEAREST))
+
+
+def test_empty_set():
+    masks = CroppedMasks.empty((4, 5))
+    assert len(masks) == 0 and not masks.any()
+    assert masks.to_dense().shape == (0, 4, 5)
+    assert masks.union().shape == (4, 5) and not masks.union().any()
+    assert masks.extent() == (0, 0, 0, 0)
+
+
+def test_concat_and_select(dense):
+    masks = CroppedMasks.from_dense(dense)
+    both = CroppedMasks.concat([masks.select(slice(0, 5)), masks.select(slice(5, None))])
+    np.testing.assert_array_equal(both.to_dense(), dense)
+    np.testing.assert_array_equal(masks[np.array([2, 0])].to_dense(), dense[[2, 0]])
+
+    with pytest.raises(ValueError):
+        CroppedMasks.concat([masks, CroppedMasks.empty((1, 1))])
@@ -0,0 +1,203 @@
+import threading
+import time
+
+import pytest
+
+from sceneflow.runners._cache import ModelCache, cache_key
+
+
+class _Runner:
+    def replicate(self):
+        return _Runner()
+
+
+class _Builder:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return _Runner()
+
+
+KEY = cache_key("detectors", "yolo", "cpu", {"conf": 0.25})
+
+
+def test_same_key_builds_once():
+    cache, build = ModelCache(), _Builder()
+    first = cache.acquire(KEY, build)
+    assert cache.acquire(KEY, build) is first
+    assert build.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache._entries[KEY].refs == 2
+
+
+def test_other_keys_build_their_own():
+    cache, build = ModelCache(), _Builder()
+    other = cache_key("detectors", "yolo", "cuda", {"conf": 0.25})
+    assert cache.acquire(KEY, build) is not cache.acquire(other, build)
+    assert build.calls == 2
+
+
+def test_release():
+    cache = ModelCache()
+    runner = cache.acquire(KEY, _Builder())
+    assert cache.release(runner)
+    assert cache._entries[KEY].refs == 0
+    # Released runners stay loaded for the next caller
+    assert cache.keys() == [KEY]
+    assert not cache.release(_Runner())
+
+
+def test_zero_budget_unloads_on_release(monkeypatch):
+    monkeypatch.setattr("sceneflow.runners._cache.runner_nbytes", lambda runner: 100)
+    cache = ModelCache(max_bytes=0)
+    runner = cache.acquire(KEY, _Builder())
+    cache.acquire(KEY, _Builder())
+
+    # Referenced runners are never unloaded, even over budget
+    cache.release(runner)
+    assert cache.keys() == [KEY]
+    cache.release(runner)
+    assert cache.keys() == []
+
+
+def test_least_recently_used_idle_runner_goes_first(monkeypatch):
+    monkeypatch.setattr("sceneflow.runners._cache.runner_nbytes", lambda runner: 100)
+    cache = ModelCache(max_bytes=250)
+    keys = [cache_key("detectors", name) for name in ("a", "b", "c")]
+    runners = [cache.acquire(key, _Builder()) for key in keys[:2]]
+    for runner in runners[::-1]:
+        cache.release(runner)
+
+    # "b" was released first, so it is the one unloaded to make room for "c"
+    cache.acquire(keys[2], _Builder())
+    assert cache.keys() == [keys[0], keys[2]]
+    assert cache.nbytes == 200
+
+
+def test_evict():
+    cache = ModelCache()
+    busy = cache.acquire(cache_key("detectors", "a"), _Builder())
+    idle = cache.acquire(cache_key("segmentors", "b"), _Builder())
+    cache.release(idle)
+    cache.release(cache.acquire(cache_key("detectors", "c"), _Builder()))
+
+    assert cache.evict(lambda key: key[0] == "segmentors") == 1
+    assert cache.evict() == 1
+    assert cache.keys() == [cache_key("detectors", "a")]
+    assert busy is cache.acquire(cache_key("detectors", "a"), _Builder())
+
+
+def test_holders_share_one_pool(monkeypatch):
+    monkeypatch.setattr("sceneflow.runners._cache.runner_nbytes", lambda *runners: 100 * len(runners))
+    cache = ModelCache()
+    runner = cache.acquire(KEY, _Builder())
+    first = cache.pool(runner, 2)
+    second = cache.pool(cache.acquire(KEY, _Builder()), 3)
+
+    # One owner per replica: the pool grows to the largest size and the runner is its first replica
+    assert first is second and len(first) == 3 and first.idle == 3
+    assert first.replicas[0] is runner and len({id(r) for r in first.replicas}) == 3
+    # The replicas count towards the budget
+    assert cache.nbytes == 300
+    assert cache.pool(_Runner()) is None
+
+
+def test_pool_is_unloaded_with_its_runner(monkeypatch):
+    monkeypatch.setattr("sceneflow.runners._cache.runner_nbytes", lambda *runners: 100 * len(runners))
+    cache = ModelCache(max_bytes=250)
+    runner = cache.acquire(KEY, _Builder())
+    cache.pool(runner, 2)
+    other = cache.acquire(cache_key("detectors", "other"), _Builder())
+    assert cache.nbytes == 300
+
+    # Over budget once idle: the runner goes with its replicas, and a new one starts a new pool
+    cache.release(runner)
+    assert cache.keys() == [cache_key("detectors", "other")] and cache.nbytes == 100
+    assert len(cache.pool(other)) == 1
+
+
+def test_concurrent_callers_wait_for_one_build():
+    cache, build = ModelCache(), _Builder(delay=0.1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.acquire(KEY, build))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert build.calls == 1
+    assert len(results) == 8 and all(runner is results[0] for runner in results)
+    assert cache._entries[KEY].refs == 8
+
+
+def test_slow_build_does_not_block_other_keys():
+    cache, started = ModelCache(), threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.5)
+        return _Runner()
+
+    thread = threading.Thread(target=cache.acquire, args=(KEY, slow))
+    thread.start()
+    started.wait(5)
+    t0 = time.perf_counter()
+    cache.acquire(cache_key("detectors", "other"), _Builder())
+    assert time.perf_counter() - t0 < 0.25
+    thread.join()
+
+
+def test_build_error_is_raised_and_not_cached():
+    cache = ModelCache()
+
+    def fail():
+        raise OSError("missing weights")
+
+    with pytest.raises(OSError, match="missing weights"):
+        cache.acquire(KEY, fail)
+    assert cache.keys() == [] and cache._building == {}
+
+    # The next caller tries again
+    build = _Builder()
+    cache.acquire(KEY, build)
+    assert build.calls == 1
+
+
+def test_waiting_callers_get_the_build_error():
+    cache, started = ModelCache(), threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise OSError("missing weights")
+
+    errors = []
+
+    def acquire():
+        try:
+            cache.acquire(KEY, fail)
+        except OSError as exc:
+            errors.append(exc)
+
+    owner = threading.Thread(target=acquire)
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=acquire)
+    waiter.start()
+    owner.join()
+    waiter.join()
+    assert len(errors) == 2
+
+
+def test_cache_key():
+    assert cache_key("d", "m", "cpu", {"a": 1, "b": [2]}) == cache_key("d", "m", "cpu", {"b": [2], "a": 1})
+    assert cache_key("d", "m", "cpu", {"a": 1}) != cache_key("d", "m", "cpu", {"a": 2})
+
+    # Objects are keyed by identity, not by their (possibly changing) repr
+    first, second = _Runner(), _Runner()
+    assert cache_key("d", "m", kwargs={"x": first}) == cache_key("d", "m", kwargs={"x": first})
+    assert cache_key("d", "m", kwargs={"x": first}) != cache_key("d", "m", kwargs={"x": second})
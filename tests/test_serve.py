@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeDetector, make_image, register_fakes
+from sceneflow.pipelines.serve import create_app, make_server
+from sceneflow.runners._factory import OVD_DETECTORS
+
+register_fakes()
+
+
+class _ExclusiveDetector(FakeDetector):
+    """Fake OVD detector that records when two threads use the same instance at once."""
+
+    active: Counter = Counter()
+    overlaps = 0
+    lock = threading.Lock()
+
+    def run(self, image, conf=0.25, texts=None, **kwargs):
+        cls = type(self)
+        with cls.lock:
+            cls.active[id(self)] += 1
+            cls.overlaps += cls.active[id(self)] > 1
+        time.sleep(0.01)
+        try:
+            return super().run(image, conf=conf, texts=texts)
+        finally:
+            with cls.lock:
+                cls.active[id(self)] -= 1
+
+
+if not OVD_DETECTORS.has("exclusive_ovd"):
+    OVD_DETECTORS.register("exclusive_ovd")(
+        lambda device="cpu", **kwargs: _ExclusiveDetector("exclusive_ovd", device=device, **kwargs)
+    )
+
+
+def _app(replicas=1, ovd="fake_ovd"):
+    return create_app(
+        endpoints=["redact", "ocr", "remove"],
+        detectors=["fake_detector"],
+        ovd_detectors=[ovd],
+        segmentor="fake_segmentor",
+        text_detectors=["fake_text"],
+        ovd_detector=ovd,
+        remove_segmentor="fake_segmentor",
+        inpainter="fake_inpainter",
+        max_wait_ms=5,
+        replicas=replicas,
+    )
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = _app()
+    yield app
+    app.close()
+
+
+def _png(seed=0):
+    return cv2.imencode(".png", make_image((120, 160), seed=seed))[1].tobytes()
+
+
+def test_redact_image_and_json(app):
+    status, content_type, body = app.handle("redact", _png(), {})
+    assert (status, content_type) == (200, "image/png")
+    assert cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR).shape == (120, 160, 3)
+
+    status, content_type, body = app.handle("redact", _png(), {"output": "json", "conf": "0.5"})
+    assert (status, content_type) == (200, "application/json")
+    result = json.loads(body)
+    assert result["detections"] and all(d["score"] >= 0.5 for d in result["detections"])
+
+
+def test_ocr_and_remove(app):
+    status, _, body = app.handle("ocr", _png(), {})
+    assert status == 200 and json.loads(body)["counts"]
+
+    status, content_type, body = app.handle("remove", _png(), {"prompt": "person", "format": "jpg"})
+    assert (status, content_type) == (200, "image/jpeg")
+
+
+@pytest.mark.parametrize(
+    "endpoint, data, params, status",
+    [
+        ("redact", b"not an image", {}, 400),
+        ("redact", None, {"conf": "high"}, 400),
+        ("redact", None, {"method": "glitter"}, 400),
+        ("redact", None, {"format": "gif"}, 400),
+        ("remove", None, {}, 400),
+        ("render", None, {}, 404),
+    ],
+)
+def test_bad_requests(app, endpoint, data, params, status):
+    response = app.handle(endpoint, _png() if data is None else data, params)
+    assert response[0] == status and "error" in json.loads(response[2])
+
+
+@pytest.mark.parametrize("replicas", [1, 2])
+def test_endpoints_share_the_pool_of_a_model(replicas):
+    _ExclusiveDetector.overlaps = 0
+    app = _app(replicas, ovd="exclusive_ovd")
+    try:
+        # redact and remove use the same cached OVD detector and segmentor, through one pool each
+        redact, remove = app.state["mask_gen"], app.state["remove_gen"]
+        assert redact.ovd_detectors[0] is remove.ovd_detectors[0]
+        assert redact.segmentor is remove.segmentor
+        assert len(redact.ovd_detectors[0]) == replicas
+
+        def call(i):
+            if i % 2:
+                return app.handle("remove", _png(i), {"prompt": "person"})[0]
+            return app.handle("redact", _png(i), {"classes": "person"})[0]
+
+        with ThreadPoolExecutor(8) as pool:
+            assert set(pool.map(call, range(16))) == {200}
+        assert _ExclusiveDetector.overlaps == 0
+    finally:
+        app.close()
+
+
+def test_http(app):
+    server = make_server(app, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urlopen(f"{url}/health", timeout=5) as response:
+            assert json.loads(response.read()) == {"status": "ok", "endpoints": ["ocr", "redact", "remove"]}
+
+        request = Request(f"{url}/redact?output=json", data=_png(), method="POST")
+        with urlopen(request, timeout=5) as response:
+            assert response.headers["Content-Type"] == "application/json"
+            assert "detections" in json.loads(response.read())
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(Request(f"{url}/redact", data=b"", method="POST"), timeout=5)
+        assert error.value.code == 400
+
+        with urlopen(f"{url}/stats", timeout=5) as response:
+            assert "redact" in json.loads(response.read())["batchers"]
+    finally:
+        server.shutdown()
+        server.server_close()